@@ -1,15 +1,40 @@
 from fastapi import APIRouter
 from model.user_request import UserRequest
 from core.agent import Agent
+from core.answer_cache import AnswerCache
 from core.llm_client import LLMClient
 from core.mcp_client import MCPClient
+import os
 
 router = APIRouter()
 
 llm_client = LLMClient()
 mcp_client = MCPClient()
 agent = Agent(llm_client, mcp_client)
+answer_cache = AnswerCache.from_env() if os.getenv("ANSWER_CACHE_ENABLED", "1") == "1" else None
 
 @router.post("/user")
 async def user_prompt(request: UserRequest):
-    return await agent.generate(request.question)
\ No newline at end of file
+    if answer_cache is None:
+        return await agent.generate(request.question)
+
+    cached = answer_cache.get(request.question)
+    if cached is not None:
+        return cached
+
+    result = await agent.generate(request.question)
+    if is_cacheable(result):
+        answer_cache.put(request.question, result)
+    return result
+
+@router.get("/cache/stats")
+async def cache_stats():
+    if answer_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **answer_cache.stats_dict()}
+
+def is_cacheable(result: dict) -> bool:
+    if "error" in result:
+        return False
+    agent2_response = result.get("agent2_response")
+    return not (isinstance(agent2_response, dict) and "error" in agent2_response)
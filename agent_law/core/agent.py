@@ -1,58 +1,138 @@
 from model.tool_decision import ToolDecision
 from model.mode_decision import ModeDecision
+from model.route_decision import RouteDecision
 from core.llm_client import LLMClient
 from core.mcp_client import MCPClient
+from core.http_client import get_http_client
+from core.fast_router import InvalidIdentifierError, fast_route
+from core.context_compactor import ContextCompactor
+from core.tracing import current_span, inject, span
 from utils.file_loader import load_file
-import requests
 import asyncio
+import json
 import os
+import time
+import uuid
 from dotenv import load_dotenv
 
 load_dotenv()
 
+AGENT2_MODES = {"explain", "draft", "referral", "pipeline"}
+
 class Agent:
     def __init__(self, llm_client: LLMClient, mcp_client: MCPClient):
         self.llm_client = llm_client
         self.mcp_client = mcp_client
         self.agent_2_url = os.getenv('API_2_URL') + '/legal-advisor-and-referral'
+        self.agent_2_timeout = float(os.getenv('AGENT2_TIMEOUT', '180'))
+
+        # submit to Agent 2's job API and poll, instead of holding one long request open
+        self.agent_2_jobs = os.getenv('AGENT2_JOBS_ENABLED', '0') == '1'
+        self.agent_2_poll_interval = float(os.getenv('AGENT2_POLL_INTERVAL', '1.0'))
+
+        # single: one LLM call picks tool + provisional mode; split: legacy two-call routing
+        self.router_mode = os.getenv('ROUTER_MODE', 'single')
+
+        # questions about a single INN skip the LLM router; the mode selector still runs
+        self.fast_router_enabled = os.getenv('FAST_ROUTER_ENABLED', '1') == '1'
+
+        # trims the MCP summary to a per-mode token budget before Agent 2 sees it
+        self.compactor = ContextCompactor.from_env() if os.getenv('CONTEXT_COMPACTION_ENABLED', '1') == '1' else None
 
         self.system_prompt = load_file('./prompt/tool_selector.txt')
-        self.mode_selector_prompt = load_file('./prompt/mode_selector.text')
+        self.router_prompt = load_file('./prompt/router.txt')
+        self.mode_selector_prompt = load_file('./prompt/mode_selector.txt')
 
     async def generate(self, user_input: str) -> str:
-        tool_decision: ToolDecision = self.llm_client.call(
-            user_input, 
-            self.system_prompt
-        )
+        with span("agent.route", **{"query.chars": len(user_input)}) as route_span:
+            try:
+                tool_decision = fast_route(user_input) if self.fast_router_enabled else None
+            except InvalidIdentifierError as e:
+                route_span.set(router="fast", rejected=str(e))
+                return {"error": str(e)}
+
+            if tool_decision is not None:
+                route_span.set(router="fast")
+                provisional_mode = tool_decision.mode
+            elif self.router_mode == "split":
+                route_span.set(router="llm_split")
+                tool_decision: ToolDecision = await self.llm_client.call(
+                    user_input, 
+                    self.system_prompt
+                )
+                provisional_mode = None
+            else:
+                route_span.set(router="llm_single")
+                tool_decision: RouteDecision = await self.llm_client.call(
+                    user_input,
+                    self.router_prompt,
+                    RouteDecision,
+                )
+                provisional_mode = tool_decision.mode
+            route_span.set(tool=tool_decision.tool, provisional_mode=str(provisional_mode))
 
         if tool_decision.tool == "none":
             return  {"error": "No suitable MCP tool found."}
         
-        summary = await asyncio.to_thread(self.mcp_client.call_tool, tool_decision.tool, tool_decision.arguments)
+        summary = await self.mcp_client.call_tool(tool_decision.tool, tool_decision.arguments)
 
-        mode_input = f"User query: {user_input}\nMCP Summary: {summary}"
+        mode = provisional_mode
+        if self.needs_mode_recheck(provisional_mode, summary):
+            with span("agent.mode_select"):
+                mode_input = f"User query: {user_input}\nMCP Summary: {summary}"
 
-        mode_decision: ModeDecision = self.llm_client.call(
-            mode_input,
-            self.mode_selector_prompt
-        )
+                mode_decision: ModeDecision = await self.llm_client.call(
+                    mode_input,
+                    self.mode_selector_prompt,
+                    ModeDecision,
+                )
+                mode = mode_decision.mode
+
+        law_context, compaction = summary, None
+        if self.compactor is not None:
+            with span("agent.compact_context", mode=str(mode)) as compact_span:
+                law_context, report = self.compactor.compact(summary, mode, user_input)
+                compaction = report.as_dict()
+                compact_span.set(
+                    estimated_tokens_before=report.estimated_tokens_before,
+                    estimated_tokens_after=report.estimated_tokens_after,
+                )
     
         a2_payload = self.build_agent2_payload(
             user_input=user_input,
-            summary=summary,
-            mode=mode_decision.mode,
+            summary=law_context,
+            mode=mode,
         )
 
-        agent2_result = self.send_to_agent2(a2_payload)
+        agent2_result = await self.send_to_agent2(a2_payload)
 
         return {
             "tool": tool_decision.tool,
             "arguments": tool_decision.arguments,
             "summary": summary,
-            "agent2_mode": mode_decision.mode,
+            "agent2_mode": mode,
+            "context_compaction": compaction,
             "agent2_response": agent2_result
         }
 
+    def needs_mode_recheck(self, provisional_mode, summary: str) -> bool:
+        """The router picks its mode before seeing MCP data, assuming the tool
+        succeeds. Ask the mode selector again only when that assumption broke."""
+        if provisional_mode not in AGENT2_MODES:
+            return True
+
+        text = (summary or "").strip()
+        if not text or text in ("[]", "{}"):
+            return True
+        if text.startswith("MCP call failed"):
+            return True
+
+        try:
+            data = json.loads(text)
+        except ValueError:
+            return False
+        return isinstance(data, dict) and "error" in data
+
     def build_agent2_payload(self, user_input, summary, mode):
         return {
             "mode": mode,
@@ -62,16 +142,62 @@ class Agent:
             "relevant_laws": ""
         }
     
-    def send_to_agent2(self, payload: dict) -> dict:
-        try:
-            headers = {"Content-Type": "application/json"}
+    async def send_to_agent2(self, payload: dict) -> dict:
+        with span("agent2.call", mode=str(payload.get("mode"))) as agent2_span:
+            try:
+                headers = inject({"Content-Type": "application/json"})
+
+                if self.agent_2_jobs:
+                    return await self.run_agent2_job(payload, headers)
+
+                res = await get_http_client().post(
+                    self.agent_2_url, json=payload, headers=headers, timeout=self.agent_2_timeout
+                )
+                agent2_span.set(**{"http.status_code": res.status_code, "response.bytes": len(res.content)})
+                res.raise_for_status()
+                return res.json()
+
+            except Exception as e:
+                agent2_span.status = "error"
+                agent2_span.set(error=str(e))
+                return {
+                    "error": "Failed to contact Agent 2",
+                    "details": str(e)
+                }
+
+    async def run_agent2_job(self, payload: dict, headers: dict) -> dict:
+        """Submit the payload as an Agent 2 job and poll until it finishes.
+        Returns the same shape as the synchronous endpoint."""
+        client = get_http_client()
+        jobs_url = self.agent_2_url + '/jobs'
+        deadline = time.monotonic() + self.agent_2_timeout
+        # resubmits after a full queue (503) must not create a second job
+        body = {**payload, "idempotency_key": uuid.uuid4().hex}
+
+        while True:
+            res = await client.post(jobs_url, json=body, headers=headers, timeout=30)
+            if res.status_code != 503:
+                break
+            retry_after = float(res.headers.get('Retry-After', '5'))
+            if time.monotonic() + retry_after > deadline:
+                break
+            await asyncio.sleep(retry_after)
+        res.raise_for_status()
+        job = res.json()
 
-            res = requests.post(self.agent_2_url, json=payload, headers=headers)
+        polls = 0
+        while job["status"] in ("queued", "running"):
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Agent 2 job {job['job_id']} not finished after {self.agent_2_timeout}s")
+            await asyncio.sleep(self.agent_2_poll_interval)
+            res = await client.get(f"{jobs_url}/{job['job_id']}", headers=headers, timeout=30)
             res.raise_for_status()
-            return res.json()
+            job = res.json()
+            polls += 1
 
-        except Exception as e:
-            return {
-                "error": "Failed to contact Agent 2",
-                "details": str(e)
-            }
\ No newline at end of file
+        current = current_span()
+        if current is not None:
+            current.set(job_id=job["job_id"], polls=polls)
+        if job["status"] != "succeeded":
+            raise RuntimeError(job.get("error") or f"Agent 2 job {job['job_id']} {job['status']}")
+        return {"mode_used": job["mode_used"], "answer_markdown": job["answer_markdown"], "meta": job["meta"]}
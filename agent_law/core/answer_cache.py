@@ -0,0 +1,156 @@
+import math
+import os
+import re
+import time
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from dotenv import load_dotenv
+
+load_dotenv()
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+_NUMBER_RE = re.compile(r"\d+")
+
+
+def normalize_question(text: str) -> str:
+    text = text.lower().replace("ё", "е")
+    return " ".join(_WORD_RE.findall(text))
+
+
+def embed(text: str, dim: int = 1 << 16) -> dict:
+    """Hashed bag of words + character trigrams, L2-normalised.
+
+    Cheap, local and good enough to catch rephrasings of the same question;
+    the vector is stored sparse as {bucket: weight}."""
+    vec: dict = {}
+    words = text.split()
+    for word in words:
+        bucket = zlib.crc32(b"w:" + word.encode("utf-8")) % dim
+        vec[bucket] = vec.get(bucket, 0.0) + 1.0
+    padded = f" {text} "
+    for i in range(len(padded) - 2):
+        bucket = zlib.crc32(b"c:" + padded[i:i + 3].encode("utf-8")) % dim
+        vec[bucket] = vec.get(bucket, 0.0) + 0.5
+
+    norm = math.sqrt(sum(v * v for v in vec.values()))
+    if norm:
+        vec = {k: v / norm for k, v in vec.items()}
+    return vec
+
+
+def cosine(a: dict, b: dict) -> float:
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(v * b.get(k, 0.0) for k, v in a.items())
+
+
+@dataclass
+class CacheEntry:
+    key: str
+    vector: dict
+    numbers: tuple
+    response: dict
+    expires_at: float
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    semantic_hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+
+    def as_dict(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+class AnswerCache:
+    """Semantic LRU cache for Agent.generate responses.
+
+    A question hits when its normalised form matches a stored one exactly, or
+    when the cosine similarity of their embeddings reaches `threshold` and both
+    mention the same numbers (an INN or a date must never match a different one)."""
+
+    def __init__(self, threshold: float = 0.9, ttl: float = 3600.0, max_size: int = 1000):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_size = max_size
+        self.entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self.stats = CacheStats()
+
+    @classmethod
+    def from_env(cls) -> "AnswerCache":
+        return cls(
+            threshold=float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.9")),
+            ttl=float(os.getenv("ANSWER_CACHE_TTL", "3600")),
+            max_size=int(os.getenv("ANSWER_CACHE_MAX_SIZE", "1000")),
+        )
+
+    def get(self, question: str) -> dict | None:
+        key = normalize_question(question)
+        self._expire()
+
+        entry = self.entries.get(key)
+        if entry is None and key:
+            entry = self._find_similar(key)
+            if entry is not None:
+                self.stats.semantic_hits += 1
+
+        if entry is None:
+            self.stats.misses += 1
+            return None
+
+        self.entries.move_to_end(entry.key)
+        self.stats.hits += 1
+        return entry.response
+
+    def put(self, question: str, response: dict):
+        key = normalize_question(question)
+        if not key:
+            return
+        self.entries[key] = CacheEntry(
+            key=key,
+            vector=embed(key),
+            numbers=tuple(_NUMBER_RE.findall(key)),
+            response=response,
+            expires_at=time.monotonic() + self.ttl,
+        )
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+            self.stats.evictions += 1
+
+    def clear(self):
+        self.entries.clear()
+
+    def stats_dict(self) -> dict:
+        return {**self.stats.as_dict(), "size": len(self.entries), "max_size": self.max_size}
+
+    def _find_similar(self, key: str) -> CacheEntry | None:
+        vector = embed(key)
+        numbers = tuple(_NUMBER_RE.findall(key))
+        best, best_score = None, self.threshold
+        for entry in self.entries.values():
+            if entry.numbers != numbers:
+                continue
+            score = cosine(vector, entry.vector)
+            if score >= best_score:
+                best, best_score = entry, score
+        return best
+
+    def _expire(self):
+        now = time.monotonic()
+        expired = [key for key, entry in self.entries.items() if entry.expires_at <= now]
+        for key in expired:
+            del self.entries[key]
+            self.stats.expirations += 1
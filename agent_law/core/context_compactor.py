@@ -0,0 +1,258 @@
+import json
+import math
+import os
+import re
+from dataclasses import dataclass, field
+from dotenv import load_dotenv
+
+load_dotenv()
+
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+_SENTENCE_RE = re.compile(r"(?<=[.!?…])\s+|\n+")
+
+DEFAULT_BUDGETS = {"explain": 1500, "draft": 2000, "referral": 1000, "pipeline": 2500}
+
+# Dropped first: useful to a human reading the card, rarely to the legal answer.
+LOW_VALUE_FIELDS = ("contacts", "kpp", "okved", "region")
+
+# (kind, limit) in the order they are tried
+SHRINK_STAGES = (("years", 3), ("lists", 5), ("lists", 3), ("years", 1), ("lists", 1))
+STRING_LIMIT = 300
+
+_MORE_RE = re.compile(r"^\.\.\. \(\+(\d+) more\)$")
+
+
+def estimate_tokens(text: str) -> int:
+    """Heuristic token estimate; not the model tokenizer's count.
+
+    Latin words cost ~4 chars per token, Cyrillic and other scripts ~2.5,
+    punctuation one token each. Errs on the high side, which is what a budget
+    needs; budgets and report figures are in these estimated tokens."""
+    tokens = 0
+    for piece in _TOKEN_RE.findall(text):
+        if not piece[0].isalnum() and piece[0] != "_":
+            tokens += 1
+        elif piece.isascii():
+            tokens += math.ceil(len(piece) / 4)
+        else:
+            tokens += math.ceil(len(piece) / 2.5)
+    return tokens
+
+
+@dataclass
+class CompactionReport:
+    budget: int
+    estimated_tokens_before: int
+    estimated_tokens_after: int
+    bytes_before: int
+    bytes_after: int
+    steps: list = field(default_factory=list)
+
+    def as_dict(self) -> dict:
+        return {
+            "budget": self.budget,
+            "estimated_tokens_before": self.estimated_tokens_before,
+            "estimated_tokens_after": self.estimated_tokens_after,
+            "bytes_before": self.bytes_before,
+            "bytes_after": self.bytes_after,
+            "steps": self.steps,
+        }
+
+
+class ContextCompactor:
+    """Shrinks the MCP summary to a per-mode token budget before it reaches Agent 2.
+
+    Budgets are in estimate_tokens() units. JSON summaries are reduced
+    structurally (nulls, low-value fields, long lists, old financial years,
+    long strings) and, if still too large, by dropping the fields least
+    relevant to the query, so the result stays valid JSON. Plain text is cut
+    down to the sentences most relevant to the query."""
+
+    def __init__(self, budgets: dict | None = None, default_budget: int = 1500):
+        self.budgets = budgets or dict(DEFAULT_BUDGETS)
+        self.default_budget = default_budget
+
+    @classmethod
+    def from_env(cls) -> "ContextCompactor":
+        budgets = {
+            mode: int(os.getenv(f"CONTEXT_BUDGET_{mode.upper()}", str(budget)))
+            for mode, budget in DEFAULT_BUDGETS.items()
+        }
+        return cls(budgets, int(os.getenv("CONTEXT_BUDGET_DEFAULT", "1500")))
+
+    def budget_for(self, mode: str | None) -> int:
+        return self.budgets.get(mode, self.default_budget)
+
+    def compact(self, summary: str, mode: str | None = None, query: str = "") -> tuple[str, CompactionReport]:
+        text = summary or ""
+        budget = self.budget_for(mode)
+        report = CompactionReport(
+            budget=budget,
+            estimated_tokens_before=estimate_tokens(text),
+            estimated_tokens_after=0,
+            bytes_before=len(text.encode("utf-8")),
+            bytes_after=0,
+        )
+
+        if report.estimated_tokens_before > budget:
+            data = parse_json(text)
+            if data is None:
+                text = select_sentences(text, budget, query)
+                report.steps.append("extract_sentences")
+            else:
+                text = self._compact_json(data, budget, query, report)
+
+        report.estimated_tokens_after = estimate_tokens(text)
+        report.bytes_after = len(text.encode("utf-8"))
+        return text, report
+
+    def _compact_json(self, data, budget: int, query: str, report: CompactionReport) -> str:
+        stages = [("strip_empty", drop_empty)]
+        stages += [(f"drop_{name}", lambda d, name=name: drop_field(d, name)) for name in LOW_VALUE_FIELDS]
+        shrinkers = {"years": keep_latest_years, "lists": truncate_lists}
+        stages += [(f"{kind}_to_{n}", lambda d, f=shrinkers[kind], n=n: f(d, n)) for kind, n in SHRINK_STAGES]
+        stages += [(f"strings_to_{STRING_LIMIT}", lambda d: truncate_strings(d, STRING_LIMIT))]
+
+        compact = dump(data)
+        for name, stage in stages:
+            if estimate_tokens(compact) <= budget:
+                break
+            data = stage(data)
+            candidate = dump(data)
+            if candidate != compact:
+                report.steps.append(name)
+                compact = candidate
+
+        if estimate_tokens(compact) > budget:
+            data, dropped = drop_to_budget(data, budget, query)
+            report.steps += [f"drop_{name}" for name in dropped]
+            compact = dump(data)
+        return compact
+
+
+def parse_json(text: str):
+    """The decoded object or array, or None when the text is not JSON."""
+    try:
+        data = json.loads(text)
+    except ValueError:
+        return None
+    return data if isinstance(data, (dict, list)) else None
+
+
+def dump(data) -> str:
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+
+
+def drop_empty(data):
+    if isinstance(data, dict):
+        cleaned = {key: drop_empty(value) for key, value in data.items()}
+        return {key: value for key, value in cleaned.items() if value not in (None, "", [], {})}
+    if isinstance(data, list):
+        return [drop_empty(item) for item in data if item not in (None, "", [], {})]
+    return data
+
+
+def drop_field(data, name: str):
+    if isinstance(data, dict):
+        return {key: drop_field(value, name) for key, value in data.items() if key != name}
+    if isinstance(data, list):
+        return [drop_field(item, name) for item in data]
+    return data
+
+
+def truncate_lists(data, limit: int):
+    if isinstance(data, dict):
+        return {key: truncate_lists(value, limit) for key, value in data.items()}
+    if isinstance(data, list):
+        items, hidden = data, 0
+        marker = _MORE_RE.match(data[-1]) if data and isinstance(data[-1], str) else None
+        if marker:
+            items, hidden = data[:-1], int(marker.group(1))
+        kept = [truncate_lists(item, limit) for item in items[:limit]]
+        hidden += max(0, len(items) - limit)
+        if hidden:
+            kept.append(f"... (+{hidden} more)")
+        return kept
+    return data
+
+
+def keep_latest_years(data, limit: int):
+    """Keep only the most recent entries of dicts keyed by year (financials)."""
+    if isinstance(data, dict):
+        if data and all(str(key).isdigit() and len(str(key)) == 4 for key in data):
+            latest = sorted(data, key=int)[-limit:]
+            return {key: data[key] for key in latest}
+        return {key: keep_latest_years(value, limit) for key, value in data.items()}
+    if isinstance(data, list):
+        return [keep_latest_years(item, limit) for item in data]
+    return data
+
+
+def truncate_strings(data, limit: int):
+    if isinstance(data, dict):
+        return {key: truncate_strings(value, limit) for key, value in data.items()}
+    if isinstance(data, list):
+        return [truncate_strings(item, limit) for item in data]
+    if isinstance(data, str) and len(data) > limit:
+        return data[:limit] + "…"
+    return data
+
+
+def drop_to_budget(data, budget: int, query: str = ""):
+    """Drop whole top-level fields (or trailing list items) until the JSON fits.
+
+    Fields sharing no words with the query go first, largest first, so the
+    output stays valid JSON instead of being cut mid-value."""
+    query_words = {w.lower() for w in _TOKEN_RE.findall(query) if len(w) > 2}
+    if isinstance(data, list):
+        kept = list(data)
+        while kept and estimate_tokens(dump(kept)) > budget:
+            kept.pop()
+        return kept, ["items"] if len(kept) < len(data) else []
+
+    def rank(key):
+        text = f"{key} {dump(data[key])}"
+        words = {w.lower() for w in _TOKEN_RE.findall(text)}
+        return (len(words & query_words), -estimate_tokens(text))
+
+    data, dropped = dict(data), []
+    for key in sorted(data, key=rank):
+        if estimate_tokens(dump(data)) <= budget:
+            break
+        del data[key]
+        dropped.append(key)
+    return data, dropped
+
+
+def select_sentences(text: str, budget: int, query: str = "") -> str:
+    """Extractive summary: the sentences sharing most words with the query
+    (earlier ones win ties), kept in their original order, within budget."""
+    sentences = [s.strip() for s in _SENTENCE_RE.split(text) if s and s.strip()]
+    query_words = {w.lower() for w in _TOKEN_RE.findall(query) if len(w) > 2}
+
+    def score(item):
+        index, sentence = item
+        words = {w.lower() for w in _TOKEN_RE.findall(sentence)}
+        return (-len(words & query_words), index)
+
+    chosen, used = [], 0
+    for index, sentence in sorted(enumerate(sentences), key=score):
+        cost = estimate_tokens(sentence)
+        if used + cost > budget:
+            continue
+        chosen.append(index)
+        used += cost
+
+    if not chosen and sentences:
+        return truncate_to_budget(sentences[0], budget)
+    return " ".join(sentences[i] for i in sorted(chosen))
+
+
+def truncate_to_budget(text: str, budget: int) -> str:
+    used = 0
+    for match in _TOKEN_RE.finditer(text):
+        piece = match.group()
+        used += estimate_tokens(piece)
+        if used > budget:
+            return text[:match.start()].rstrip() + "…"
+    return text
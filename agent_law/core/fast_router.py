@@ -0,0 +1,132 @@
+import re
+from model.route_decision import RouteDecision
+
+INN10_WEIGHTS = (2, 4, 10, 3, 5, 9, 4, 6, 8)
+INN12_WEIGHTS_11 = (7, 2, 4, 10, 3, 5, 9, 4, 6, 8)
+INN12_WEIGHTS_12 = (3, 7, 2, 4, 10, 3, 5, 9, 4, 6, 8)
+
+LABEL_LENGTHS = {
+    "inn": (10, 12),
+    "ogrn": (13,),
+    "ogrnip": (15,),
+}
+
+LABEL_ALIASES = {"инн": "inn", "огрн": "ogrn", "огрнип": "ogrnip"}
+
+LABELED_RE = re.compile(
+    r"(?<!\w)(?P<label>огрнип|ogrnip|огрн|ogrn|инн|inn)(?!\w)[\s:№#=-]*(?P<value>\d+)",
+    re.IGNORECASE,
+)
+BARE_RE = re.compile(r"(?<![\d+])\d{10,15}(?!\d)")
+
+# A bare number is read as an identifier only in a question about a company or
+# an entrepreneur, and never next to phone words: a 10-digit phone number can
+# pass the INN checksum.
+ENTITY_CONTEXT_RE = re.compile(
+    r"(?<!\w)(?:(?:ооо|оао|зао|пао|ао|ип|llc|ltd|inc)(?!\w)"
+    r"|компани|организаци|фирм|контрагент|предприяти|юрлиц|юридическ\w* лиц|предпринимател"
+    r"|compan|firm|organi[sz]ation|entrepreneur|counterpart)",
+    re.IGNORECASE,
+)
+PHONE_CONTEXT_RE = re.compile(
+    r"(?<!\w)(?:(?:тел|tel|смс|sms)(?!\w)|телефон|звон|позвон|моб|факс|whatsapp|phone|call|mobile|fax)",
+    re.IGNORECASE,
+)
+
+
+class InvalidIdentifierError(ValueError):
+    pass
+
+
+def _checksum(digits: str, weights: tuple) -> int:
+    return sum(int(d) * w for d, w in zip(digits, weights)) % 11 % 10
+
+
+def is_valid_inn(value: str) -> bool:
+    if not value.isdigit():
+        return False
+    if len(value) == 10:
+        return _checksum(value, INN10_WEIGHTS) == int(value[9])
+    if len(value) == 12:
+        return (
+            _checksum(value, INN12_WEIGHTS_11) == int(value[10])
+            and _checksum(value, INN12_WEIGHTS_12) == int(value[11])
+        )
+    return False
+
+
+def is_valid_ogrn(value: str) -> bool:
+    return value.isdigit() and len(value) == 13 and int(value[:12]) % 11 % 10 == int(value[12])
+
+
+def is_valid_ogrnip(value: str) -> bool:
+    return value.isdigit() and len(value) == 15 and int(value[:14]) % 13 % 10 == int(value[14])
+
+
+def classify_identifier(value: str) -> str | None:
+    """Kind of a checksum-valid identifier: inn10 / inn12 / ogrn / ogrnip, else None."""
+    if len(value) in (10, 12) and is_valid_inn(value):
+        return f"inn{len(value)}"
+    if is_valid_ogrn(value):
+        return "ogrn"
+    if is_valid_ogrnip(value):
+        return "ogrnip"
+    return None
+
+
+def extract_identifiers(text: str) -> list[tuple[str, str]]:
+    """Valid (kind, value) pairs found in the text, in order of appearance.
+
+    An identifier explicitly labelled "ИНН"/"ОГРН"/"ОГРНИП" that has the wrong
+    length or checksum raises InvalidIdentifierError. Bare digit runs are only
+    considered in a question about a company or entrepreneur without phone
+    words (see ENTITY_CONTEXT_RE); there a 10/12-digit run with a wrong INN
+    checksum raises too, and other invalid runs (case numbers, etc.) are ignored."""
+    found = []
+    labeled_spans = []
+
+    for match in LABELED_RE.finditer(text):
+        label = match.group("label").lower()
+        label = LABEL_ALIASES.get(label, label)
+        value = match.group("value")
+        labeled_spans.append(match.span("value"))
+
+        kind = classify_identifier(value)
+        if len(value) not in LABEL_LENGTHS[label] or kind is None:
+            raise InvalidIdentifierError(f"Invalid {label.upper()}: {value}")
+        found.append((kind, value))
+
+    if not ENTITY_CONTEXT_RE.search(text) or PHONE_CONTEXT_RE.search(text):
+        return list(dict.fromkeys(found))
+
+    for match in BARE_RE.finditer(text):
+        if match.span() in labeled_spans:
+            continue
+        value = match.group()
+        kind = classify_identifier(value)
+        if kind is None and len(value) in LABEL_LENGTHS["inn"]:
+            raise InvalidIdentifierError(f"Invalid INN: {value}")
+        if kind is not None:
+            found.append((kind, value))
+
+    return list(dict.fromkeys(found))
+
+
+def fast_route(user_input: str) -> RouteDecision | None:
+    """Pick the MCP tool for a question about exactly one INN without an LLM call.
+
+    Only the tool is decided here; the mode is left to the mode selector,
+    which sees the question ("составь претензию" is a draft, not an
+    explanation). Returns None when the question holds no identifier,
+    several different ones, or an OGRN/OGRNIP: the MCP tools look up
+    companies and entrepreneurs by INN only, so those go to the LLM router."""
+    identifiers = extract_identifiers(user_input)
+    if len(identifiers) != 1:
+        return None
+
+    kind, value = identifiers[0]
+    if kind == "inn10":
+        return RouteDecision(tool="get_company_full_profile", arguments={"inn": value})
+    if kind == "inn12":
+        return RouteDecision(tool="get_entrepreneur_profile", arguments={"inn": value})
+    return None
@@ -1,10 +1,19 @@
 from dotenv import load_dotenv
+import logging
 import os
-import requests
+import httpx
+from typing import Type, TypeVar
+from pydantic import BaseModel
 from model.tool_decision import ToolDecision
+from core.http_client import get_http_client
+from core.tracing import inject, span
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+Decision = TypeVar("Decision", bound=BaseModel)
+
 class LLMClient():
     def __init__(self):
         self.api_key = os.getenv("API_KEY")
@@ -13,8 +22,14 @@ class LLMClient():
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json"
         }
+        self.timeout = float(os.getenv("LLM_TIMEOUT", "60"))
 
-    def call(self, user_input: str, system_prompt: str) -> ToolDecision:
+    async def call(
+        self,
+        user_input: str,
+        system_prompt: str,
+        response_model: Type[Decision] = ToolDecision,
+    ) -> Decision:
         payload = {
             "model": "ai-sage/GigaChat3-10B-A1.8B",
             "messages": [
@@ -29,29 +44,34 @@ class LLMClient():
             "structure_output": True 
         }
 
-        response = requests.post(self.base_url, headers=self.headers, json=payload)
-
-        print(response)
-
-    
-        try:
-            response = requests.post(self.base_url, headers=self.headers, json=payload)
-            response.raise_for_status()
-            data = response.json()
-            content = data["choices"][0]["message"]["content"]
-            return ToolDecision.model_validate_json(content)
+        with span("llm.chat_completions", model=payload["model"], response_model=response_model.__name__) as llm_span:
+            try:
+                response = await get_http_client().post(
+                    self.base_url, headers=inject(self.headers), json=payload, timeout=self.timeout
+                )
+                llm_span.set(**{"http.status_code": response.status_code, "response.bytes": len(response.content)})
+                response.raise_for_status()
+                data = response.json()
+                content = data["choices"][0]["message"]["content"]
+                return response_model.model_validate_json(content)
 
-        except requests.exceptions.HTTPError as http_err:
-            if response.status_code == 402:
-                print("LLM API 402: Payment Required or out of credits")
-                return ToolDecision(tool="none", arguments={})
-            else:
-                raise http_err
+            except httpx.HTTPStatusError as http_err:
+                if http_err.response.status_code == 402:
+                    logger.warning("LLM API 402: Payment Required or out of credits")
+                    llm_span.set(fallback=True)
+                    return response_model.fallback()
+                else:
+                    raise http_err
 
-        except requests.exceptions.RequestException as req_err:
-            print(f"LLM Request Error: {req_err}")
-            return ToolDecision(tool="none", arguments={})
+            except httpx.RequestError as req_err:
+                logger.warning(f"LLM Request Error: {req_err}")
+                llm_span.status = "error"
+                llm_span.set(fallback=True, error=str(req_err))
+                return response_model.fallback()
 
-        except ValueError as val_err:
-            print(f"LLM JSON Error: {val_err}")
-            return ToolDecision(tool="none", arguments={})
+            except (ValueError, KeyError, IndexError, TypeError) as val_err:
+                # not JSON, no choices, or content that does not fit the model
+                logger.warning(f"LLM JSON Error: {val_err!r}")
+                llm_span.status = "error"
+                llm_span.set(fallback=True, error=str(val_err))
+                return response_model.fallback()
\ No newline at end of file
@@ -1,20 +1,32 @@
-import requests
+import httpx
+import logging
 import os
 from dotenv import load_dotenv
+from core.http_client import get_http_client
+from core.tracing import inject, span
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 class MCPClient:
     def __init__(self):
         self.base_url = os.getenv("MCP_BASE_URL")  
         self.headers = {"Content-Type": "application/json"}
+        self.timeout = float(os.getenv("MCP_TIMEOUT", "30"))
 
-    def call_tool(self, tool: str, arguments: dict) -> str:
+    async def call_tool(self, tool: str, arguments: dict) -> str:
         url = f"{self.base_url}/{tool}" 
-        try:
-            response = requests.post(url, json=arguments, headers=self.headers)
-            response.raise_for_status()
-            return response.text  
-        except requests.exceptions.RequestException as e:
-            print(f"MCP call failed: {e}")
-            return f"MCP call failed for tool {tool}"
+        with span("mcp.call_tool", tool=tool) as mcp_span:
+            try:
+                response = await get_http_client().post(
+                    url, json=arguments, headers=inject(self.headers), timeout=self.timeout
+                )
+                mcp_span.set(**{"http.status_code": response.status_code, "response.bytes": len(response.content)})
+                response.raise_for_status()
+                return response.text  
+            except httpx.HTTPError as e:
+                logger.warning(f"MCP call failed: {e}")
+                mcp_span.status = "error"
+                mcp_span.set(error=str(e))
+                return f"MCP call failed for tool {tool}"
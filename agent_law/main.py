@@ -1,10 +1,33 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
 from api import controller
+from core.http_client import close_http_client
+from core.tracing import shutdown as shutdown_tracing, span
 
-app = FastAPI(title="Agent 1 API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    await close_http_client()
+    shutdown_tracing()
+
+app = FastAPI(title="Agent 1 API", lifespan=lifespan)
 
 app.include_router(controller.router, prefix="/api")
 
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    with span(
+        f"{request.method} {request.url.path}",
+        traceparent=request.headers.get("traceparent"),
+        **{"http.method": request.method, "http.route": request.url.path},
+    ) as request_span:
+        response = await call_next(request)
+        request_span.set(**{"http.status_code": response.status_code})
+        traceparent = request_span.traceparent()
+        if traceparent:
+            response.headers["traceparent"] = traceparent
+        return response
+
 @app.get("/")
 def root():
     return {"message": "Agent 1 is running. Use /api/user to send questions."}
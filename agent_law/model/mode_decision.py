@@ -1,4 +1,8 @@
 from pydantic import BaseModel
 
 class ModeDecision(BaseModel):
-    mode: str  # explain / draft / referral / pipeline
\ No newline at end of file
+    mode: str  # explain / draft / referral / pipeline
+
+    @classmethod
+    def fallback(cls) -> "ModeDecision":
+        return cls(mode="pipeline")
@@ -0,0 +1,11 @@
+from pydantic import BaseModel
+from typing import Optional, Dict
+
+class RouteDecision(BaseModel):
+    tool: str
+    arguments: Optional[Dict] = {}
+    mode: Optional[str] = None  # provisional Agent 2 mode: explain / draft / referral / pipeline
+
+    @classmethod
+    def fallback(cls) -> "RouteDecision":
+        return cls(tool="none", arguments={})
@@ -3,4 +3,8 @@ from typing import Optional, Dict
 
 class ToolDecision(BaseModel):
     tool: str
-    arguments: Optional[Dict] = {}
\ No newline at end of file
+    arguments: Optional[Dict] = {}
+
+    @classmethod
+    def fallback(cls) -> "ToolDecision":
+        return cls(tool="none", arguments={})
@@ -0,0 +1,109 @@
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from core import answer_cache
+from core.answer_cache import AnswerCache
+
+QUESTION = "Какие суды были у компании с ИНН 7707083893?"
+ANSWER = {"tool_decision": {"tool": "get_company_full_profile"}, "agent2_response": {"answer_markdown": "..."}}
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """A controllable time.monotonic for the cache module."""
+    now = [1000.0]
+    monkeypatch.setattr(answer_cache.time, "monotonic", lambda: now[0])
+    return now
+
+
+class TestLookup:
+
+    def test_exact_hit_ignores_case_and_punctuation(self):
+        cache = AnswerCache()
+        cache.put(QUESTION, ANSWER)
+        assert cache.get("какие суды были у компании с инн 7707083893") is ANSWER
+        assert cache.stats.semantic_hits == 0
+
+    def test_near_duplicate_above_the_threshold_hits(self):
+        cache = AnswerCache(threshold=0.9)
+        cache.put(QUESTION, ANSWER)
+        assert cache.get("Какие суды у компании с ИНН 7707083893?") is ANSWER
+        assert cache.stats.semantic_hits == 1
+
+    def test_different_question_below_the_threshold_misses(self):
+        cache = AnswerCache(threshold=0.9)
+        cache.put(QUESTION, ANSWER)
+        assert cache.get("Кто директор компании с ИНН 7707083893?") is None
+
+    def test_threshold_decides_the_same_pair(self):
+        near = "Какие суды у компании с ИНН 7707083893?"
+        strict = AnswerCache(threshold=0.99)
+        strict.put(QUESTION, ANSWER)
+        assert strict.get(near) is None
+
+    def test_numbers_must_match(self):
+        # textually almost identical, but a different INN
+        cache = AnswerCache(threshold=0.5)
+        cache.put(QUESTION, ANSWER)
+        assert cache.get("Какие суды были у компании с ИНН 7707083894?") is None
+        assert cache.get("Какие суды были у компании с ИНН?") is None
+
+    def test_empty_question_is_not_stored(self):
+        cache = AnswerCache()
+        cache.put("?!", ANSWER)
+        assert len(cache.entries) == 0
+        assert cache.get("?!") is None
+
+
+class TestExpiryAndEviction:
+
+    def test_entry_expires_after_ttl(self, clock):
+        cache = AnswerCache(ttl=60)
+        cache.put(QUESTION, ANSWER)
+
+        clock[0] += 59
+        assert cache.get(QUESTION) is ANSWER
+        clock[0] += 1
+        assert cache.get(QUESTION) is None
+        assert cache.stats.expirations == 1
+        assert len(cache.entries) == 0
+
+    def test_least_recently_used_is_evicted(self):
+        cache = AnswerCache(max_size=2)
+        cache.put("Что такое неустойка?", {"answer": 1})
+        cache.put("Как расторгнуть договор аренды?", {"answer": 2})
+        # a hit makes the first entry the most recently used
+        assert cache.get("Что такое неустойка?") == {"answer": 1}
+
+        cache.put("Кто директор компании с ИНН 7707083893?", {"answer": 3})
+
+        assert cache.get("Как расторгнуть договор аренды?") is None
+        assert cache.get("Что такое неустойка?") == {"answer": 1}
+        assert cache.stats.evictions == 1
+        assert len(cache.entries) == 2
+
+
+class TestStats:
+
+    def test_counters_behind_cache_stats(self):
+        cache = AnswerCache(max_size=10)
+        assert cache.stats_dict()["hit_rate"] == 0.0
+
+        cache.put(QUESTION, ANSWER)
+        cache.get(QUESTION)
+        cache.get("Какие суды у компании с ИНН 7707083893?")
+        cache.get("Что такое неустойка?")
+
+        assert cache.stats_dict() == {
+            "hits": 2,
+            "semantic_hits": 1,
+            "misses": 1,
+            "evictions": 0,
+            "expirations": 0,
+            "hit_rate": 0.6667,
+            "size": 1,
+            "max_size": 10,
+        }
@@ -0,0 +1,182 @@
+import json
+import os
+import sys
+import httpx
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from core import http_client
+from core.agent import Agent
+from core.http_client import close_http_client, get_http_client
+from core.llm_client import LLMClient
+from core.mcp_client import MCPClient
+from model.mode_decision import ModeDecision
+from model.route_decision import RouteDecision
+
+AGENT_LAW_DIR = os.path.join(os.path.dirname(__file__), '..')
+COMPANY_INN = "7707083893"
+
+
+def completion(content: str) -> dict:
+    return {"choices": [{"message": {"role": "assistant", "content": content}}]}
+
+
+class Upstreams:
+    """LLM, MCP and Agent 2 behind one mock transport, recording every request."""
+
+    def __init__(self):
+        self.llm_contents = []
+        self.llm_status = 200
+        self.llm_body = None  # replaces the completion when set
+        self.requests = []
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        if request.url.host == "llm.test":
+            if self.llm_status != 200:
+                return httpx.Response(self.llm_status)
+            if self.llm_body is not None:
+                return httpx.Response(200, json=self.llm_body)
+            return httpx.Response(200, json=completion(self.llm_contents.pop(0)))
+        if request.url.host == "mcp.test":
+            return httpx.Response(200, json={"inn": COMPANY_INN, "short_name": "ПАО СБЕРБАНК"})
+        body = json.loads(request.content)
+        return httpx.Response(200, json={"mode_used": body["mode"], "answer_markdown": "ok", "meta": {}})
+
+    def hosts(self):
+        return [request.url.host for request in self.requests]
+
+
+@pytest.fixture
+def upstreams(monkeypatch):
+    monkeypatch.setenv("BASE_URL", "http://llm.test/v1")
+    monkeypatch.setenv("MCP_BASE_URL", "http://mcp.test")
+    monkeypatch.setenv("API_2_URL", "http://agent2.test")
+    upstreams = Upstreams()
+    shared = httpx.AsyncClient(transport=httpx.MockTransport(upstreams.handler))
+    monkeypatch.setattr(http_client, "_client", shared)
+    upstreams.shared = shared
+    return upstreams
+
+
+class TestSharedHttpClient:
+
+    @pytest.mark.asyncio
+    async def test_one_client_until_closed(self, monkeypatch):
+        monkeypatch.setattr(http_client, "_client", None)
+        client = get_http_client()
+        assert get_http_client() is client
+
+        await close_http_client()
+        assert client.is_closed
+        replacement = get_http_client()
+        assert replacement is not client
+        await close_http_client()
+
+    @pytest.mark.asyncio
+    async def test_llm_and_mcp_calls_share_the_client(self, upstreams):
+        upstreams.llm_contents = [json.dumps({"tool": "none"})]
+        await LLMClient().call("вопрос", "system", RouteDecision)
+        await MCPClient().call_tool("search_entity", {"query": "сбербанк"})
+
+        assert upstreams.hosts() == ["llm.test", "mcp.test"]
+        assert get_http_client() is upstreams.shared
+
+    @pytest.mark.asyncio
+    async def test_lifespan_closes_the_client(self, monkeypatch):
+        monkeypatch.chdir(AGENT_LAW_DIR)
+        monkeypatch.setenv("BASE_URL", "http://llm.test/v1")
+        monkeypatch.setenv("API_2_URL", "http://agent2.test")
+        monkeypatch.setattr(http_client, "_client", None)
+        import main
+        # the real one would shut down the tracer shared by the whole test run
+        shutdowns = []
+        monkeypatch.setattr(main, "shutdown_tracing", lambda: shutdowns.append(True))
+
+        async with main.lifespan(main.app):
+            client = get_http_client()
+            assert not client.is_closed
+        assert client.is_closed
+        assert http_client._client is None
+        assert shutdowns == [True]
+
+
+class TestLLMClient:
+
+    @pytest.mark.asyncio
+    async def test_combined_router_answer_is_parsed(self, upstreams):
+        upstreams.llm_contents = [json.dumps({
+            "tool": "get_company_full_profile", "arguments": {"inn": COMPANY_INN}, "mode": "draft",
+        })]
+        decision = await LLMClient().call("ИНН 7707083893 составь претензию", "router", RouteDecision)
+
+        assert decision == RouteDecision(tool="get_company_full_profile", arguments={"inn": COMPANY_INN}, mode="draft")
+        sent = json.loads(upstreams.requests[0].content)
+        assert sent["messages"][0] == {"role": "system", "content": "router"}
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("content", [
+        "Sure! The tool is get_company_full_profile.",
+        json.dumps({"arguments": {"inn": COMPANY_INN}}),
+        json.dumps(["get_company_full_profile"]),
+    ])
+    async def test_malformed_output_falls_back(self, upstreams, content):
+        upstreams.llm_contents = [content]
+        assert await LLMClient().call("вопрос", "router", RouteDecision) == RouteDecision.fallback()
+
+    @pytest.mark.asyncio
+    async def test_response_without_choices_falls_back(self, upstreams):
+        upstreams.llm_body = {"error": "busy"}
+        assert await LLMClient().call("вопрос", "mode", ModeDecision) == ModeDecision(mode="pipeline")
+
+    @pytest.mark.asyncio
+    async def test_payment_required_falls_back_and_server_errors_raise(self, upstreams):
+        upstreams.llm_status = 402
+        assert await LLMClient().call("вопрос", "router", RouteDecision) == RouteDecision.fallback()
+
+        upstreams.llm_status = 500
+        with pytest.raises(httpx.HTTPStatusError):
+            await LLMClient().call("вопрос", "router", RouteDecision)
+
+
+class TestAgentRouting:
+
+    @pytest.fixture
+    def agent(self, upstreams, monkeypatch):
+        monkeypatch.chdir(AGENT_LAW_DIR)
+        monkeypatch.setenv("FAST_ROUTER_ENABLED", "0")
+        monkeypatch.setenv("ROUTER_MODE", "single")
+        return Agent(LLMClient(), MCPClient())
+
+    @pytest.mark.asyncio
+    async def test_single_router_call_picks_tool_and_mode(self, agent, upstreams):
+        upstreams.llm_contents = [json.dumps({
+            "tool": "get_company_full_profile", "arguments": {"inn": COMPANY_INN}, "mode": "draft",
+        })]
+        result = await agent.generate("Составь претензию компании 7707083893")
+
+        # one LLM call: the provisional mode holds because the MCP call succeeded
+        assert upstreams.hosts() == ["llm.test", "mcp.test", "agent2.test"]
+        assert result["tool"] == "get_company_full_profile"
+        assert result["agent2_mode"] == "draft"
+        assert result["agent2_response"]["mode_used"] == "draft"
+
+    @pytest.mark.asyncio
+    async def test_invalid_router_mode_is_rechecked(self, agent, upstreams):
+        upstreams.llm_contents = [
+            json.dumps({"tool": "get_company_full_profile", "arguments": {"inn": COMPANY_INN}, "mode": "poem"}),
+            json.dumps({"mode": "explain"}),
+        ]
+        result = await agent.generate("Что известно о компании 7707083893?")
+
+        assert upstreams.hosts() == ["llm.test", "mcp.test", "llm.test", "agent2.test"]
+        assert result["agent2_mode"] == "explain"
+
+    @pytest.mark.asyncio
+    async def test_malformed_router_output_stops_before_mcp(self, agent, upstreams):
+        upstreams.llm_contents = ["I think you should look up the company."]
+        result = await agent.generate("Что известно о компании 7707083893?")
+
+        assert result == {"error": "No suitable MCP tool found."}
+        assert upstreams.hosts() == ["llm.test"]
@@ -0,0 +1,117 @@
+import json
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from core.context_compactor import (
+    ContextCompactor,
+    drop_to_budget,
+    estimate_tokens,
+    keep_latest_years,
+    select_sentences,
+    truncate_lists,
+)
+
+
+def long_text(topic: str, sentences: int = 12) -> str:
+    return " ".join(f"Предложение номер {i} про {topic}. Далее идёт подробное описание." for i in range(sentences))
+
+
+class TestEstimateTokens:
+
+    def test_scripts_and_punctuation(self):
+        assert estimate_tokens("") == 0
+        assert estimate_tokens("contract") == 2
+        assert estimate_tokens("договор") == 3
+        assert estimate_tokens("a, b.") == 4
+
+    def test_errs_on_the_high_side_for_cyrillic(self):
+        assert estimate_tokens("претензия") > estimate_tokens("complaint")
+
+
+class TestJsonCompaction:
+
+    def test_within_budget_is_unchanged(self):
+        summary = json.dumps({"inn": "7707083893", "status": "Действует"}, ensure_ascii=False, indent=2)
+        text, report = ContextCompactor({"draft": 1000}).compact(summary, "draft")
+        assert text == summary
+        assert report.steps == []
+        assert report.estimated_tokens_after == report.estimated_tokens_before
+
+    def test_structural_steps_run_in_order_until_it_fits(self):
+        data = {
+            "inn": "7707083893",
+            "kpp": None,
+            "contacts": {"phones": ["+7 495 500-55-50"] * 5},
+            "founders": [{"name": f"Учредитель {i}"} for i in range(20)],
+        }
+        text, report = ContextCompactor({"draft": 80}).compact(json.dumps(data, ensure_ascii=False), "draft")
+
+        assert report.steps == ["strip_empty", "drop_contacts", "lists_to_5", "lists_to_3"]
+        assert json.loads(text)["founders"][-1] == "... (+17 more)"
+        assert report.estimated_tokens_after <= 80
+
+    def test_fallback_drops_whole_fields_and_keeps_valid_json(self):
+        data = {
+            "inn": "7707083893",
+            "history": long_text("историю компании"),
+            "court_cases": long_text("арбитражные суды"),
+            "licenses": long_text("лицензии"),
+        }
+        text, report = ContextCompactor({"draft": 200}).compact(
+            json.dumps(data, ensure_ascii=False), "draft", "какие арбитражные суды"
+        )
+
+        compacted = json.loads(text)
+        assert "court_cases" in compacted and "inn" in compacted
+        assert "history" not in compacted and "licenses" not in compacted
+        assert "extract_sentences" not in report.steps
+        assert {"drop_history", "drop_licenses"} <= set(report.steps)
+        assert report.estimated_tokens_after <= 200
+
+    def test_top_level_list_drops_trailing_items(self):
+        data, dropped = drop_to_budget([{"n": i} for i in range(50)], 30)
+        assert data == [{"n": i} for i in range(len(data))]
+        assert 0 < len(data) < 50
+        assert dropped == ["items"]
+
+    def test_list_markers_accumulate(self):
+        once = truncate_lists(list(range(10)), 5)
+        assert truncate_lists(once, 3) == [0, 1, 2, "... (+7 more)"]
+
+    def test_latest_years_are_kept(self):
+        financials = {"revenue": {"2020": 1, "2021": 2, "2022": 3, "2023": 4}}
+        assert keep_latest_years(financials, 2) == {"revenue": {"2022": 3, "2023": 4}}
+
+
+class TestTextCompaction:
+
+    def test_sentences_relevant_to_the_query_are_kept_in_order(self):
+        text = "Компания основана в 1991 году. У компании есть долги по налогам. Офис находится в Москве. Налоговые долги растут."
+        selected = select_sentences(text, 20, "долги по налогам")
+        assert selected == "У компании есть долги по налогам."
+
+    def test_plain_text_summary_is_extracted(self):
+        summary = long_text("сведения", 40)
+        text, report = ContextCompactor({"explain": 50}).compact(summary, "explain", "сведения")
+        assert report.steps == ["extract_sentences"]
+        assert estimate_tokens(text) <= 50
+
+
+class TestBudgets:
+
+    def test_from_env(self, monkeypatch):
+        monkeypatch.setenv("CONTEXT_BUDGET_DRAFT", "321")
+        monkeypatch.setenv("CONTEXT_BUDGET_DEFAULT", "77")
+        compactor = ContextCompactor.from_env()
+        assert compactor.budget_for("draft") == 321
+        assert compactor.budget_for("explain") == 1500
+        assert compactor.budget_for(None) == 77
+
+    def test_report_labels_figures_as_estimates(self):
+        _, report = ContextCompactor().compact("текст", "draft")
+        assert set(report.as_dict()) == {
+            "budget", "estimated_tokens_before", "estimated_tokens_after", "bytes_before", "bytes_after", "steps",
+        }
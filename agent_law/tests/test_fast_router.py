@@ -0,0 +1,178 @@
+import json
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from core.agent import Agent
+from core.fast_router import (
+    InvalidIdentifierError,
+    extract_identifiers,
+    fast_route,
+    is_valid_inn,
+    is_valid_ogrn,
+    is_valid_ogrnip,
+)
+from model.mode_decision import ModeDecision
+
+AGENT_LAW_DIR = os.path.join(os.path.dirname(__file__), '..')
+
+COMPANY_INN = "7707083893"
+PERSON_INN = "500100732259"
+OGRN = "1027700132195"
+OGRNIP = "304500111600014"
+# a mobile number (+7 916 123-45-67) that happens to pass the INN checksum
+PHONE_LIKE_INN = "9161234567"
+
+
+class TestChecksums:
+
+    def test_inn10(self):
+        assert is_valid_inn(COMPANY_INN)
+        assert not is_valid_inn("7707083894")
+
+    def test_inn12(self):
+        assert is_valid_inn(PERSON_INN)
+        assert not is_valid_inn("500100732250")
+
+    def test_inn_rejects_other_lengths_and_non_digits(self):
+        assert not is_valid_inn("770708389")
+        assert not is_valid_inn("77070838931")
+        assert not is_valid_inn("77070838a3")
+
+    def test_ogrn(self):
+        assert is_valid_ogrn(OGRN)
+        assert not is_valid_ogrn("1027700132196")
+        assert not is_valid_ogrn(OGRNIP)
+
+    def test_ogrnip(self):
+        assert is_valid_ogrnip(OGRNIP)
+        assert not is_valid_ogrnip("304500111600015")
+        assert not is_valid_ogrnip(OGRN)
+
+
+class TestExtraction:
+
+    def test_labelled_and_bare_identifiers(self):
+        assert extract_identifiers(f"ИНН: {COMPANY_INN}, ОГРН {OGRN}") == [("inn10", COMPANY_INN), ("ogrn", OGRN)]
+        assert extract_identifiers(f"что за компания {COMPANY_INN}?") == [("inn10", COMPANY_INN)]
+
+    def test_repeated_identifier_counted_once(self):
+        assert extract_identifiers(f"ИНН {COMPANY_INN} ({COMPANY_INN})") == [("inn10", COMPANY_INN)]
+
+    def test_invalid_labelled_identifier_raises(self):
+        with pytest.raises(InvalidIdentifierError):
+            extract_identifiers("ИНН 7707083894")
+        with pytest.raises(InvalidIdentifierError):
+            extract_identifiers(f"ОГРН {COMPANY_INN}")
+
+    def test_invalid_bare_number_is_ignored(self):
+        assert extract_identifiers("звоните 89161234567") == []
+        assert extract_identifiers(f"компания {OGRN[:-1]}4") == []
+
+    def test_bare_number_needs_an_entity_context(self):
+        assert is_valid_inn(PHONE_LIKE_INN)
+        assert extract_identifiers(COMPANY_INN) == []
+        assert extract_identifiers(f"сравни {COMPANY_INN} и {PERSON_INN}") == []
+        assert extract_identifiers(f"ООО Ромашка {COMPANY_INN}") == [("inn10", COMPANY_INN)]
+
+    @pytest.mark.parametrize("question", [
+        f"мой телефон {PHONE_LIKE_INN}, проверь компанию",
+        f"позвоните в компанию по номеру +7{PHONE_LIKE_INN}",
+        f"company phone: {PHONE_LIKE_INN}",
+    ])
+    def test_phone_context_ignores_bare_numbers(self, question):
+        assert extract_identifiers(question) == []
+
+    def test_phone_context_keeps_labelled_identifiers(self):
+        assert extract_identifiers(f"ИНН {COMPANY_INN}, тел. {PHONE_LIKE_INN}") == [("inn10", COMPANY_INN)]
+
+    def test_bare_inn_with_bad_checksum_raises_in_entity_context(self):
+        with pytest.raises(InvalidIdentifierError):
+            extract_identifiers("что за компания 7707083894?")
+        with pytest.raises(InvalidIdentifierError):
+            extract_identifiers("проверь ИП 500100732250")
+
+
+class TestFastRoute:
+
+    def test_company_inn_routes_to_company_profile_without_mode(self):
+        decision = fast_route(f"ИНН {COMPANY_INN} составь претензию")
+        assert decision.tool == "get_company_full_profile"
+        assert decision.arguments == {"inn": COMPANY_INN}
+        assert decision.mode is None
+
+    def test_person_inn_routes_to_entrepreneur_profile(self):
+        decision = fast_route(f"проверь ИП {PERSON_INN}")
+        assert decision.tool == "get_entrepreneur_profile"
+        assert decision.arguments == {"inn": PERSON_INN}
+
+    @pytest.mark.parametrize("question", [
+        f"ОГРН {OGRN}",
+        f"ОГРНИП {OGRNIP}",
+        f"сравни {COMPANY_INN} и {PERSON_INN}",
+        "как расторгнуть договор аренды?",
+        f"кто звонил с номера {PHONE_LIKE_INN}?",
+        f"проверь компанию, мой телефон {PHONE_LIKE_INN}",
+    ])
+    def test_left_to_llm_router(self, question):
+        assert fast_route(question) is None
+
+
+class FakeLLM:
+    def __init__(self, mode: str):
+        self.mode = mode
+        self.calls = []
+
+    async def call(self, user_input, system_prompt, response_model=None):
+        self.calls.append(response_model)
+        return ModeDecision(mode=self.mode)
+
+
+class FakeMCP:
+    def __init__(self):
+        self.calls = []
+
+    async def call_tool(self, tool, arguments):
+        self.calls.append((tool, arguments))
+        return json.dumps({"inn": arguments["inn"], "short_name": "ПАО СБЕРБАНК"}, ensure_ascii=False)
+
+
+class TestAgentFastPath:
+
+    @pytest.fixture
+    def agent(self, monkeypatch):
+        monkeypatch.chdir(AGENT_LAW_DIR)
+        monkeypatch.setenv("API_2_URL", "http://agent2.invalid")
+        monkeypatch.setenv("FAST_ROUTER_ENABLED", "1")
+        agent = Agent(FakeLLM("draft"), FakeMCP())
+        agent.compactor = None
+        sent = []
+
+        async def send_to_agent2(payload):
+            sent.append(payload)
+            return {"mode_used": payload["mode"]}
+
+        agent.send_to_agent2 = send_to_agent2
+        agent.sent = sent
+        return agent
+
+    @pytest.mark.asyncio
+    async def test_fast_path_still_selects_mode(self, agent):
+        result = await agent.generate(f"ИНН {COMPANY_INN} составь претензию")
+
+        assert agent.mcp_client.calls == [("get_company_full_profile", {"inn": COMPANY_INN})]
+        # no router call, only the mode selector
+        assert agent.llm_client.calls == [ModeDecision]
+        assert result["agent2_mode"] == "draft"
+        assert agent.sent[0]["mode"] == "draft"
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("question", ["ИНН 7707083894", "что за компания 7707083894?"])
+    async def test_invalid_inn_is_rejected_before_any_call(self, agent, question):
+        result = await agent.generate(question)
+
+        assert "error" in result
+        assert agent.mcp_client.calls == []
+        assert agent.llm_client.calls == []
@@ -0,0 +1,132 @@
+import json
+import os
+import sys
+import httpx
+import pytest
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from core import agent as agent_module, mcp_client
+from core.agent import Agent
+from core.mcp_client import MCPClient
+from core.tracing import TRACING, span
+from telemetry import Tracing
+
+TRACE_ID = "4bf92f3577b34da6a3ce929d0e0e4736"
+INCOMING = f"00-{TRACE_ID}-00f067aa0ba902b7-01"
+
+_exporter = InMemorySpanExporter()
+TRACING.add_exporter(_exporter, batch=False)
+
+
+@pytest.fixture
+def exported():
+    _exporter.clear()
+    return _exporter
+
+
+@pytest.fixture
+def sent_headers(monkeypatch):
+    """Serve every outgoing request from a mock and record its headers."""
+    headers = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        headers.append(request.headers)
+        return httpx.Response(200, json={"mode_used": "explain", "answer_markdown": "ok", "meta": {}})
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(mcp_client, "get_http_client", lambda: client)
+    monkeypatch.setattr(agent_module, "get_http_client", lambda: client)
+    return headers
+
+
+def parse(traceparent: str):
+    version, trace_id, parent_id, flags = traceparent.split("-")
+    return trace_id, parent_id
+
+
+def make_agent() -> Agent:
+    agent = Agent.__new__(Agent)
+    agent.agent_2_url = "http://agent2.test/legal-advisor-and-referral"
+    agent.agent_2_timeout = 5.0
+    agent.agent_2_jobs = False
+    return agent
+
+
+class TestPropagation:
+
+    @pytest.mark.asyncio
+    async def test_mcp_call_continues_the_incoming_trace(self, exported, sent_headers):
+        client = MCPClient()
+        client.base_url = "http://mcp.test"
+        with span("POST /api/user", traceparent=INCOMING):
+            await client.call_tool("search_entity", {"query": "Тюн ит"})
+
+        trace_id, parent_id = parse(sent_headers[0]["traceparent"])
+        spans = {s.name: s for s in exported.get_finished_spans()}
+        call = spans["mcp.call_tool"]
+        assert trace_id == TRACE_ID
+        assert parent_id == f"{call.context.span_id:016x}"
+        assert call.parent.span_id == spans["POST /api/user"].context.span_id
+        assert f"{spans['POST /api/user'].parent.span_id:016x}" == "00f067aa0ba902b7"
+
+    @pytest.mark.asyncio
+    async def test_agent2_call_continues_the_trace_on_the_receiving_side(self, exported, sent_headers):
+        with span("POST /api/user", traceparent=INCOMING):
+            result = await make_agent().send_to_agent2({"mode": "explain", "query": "что такое неустойка?"})
+        assert result["answer_markdown"] == "ok"
+
+        sent = sent_headers[0]["traceparent"]
+        # what Agent 2's request middleware does with the header
+        with span("POST /legal-advisor-and-referral", traceparent=sent):
+            pass
+
+        spans = {s.name: s for s in exported.get_finished_spans()}
+        call, received = spans["agent2.call"], spans["POST /legal-advisor-and-referral"]
+        assert f"{received.context.trace_id:032x}" == TRACE_ID
+        assert received.parent.span_id == call.context.span_id
+
+
+class TestShutdown:
+
+    def test_flushes_and_closes_the_trace_file(self, tmp_path, monkeypatch):
+        path = tmp_path / "spans.jsonl"
+        monkeypatch.setenv("TRACE_FILE", str(path))
+        tracing = Tracing("agent_law_test")
+        with tracing.span("work", items=3):
+            pass
+
+        tracing.shutdown()
+        tracing.shutdown()
+
+        assert tracing._trace_file.closed
+        (line,) = path.read_text(encoding="utf-8").splitlines()
+        assert json.loads(line)["name"] == "work"
+
+
+class TestWithoutExporter:
+
+    @pytest.fixture
+    def tracing(self, monkeypatch):
+        monkeypatch.delenv("TRACE_FILE", raising=False)
+        monkeypatch.delenv("OTEL_EXPORTER_OTLP_ENDPOINT", raising=False)
+        tracing = Tracing("agent_law_test")
+        assert not tracing.recording
+        return tracing
+
+    def test_incoming_trace_is_passed_through(self, tracing):
+        with tracing.span("POST /api/user", traceparent=INCOMING) as request_span:
+            with tracing.span("mcp.call_tool", tool="search_entity") as call_span:
+                call_span.set(**{"http.status_code": 200})
+                headers = tracing.inject({"Content-Type": "application/json"})
+            assert request_span.traceparent() == INCOMING
+
+        assert headers["traceparent"] == INCOMING
+        assert tracing.current_span() is None
+        assert tracing.inject() == {}
+
+    def test_no_trace_without_an_incoming_one(self, tracing):
+        with tracing.span("POST /api/user") as request_span:
+            assert request_span.traceparent() is None
+            assert "traceparent" not in tracing.inject()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Microbenchmarks for the CheckoApiClient hot path, without the network.
+
+Recorded Checko payloads (benchmarks/payloads) are served through an in-memory
+httpx.MockTransport, so a run measures request building, JSON decoding, the
+mapping into models, pydantic validation and model_dump_json. Caching and rate
+limiting are disabled so every operation does the full work.
+
+    python benchmarks/bench.py                    # compare against baseline.json
+    python benchmarks/bench.py --update-baseline  # record a new baseline
+
+A case regresses when ops/sec drops, or peak allocation per operation grows,
+by more than the tolerance. Baselines are machine specific: record them on
+the machine that runs the comparison.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import httpx
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from src.api_client import CheckoApiClient
+
+BENCH_DIR = Path(__file__).resolve().parent
+PAYLOADS_DIR = BENCH_DIR / "payloads"
+BASELINE_PATH = BENCH_DIR / "baseline.json"
+
+# case name -> (payload file, operation)
+CASES = {
+    "company_small": ("company_small.json", "company"),
+    "company_arbitration": ("company_arbitration.json", "company"),
+    "company_many_founders": ("company_many_founders.json", "company"),
+    "search": ("search.json", "search"),
+    "entrepreneur": ("entrepreneur.json", "entrepreneur"),
+}
+
+
+def make_client(payload: bytes) -> CheckoApiClient:
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, content=payload, headers={"Content-Type": "application/json"})
+
+    return CheckoApiClient(
+        checko_key="bench",
+        cache_enabled=False,
+        company_strategy="fallback",
+        transport=httpx.MockTransport(handler),
+    )
+
+
+def make_operation(client: CheckoApiClient, kind: str):
+    if kind == "company":
+        async def operation():
+            profile = await client.get_company_full_profile("7707083893")
+            return profile.model_dump_json()
+    elif kind == "search":
+        async def operation():
+            entities = await client.search_entity("Тюн ит", "org")
+            return [entity.model_dump_json() for entity in entities]
+    else:
+        async def operation():
+            profile = await client.get_entrepreneur_profile("691302447182")
+            return profile.model_dump_json()
+    return operation
+
+
+async def run_case(name: str, min_time: float, alloc_iterations: int) -> dict:
+    payload_file, kind = CASES[name]
+    client = make_client((PAYLOADS_DIR / payload_file).read_bytes())
+    operation = make_operation(client, kind)
+    try:
+        for _ in range(5):
+            await operation()
+
+        iterations = 0
+        started = time.perf_counter()
+        while time.perf_counter() - started < min_time:
+            await operation()
+            iterations += 1
+        elapsed = time.perf_counter() - started
+
+        tracemalloc.start()
+        peaks = []
+        for _ in range(alloc_iterations):
+            tracemalloc.reset_peak()
+            baseline, _ = tracemalloc.get_traced_memory()
+            await operation()
+            _, peak = tracemalloc.get_traced_memory()
+            peaks.append(peak - baseline)
+        tracemalloc.stop()
+    finally:
+        await client.close()
+
+    return {
+        "ops_per_sec": round(iterations / elapsed, 1),
+        "us_per_op": round(elapsed / iterations * 1e6, 1),
+        "peak_alloc_kib": round(sorted(peaks)[len(peaks) // 2] / 1024, 1),
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        if result["ops_per_sec"] < base["ops_per_sec"] * (1 - tolerance):
+            regressions.append(f"{name}: {result['ops_per_sec']} ops/s < baseline {base['ops_per_sec']}")
+        if result["peak_alloc_kib"] > base["peak_alloc_kib"] * (1 + tolerance):
+            regressions.append(f"{name}: {result['peak_alloc_kib']} KiB/op > baseline {base['peak_alloc_kib']}")
+    return regressions
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="CheckoApiClient microbenchmarks")
+    parser.add_argument("cases", nargs="*", default=list(CASES), help="cases to run (default: all)")
+    parser.add_argument("--min-time", type=float, default=1.0, help="seconds of timed work per case")
+    parser.add_argument("--alloc-iterations", type=int, default=20)
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative regression")
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args()
+
+    results = {}
+    print(f"{'case':<24}{'ops/sec':>12}{'us/op':>12}{'KiB/op':>12}")
+    for name in args.cases:
+        result = await run_case(name, args.min_time, args.alloc_iterations)
+        results[name] = result
+        print(f"{name:<24}{result['ops_per_sec']:>12}{result['us_per_op']:>12}{result['peak_alloc_kib']:>12}")
+
+    baseline = json.loads(BASELINE_PATH.read_text()) if BASELINE_PATH.exists() else {}
+    if args.update_baseline:
+        baseline.update(results)
+        BASELINE_PATH.write_text(json.dumps(baseline, indent=2) + "\n")
+        print(f"Baseline written to {BASELINE_PATH}")
+        return 0
+
+    regressions = compare(results, baseline, args.tolerance)
+    for line in regressions:
+        print(f"REGRESSION {line}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -1,5 +1,7 @@
+import asyncio
 import logging
-from typing import Any, Dict, List, Optional
+import time
+from typing import Any, Dict, List, Optional, Tuple
 
 import httpx
 from pydantic import ValidationError
@@ -11,26 +13,223 @@ from models import (
     CompanyFinancials,
     LegalRisks,
 )
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+from hedging import LatencyTracker
+from metrics import (
+    COMPANY_LOOKUPS,
+    DADATA_FALLBACKS,
+    UPSTREAM_ERRORS,
+    UPSTREAM_IN_FLIGHT,
+    UPSTREAM_LATENCY,
+    VALIDATION_ERRORS,
+    TrackedTransport,
+)
+from rate_limit import ApiKeyPool, TokenBucket, parse_retry_after
+from registry_index import RegistryIndex
+from response_cache import CachePolicy, ResponseCache, WithPolicy, make_cache_key, unwrap
+from single_flight import SingleFlight
+from tracing import span
 
 logger = logging.getLogger(__name__)
 
 
+class EntityNotFoundError(ValueError):
+    """Raised when the upstream registry has no record for the requested INN."""
+
+
+class UpstreamUnavailableError(RuntimeError):
+    """Raised when neither Checko nor DaData could answer (result must not be cached)."""
+
+
+DEFAULT_CACHE_POLICIES: Dict[str, CachePolicy] = {
+    # Registry data changes rarely: serve fresh for hours, stale for a day while refreshing.
+    "search": CachePolicy(ttl=15 * 60, stale_ttl=60 * 60, negative_ttl=5 * 60),
+    "company": CachePolicy(ttl=6 * 60 * 60, stale_ttl=24 * 60 * 60, negative_ttl=30 * 60),
+    # DaData answers lack financials, founders and legal risks: retry Checko soon.
+    "company_dadata": CachePolicy(ttl=5 * 60),
+    "entrepreneur": CachePolicy(ttl=6 * 60 * 60, stale_ttl=24 * 60 * 60, negative_ttl=30 * 60),
+}
+
+COMPANY_STRATEGIES = ("fallback", "hedge", "race")
+
+CHECKO_BREAKERS = {
+    "/search": "checko_search",
+    "/company": "checko_company",
+    "/entrepreneur": "checko_entrepreneur",
+}
+
+
+# httpx's defaults, spelled out so the pool metrics know the connection limit
+HTTP_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=20)
+
+CHECKO_BASE_URL = "https://api.checko.ru/v2"
+DADATA_BASE_URL = "https://suggestions.dadata.ru/suggestions/api/4_1/rs/findById/party"
+
+
+def _as_key_list(keys: str | List[str] | None) -> List[str]:
+    """Accept a single key, a comma-separated string of keys or a list of keys."""
+    if not keys:
+        return []
+    if isinstance(keys, str):
+        keys = keys.split(",")
+    return [key.strip() for key in keys if key and key.strip()]
+
+
 class CheckoApiClient:
     """Asynchronous API client for retrieving company and entrepreneur information from Checko.ru or DaData as fallback."""
 
-    def __init__(self, checko_key: str | None = None, dadata_key: str | None = None):
-        self.checko_key = checko_key
-        self.dadata_key = dadata_key
-        self.checko_base = "https://api.checko.ru/v2"
-        self.dadata_base = "https://suggestions.dadata.ru/suggestions/api/4_1/rs/findById/party"
-        self.client = httpx.AsyncClient(timeout=10.0)
+    def __init__(
+        self,
+        checko_key: str | List[str] | None = None,
+        dadata_key: str | List[str] | None = None,
+        cache_enabled: bool = True,
+        cache_max_size: int = 2048,
+        cache_policies: Dict[str, CachePolicy] | None = None,
+        company_strategy: str = "hedge",
+        checko_latency: LatencyTracker | None = None,
+        checko_rate: float | None = None,
+        dadata_rate: float | None = None,
+        checko_daily_limit: int | None = None,
+        dadata_daily_limit: int | None = None,
+        rate_limit_retries: int = 2,
+        rate_limit_max_wait: float = 30.0,
+        breaker_settings: Dict[str, Any] | None = None,
+        local_index: RegistryIndex | None = None,
+        transport: httpx.AsyncBaseTransport | None = None,
+        checko_base: str | None = None,
+        dadata_base: str | None = None,
+    ):
+        self.checko_keys = ApiKeyPool(_as_key_list(checko_key), checko_daily_limit, rate_limit_max_wait)
+        self.dadata_keys = ApiKeyPool(_as_key_list(dadata_key), dadata_daily_limit, rate_limit_max_wait)
+        self.checko_key = self.checko_keys.keys[0].key if self.checko_keys else None
+        self.dadata_key = self.dadata_keys.keys[0].key if self.dadata_keys else None
+        self.checko_bucket = TokenBucket(checko_rate)
+        self.dadata_bucket = TokenBucket(dadata_rate)
+        self.rate_limit_retries = rate_limit_retries
+        self.local_index = local_index
+        self.breakers: Dict[str, CircuitBreaker] = {
+            name: CircuitBreaker(name, **(breaker_settings or {}))
+            for name in (*CHECKO_BREAKERS.values(), "dadata")
+        }
+        self.checko_base = (checko_base or CHECKO_BASE_URL).rstrip("/")
+        self.dadata_base = dadata_base or DADATA_BASE_URL
+        # transport is for tests/benchmarks (e.g. httpx.MockTransport)
+        self.transport = (
+            TrackedTransport(transport) if transport is not None
+            else TrackedTransport(httpx.AsyncHTTPTransport(limits=HTTP_LIMITS), HTTP_LIMITS.max_connections)
+        )
+        self.client = httpx.AsyncClient(timeout=10.0, transport=self.transport)
+        self.cache_policies = {**DEFAULT_CACHE_POLICIES, **(cache_policies or {})}
+        self.cache: ResponseCache | None = (
+            ResponseCache(max_size=cache_max_size, negative_exceptions=(EntityNotFoundError,))
+            if cache_enabled else None
+        )
+        self.inflight = SingleFlight()
+        self.company_strategy = company_strategy
+        self.checko_latency = checko_latency or LatencyTracker()
 
     async def close(self):
         """Close the HTTP client."""
+        if self.local_index:
+            self.local_index.close()
+        if self.cache:
+            await self.cache.close()
         await self.client.aclose()
 
+    def quota_usage(self) -> Dict[str, Any]:
+        """Per-upstream request counters and remaining daily quota of each API key."""
+        return {
+            "checko": {"rate": self.checko_bucket.rate, "keys": self.checko_keys.usage()},
+            "dadata": {"rate": self.dadata_bucket.rate, "keys": self.dadata_keys.usage()},
+        }
+
+    def circuit_states(self) -> Dict[str, Dict[str, Any]]:
+        return {name: breaker.as_dict() for name, breaker in self.breakers.items()}
+
+    async def _guarded(self, breaker: CircuitBreaker, call, acquire=None):
+        """Run one upstream HTTP call through its circuit breaker.
+
+        The breaker is checked before `acquire` (the rate-limit wait), so an
+        open circuit fails fast without taking a token or a key slot. Transport
+        errors, timeouts and 5xx responses count as failures; other responses
+        (including 4xx) show the upstream is healthy."""
+        upstream = breaker.name
+        with span(f"upstream.{upstream}", breaker_state=breaker.state) as trace:
+            try:
+                breaker.before_call()
+            except CircuitOpenError:
+                UPSTREAM_ERRORS.inc(upstream=upstream, reason="circuit_open")
+                raise
+            if acquire is not None:
+                try:
+                    await acquire()
+                except BaseException:
+                    breaker.release()
+                    raise
+            started = time.monotonic()
+            try:
+                with UPSTREAM_IN_FLIGHT.track_in_progress(upstream=upstream):
+                    response = await call()
+            except asyncio.CancelledError:
+                breaker.release()
+                raise
+            except Exception:
+                elapsed = time.monotonic() - started
+                breaker.record_failure(elapsed)
+                UPSTREAM_LATENCY.observe(elapsed, upstream=upstream, status="error")
+                UPSTREAM_ERRORS.inc(upstream=upstream, reason="transport")
+                raise
+            elapsed = time.monotonic() - started
+            UPSTREAM_LATENCY.observe(elapsed, upstream=upstream, status=response.status_code)
+            trace.set(**{"http.status_code": response.status_code, "response.bytes": len(response.content)})
+            if response.status_code in range(500, 600):
+                trace.status = "error"
+                UPSTREAM_ERRORS.inc(upstream=upstream, reason="http_5xx")
+                breaker.record_failure(elapsed)
+            else:
+                if response.status_code == 429:
+                    UPSTREAM_ERRORS.inc(upstream=upstream, reason="http_429")
+                breaker.record_success(elapsed)
+            return response
+
+    async def _send_limited(
+        self, upstream: str, breaker: CircuitBreaker, bucket: TokenBucket, keys: ApiKeyPool, send,
+    ):
+        """Send a request through the upstream's circuit breaker and within its
+        rate limit, rotating API keys on 429. `send(key)` makes the HTTP call.
+
+        Returns the response and the key state it was sent with."""
+        for attempt in range(self.rate_limit_retries + 1):
+            key_state = None
+
+            async def acquire():
+                nonlocal key_state
+                key_state = await keys.acquire()
+                await bucket.acquire()
+
+            response = await self._guarded(breaker, lambda: send(key_state.key), acquire)
+            keys.record_use(key_state)
+            if response.status_code != 429 or attempt == self.rate_limit_retries:
+                return response, key_state
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            logger.warning(f"{upstream} rate limited (429), retry after {retry_after:.1f}s.")
+            keys.record_rejected(key_state, retry_after)
+
+    async def _cached(self, endpoint: str, params: Dict[str, Any], fetch):
+        """Serve an upstream lookup through the response cache (if enabled).
+
+        Cache misses and background refreshes are coalesced, so concurrent
+        identical lookups share a single upstream call."""
+        key = make_cache_key(endpoint, params)
+
+        def coalesced():
+            return self.inflight.do(key, fetch)
+
+        if self.cache is None:
+            return unwrap(await coalesced())
+        return await self.cache.get_or_fetch(key, coalesced, self.cache_policies[endpoint])
+
     def _extract_company_financials(self, fin_data: Dict[str, Any]) -> Optional[CompanyFinancials]:
-        from .models import CompanyFinancials
         if not fin_data:
             return None
         return CompanyFinancials(
@@ -39,7 +238,6 @@ class CheckoApiClient:
         )
 
     def _extract_company_legal_risks(self, data: Dict[str, Any]) -> Optional[LegalRisks]:
-        from .models import LegalRisks
         arb = data.get('Арбитраж')
         bloc = data.get('Блокировка')
         if not arb and not bloc:
@@ -52,31 +250,69 @@ class CheckoApiClient:
 
     async def _request_checko(self, endpoint: str, params: Dict[str, Any]) -> Dict[str, Any]:
         """Make request to Checko API."""
-        if not self.checko_key:
+        if not self.checko_keys:
             raise ValueError("Checko API key required")
         url = f"{self.checko_base}{endpoint}"
-        params = params.copy()
-        params['key'] = self.checko_key
-        response = await self.client.get(url, params=params)
+        breaker = self.breakers[CHECKO_BREAKERS.get(endpoint, "checko_company")]
+
+        def send(key: str):
+            return self.client.get(url, params={**params, 'key': key})
+
+        response, key_state = await self._send_limited(
+            "Checko", breaker, self.checko_bucket, self.checko_keys, send,
+        )
         response.raise_for_status()
-        return response.json()
+        data = response.json()
+        meta = data.get('meta') if isinstance(data, dict) else None
+        if isinstance(meta, dict) and isinstance(meta.get('today_request_count'), int):
+            self.checko_keys.record_use(key_state, used_today=meta['today_request_count'])
+        return data
 
     async def _request_dadata(self, inn: str) -> Dict[str, Any]:
         """Make request to DaData API for company by INN."""
-        if not self.dadata_key:
+        # Search and company-profile fallbacks for the same INN share one call.
+        return await self.inflight.do(("dadata", inn), lambda: self._fetch_dadata(inn))
+
+    async def _fetch_dadata(self, inn: str) -> Dict[str, Any]:
+        if not self.dadata_keys:
             raise ValueError("DaData API key required")
-        headers = {"Authorization": f"Token {self.dadata_key}"}
         payload = {"query": inn}
-        response = await self.client.post(self.dadata_base, headers=headers, json=payload)
+
+        def send(key: str):
+            return self.client.post(self.dadata_base, headers={"Authorization": f"Token {key}"}, json=payload)
+
+        response, _ = await self._send_limited(
+            "DaData", self.breakers["dadata"], self.dadata_bucket, self.dadata_keys, send,
+        )
         response.raise_for_status()
         data = response.json()
         suggestions = data.get("suggestions", [])
         if not suggestions:
-            raise ValueError(f"No company found for INN {inn}")
+            raise EntityNotFoundError(f"No company found for INN {inn}")
         return {"data": suggestions[0].get("data", {})}
 
     async def search_entity(self, query: str, obj: str) -> List[SearchEntity]:
-        """Search for companies and entrepreneurs by name or INN."""
+        """Search for companies and entrepreneurs by name or INN.
+
+        The offline registry index (if configured) answers first; Checko/DaData
+        are only queried on a local miss."""
+        if self.local_index is not None:
+            try:
+                # SQLite is synchronous: keep the lookup off the event loop
+                entities = await asyncio.to_thread(self.local_index.search, query, obj)
+                if entities:
+                    return entities
+            except Exception as e:
+                logger.warning(f"Local registry index search failed: {e}")
+        try:
+            return await self._cached(
+                "search", {"query": query, "obj": obj},
+                lambda: self._fetch_search_entity(query, obj),
+            )
+        except UpstreamUnavailableError:
+            return []
+
+    async def _fetch_search_entity(self, query: str, obj: str) -> List[SearchEntity]:
         try:
             params = {"query": query, "obj": obj, "by": "name"}
             data = await self._request_checko("/search", params)
@@ -84,6 +320,7 @@ class CheckoApiClient:
         except Exception as e:
             logger.warning(f"Checko search failed: {e}. Trying DaData.")
             if query.isdigit() and len(query) in [10, 12]:
+                DADATA_FALLBACKS.inc(operation="search", reason="checko_error")
                 try:
                     dadata_data = await self._request_dadata(query)
                     d_data = dadata_data["data"]
@@ -96,11 +333,14 @@ class CheckoApiClient:
                         "ОГРНИП": d_data.get("ogrn"),
                         "РегионКод": d_data.get("address", {}).get("data", {}).get("region_iso_code") or "Unknown"
                     }]
-                except Exception as e2:
+                except EntityNotFoundError as e2:
                     logger.warning(f"DaData fallback failed: {e2}")
                     results = []
+                except Exception as e2:
+                    logger.warning(f"DaData fallback failed: {e2}")
+                    raise UpstreamUnavailableError(str(e2)) from e2
             else:
-                results = []
+                raise UpstreamUnavailableError(str(e)) from e
 
         entities = []
         for item in results:
@@ -116,65 +356,179 @@ class CheckoApiClient:
                 region = item.get('РегионКод')
 
                 if not title or not inn:
+                    VALIDATION_ERRORS.inc(operation="search", reason="missing_fields")
                     continue
 
                 entity = SearchEntity(title=title, inn=inn, ogrn=ogrn, region=region)
                 entities.append(entity)
             except ValidationError as e:
+                VALIDATION_ERRORS.inc(operation="search", reason="invalid")
                 logger.warning(f"Invalid search result data: {e}")
         return entities
 
-    async def get_company_full_profile(self, inn: str) -> CompanyProfile:
-        """Get full company profile by INN."""
+    async def get_company_full_profile(self, inn: str, strategy: str | None = None) -> CompanyProfile:
+        """Get full company profile by INN.
+
+        strategy: "fallback" (DaData only after Checko fails), "hedge" (also
+        fire DaData once Checko is slower than its recent p95) or "race"
+        (fire both at once). Defaults to the client's company_strategy.
+        A profile answered by DaData is cached under the short "company_dadata"
+        policy, so the next lookup soon tries Checko for the full profile again."""
+
+        async def fetch():
+            profile, source = await self._fetch_company_full_profile(inn, strategy or self.company_strategy)
+            if source == "dadata":
+                return WithPolicy(profile, self.cache_policies["company_dadata"])
+            return profile
+
+        return await self._cached("company", {"inn": inn}, fetch)
+
+    async def get_company_profiles_batch(
+        self,
+        inns: List[str],
+        max_concurrency: int = 10,
+    ) -> Dict[str, CompanyProfile | Exception]:
+        """Get company profiles for many INNs with at most max_concurrency lookups in flight.
+
+        INNs are stripped and de-duplicated (order preserved). Failed lookups are
+        returned as the exception instead of failing the whole batch."""
+        unique_inns = list(dict.fromkeys(inn.strip() for inn in inns if inn and inn.strip()))
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+        async def fetch_one(inn: str):
+            async with semaphore:
+                try:
+                    return inn, await self.get_company_full_profile(inn)
+                except Exception as e:
+                    return inn, e
+
+        return dict(await asyncio.gather(*(fetch_one(inn) for inn in unique_inns)))
+
+    async def _fetch_company_full_profile(self, inn: str, strategy: str) -> Tuple[CompanyProfile, str]:
+        if strategy not in COMPANY_STRATEGIES:
+            raise ValueError(f"Unknown strategy '{strategy}'. Valid strategies: {COMPANY_STRATEGIES}")
+
+        fallback_reason = "race"
+        if not self.dadata_key or strategy == "fallback":
+            hedge_delay = None
+        elif strategy == "race":
+            hedge_delay = 0.0
+        else:
+            hedge_delay = self.checko_latency.hedge_delay()
+
+        checko = asyncio.create_task(self._company_from_checko(inn, hedge_delay or 0.0))
+        dadata: asyncio.Task | None = None
+        errors: Dict[str, Exception] = {}
         try:
-            data = await self._request_checko("/company", {"inn": inn})
-            d = data.get('data', data)
-            profile = CompanyProfile(
-                inn=inn,
-                ogrn=d.get('ogrn') or d.get('ОГРН'),
-                kpp=d.get('kpp'),
-                short_name=d.get('short_name') or (d.get('Наим', {}).get('Сокр')) or "Unknown",
-                full_name=d.get('full_name') or (d.get('Наим', {}).get('Полн')) or "Unknown",
-                address=d.get('address') or (d.get('ЮрАдрес', {}).get('АдресРФ')),
-                status=d.get('status') or d.get('Статус') or {},
-                ceo=d.get('ceo') or d.get('Руковод'),
-                founders=d.get('founders') or (d.get('Учред') if isinstance(d.get('Учред'), list) else None),
-                okved=d.get('okved') or (d.get('ОКВЭД', {}).get('Код') if isinstance(d.get('ОКВЭД'), dict) else d.get('ОКВЭД') or "Unknown"),
-                financials=self._extract_company_financials(d.get('ФинПоказ', {})),
-                legal_risks=self._extract_company_legal_risks(d),
-                contacts=d.get('contacts') or d.get('Контакты'),
-            )
-        except Exception as e:
-            logger.warning(f"Checko company request failed: {e}. Trying DaData.")
-            try:
-                dadata_data = await self._request_dadata(inn)
-                ddata = dadata_data["data"]
-                profile = CompanyProfile(
-                    inn=inn,
-                    ogrn=ddata.get("ogrn"),
-                    kpp=ddata.get("kpp"),
-                    short_name=ddata.get("name", {}).get("short_with_opf", ""),
-                    full_name=ddata.get("name", {}).get("full_with_opf", ""),
-                    address=ddata.get("address", {}).get("value"),
-                    status={"status": ddata.get("state", {}).get("status", "Unknown")},
-                    ceo=[{"name": ddata.get("management", {}).get("name", "")}] if ddata.get("management", {}).get("name") else None,
-                    okved=ddata.get("okved"),
-                    financials=None,
-                    legal_risks=None,
-                    contacts=None,
-                    founders=None,
-                )
-            except Exception as e2:
-                logger.error(f"Fallback failed: {e2}")
-                raise ValueError("Unable to retrieve company data")
+            pending = {checko}
+            while True:
+                if dadata is None and hedge_delay == 0.0:
+                    DADATA_FALLBACKS.inc(operation="company", reason=fallback_reason)
+                    dadata = asyncio.create_task(self._company_from_dadata(inn))
+                    pending.add(dadata)
+
+                timeout = hedge_delay if dadata is None else None
+                done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+                if not done:
+                    logger.info(f"Checko slower than {hedge_delay:.2f}s for INN {inn}. Hedging with DaData.")
+                    hedge_delay = 0.0
+                    fallback_reason = "hedge"
+                    continue
+
+                for task in done:
+                    source = "checko" if task is checko else "dadata"
+                    if task.exception() is None:
+                        COMPANY_LOOKUPS.inc(source=source)
+                        return task.result(), source
+                    errors[source] = task.exception()
+                    if source == "checko":
+                        logger.warning(f"Checko company request failed: {task.exception()}. Trying DaData.")
+
+                if not pending and dadata is None:
+                    # Checko failed before the hedge fired: fall back right away.
+                    hedge_delay = 0.0
+                    fallback_reason = "checko_error"
+                    continue
+                if not pending:
+                    break
+        finally:
+            for task in (checko, dadata):
+                if task is not None and not task.done():
+                    task.cancel()
+
+        COMPANY_LOOKUPS.inc(source="failed")
+        fallback_error = errors.get("dadata") or errors.get("checko")
+        logger.error(f"Fallback failed: {fallback_error}")
+        if isinstance(fallback_error, EntityNotFoundError):
+            raise EntityNotFoundError(f"Company with INN {inn} not found")
+        raise ValueError("Unable to retrieve company data")
+
+    async def _company_from_checko(self, inn: str, hedge_delay: float = 0.0) -> CompanyProfile:
+        """Checko company lookup whose latency feeds the hedge delay.
 
+        A leg cancelled by a winning hedge was at least `hedge_delay` slow and
+        is recorded with that lower bound; leaving the slow tail out would pull
+        the percentile down until every call hedges. Race legs (no delay) and
+        failures are not recorded."""
+        started = time.monotonic()
+        try:
+            data = await self._request_checko("/company", {"inn": inn})
+        except asyncio.CancelledError:
+            if hedge_delay > 0:
+                self.checko_latency.record(max(time.monotonic() - started, hedge_delay))
+            raise
+        d = data.get('data', data)
+        profile = CompanyProfile(
+            inn=inn,
+            ogrn=d.get('ogrn') or d.get('ОГРН'),
+            kpp=d.get('kpp'),
+            short_name=d.get('short_name') or (d.get('Наим', {}).get('Сокр')) or "Unknown",
+            full_name=d.get('full_name') or (d.get('Наим', {}).get('Полн')) or "Unknown",
+            address=d.get('address') or (d.get('ЮрАдрес', {}).get('АдресРФ')),
+            status=d.get('status') or d.get('Статус') or {},
+            ceo=d.get('ceo') or d.get('Руковод'),
+            founders=d.get('founders') or (d.get('Учред') if isinstance(d.get('Учред'), list) else None),
+            okved=d.get('okved') or (d.get('ОКВЭД', {}).get('Код') if isinstance(d.get('ОКВЭД'), dict) else d.get('ОКВЭД') or "Unknown"),
+            financials=self._extract_company_financials(d.get('ФинПоказ', {})),
+            legal_risks=self._extract_company_legal_risks(d),
+            contacts=d.get('contacts') or d.get('Контакты'),
+        )
+        self.checko_latency.record(time.monotonic() - started)
         return profile
 
+    async def _company_from_dadata(self, inn: str) -> CompanyProfile:
+        dadata_data = await self._request_dadata(inn)
+        ddata = dadata_data["data"]
+        return CompanyProfile(
+            inn=inn,
+            ogrn=ddata.get("ogrn"),
+            kpp=ddata.get("kpp"),
+            short_name=ddata.get("name", {}).get("short_with_opf", ""),
+            full_name=ddata.get("name", {}).get("full_with_opf", ""),
+            address=ddata.get("address", {}).get("value"),
+            status={"status": ddata.get("state", {}).get("status", "Unknown")},
+            ceo=[{"name": ddata.get("management", {}).get("name", "")}] if ddata.get("management", {}).get("name") else None,
+            okved=ddata.get("okved"),
+            financials=None,
+            legal_risks=None,
+            contacts=None,
+            founders=None,
+        )
+
     async def get_entrepreneur_profile(self, inn: str) -> EntrepreneurProfile:
         """Get entrepreneur profile by INN. No DaData fallback as it doesn't support entrepreneurs."""
+        return await self._cached(
+            "entrepreneur", {"inn": inn},
+            lambda: self._fetch_entrepreneur_profile(inn),
+        )
+
+    async def _fetch_entrepreneur_profile(self, inn: str) -> EntrepreneurProfile:
         data = await self._request_checko("/entrepreneur", {"inn": inn})
+        d = data.get('data', data)
+        if not d:
+            raise EntityNotFoundError(f"No entrepreneur found for INN {inn}")
         try:
-            d = data.get('data', data)
             profile = EntrepreneurProfile(
                 inn=inn,
                 ogrnip=d.get('ogrnip') or d.get('ОГРНИП'),
@@ -184,5 +538,6 @@ class CheckoApiClient:
             )
             return profile
         except ValidationError as e:
+            VALIDATION_ERRORS.inc(operation="entrepreneur", reason="invalid")
             logger.error(f"Validation error for entrepreneur profile: {e}")
             raise ValueError("Invalid entrepreneur data")
@@ -0,0 +1,117 @@
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling an upstream whose circuit is open."""
+
+
+class CircuitBreaker:
+    """Closed/open/half-open circuit breaker for one upstream endpoint.
+
+    The circuit opens when, over the last `window` calls (and at least
+    `min_calls`), the share of failed calls reaches `error_rate_threshold` or
+    the share of calls slower than `slow_call_seconds` reaches
+    `slow_rate_threshold`. After `open_seconds` it lets `half_open_max_calls`
+    trial calls through: a success closes it again, a failure re-opens it."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        name: str,
+        window: int = 20,
+        min_calls: int = 5,
+        error_rate_threshold: float = 0.5,
+        slow_call_seconds: Optional[float] = 5.0,
+        slow_rate_threshold: float = 0.8,
+        open_seconds: float = 30.0,
+        half_open_max_calls: int = 1,
+    ):
+        self.name = name
+        self.min_calls = min_calls
+        self.error_rate_threshold = error_rate_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_rate_threshold = slow_rate_threshold
+        self.open_seconds = open_seconds
+        self.half_open_max_calls = half_open_max_calls
+        self._calls: deque = deque(maxlen=window)
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._trial_calls = 0
+        self.stats: Dict[str, int] = {"rejected": 0, "opened": 0}
+
+    @property
+    def state(self) -> str:
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+            self._state = self.HALF_OPEN
+            self._trial_calls = 0
+        return self._state
+
+    def before_call(self) -> None:
+        """Reserve a call slot or raise CircuitOpenError."""
+        state = self.state
+        if state == self.OPEN or (state == self.HALF_OPEN and self._trial_calls >= self.half_open_max_calls):
+            self.stats["rejected"] += 1
+            raise CircuitOpenError(f"Circuit '{self.name}' is open")
+        if state == self.HALF_OPEN:
+            self._trial_calls += 1
+
+    def release(self) -> None:
+        """Give back a reserved slot without recording an outcome (e.g. cancelled call)."""
+        if self._state == self.HALF_OPEN and self._trial_calls > 0:
+            self._trial_calls -= 1
+
+    def record_success(self, latency: float) -> None:
+        slow = self.slow_call_seconds is not None and latency >= self.slow_call_seconds
+        if self._state == self.HALF_OPEN:
+            if slow:
+                self._open()
+            else:
+                self._close()
+            return
+        self._calls.append((False, slow))
+        self._evaluate()
+
+    def record_failure(self, latency: float) -> None:
+        if self._state == self.HALF_OPEN:
+            self._open()
+            return
+        slow = self.slow_call_seconds is not None and latency >= self.slow_call_seconds
+        self._calls.append((True, slow))
+        self._evaluate()
+
+    def as_dict(self) -> Dict[str, Any]:
+        calls = len(self._calls)
+        return {
+            "state": self.state,
+            "calls": calls,
+            "error_rate": sum(failed for failed, _ in self._calls) / calls if calls else 0.0,
+            "slow_rate": sum(slow for _, slow in self._calls) / calls if calls else 0.0,
+            **self.stats,
+        }
+
+    def _evaluate(self) -> None:
+        calls = len(self._calls)
+        if self._state != self.CLOSED or calls < self.min_calls:
+            return
+        error_rate = sum(failed for failed, _ in self._calls) / calls
+        slow_rate = sum(slow for _, slow in self._calls) / calls
+        if error_rate >= self.error_rate_threshold or (
+            self.slow_call_seconds is not None and slow_rate >= self.slow_rate_threshold
+        ):
+            self._open()
+
+    def _open(self) -> None:
+        self._state = self.OPEN
+        self._opened_at = time.monotonic()
+        self._trial_calls = 0
+        self.stats["opened"] += 1
+
+    def _close(self) -> None:
+        self._state = self.CLOSED
+        self._calls.clear()
+        self._trial_calls = 0
@@ -0,0 +1,36 @@
+import math
+from collections import deque
+
+
+class LatencyTracker:
+    """Rolling window of upstream latencies used to pick the hedge delay.
+
+    The hedge fires once the primary request has been running longer than the
+    configured percentile of recent successful calls, so only the slow tail
+    pays for a second upstream request."""
+
+    def __init__(
+        self,
+        percentile: float = 0.95,
+        window: int = 200,
+        min_samples: int = 20,
+        initial_delay: float = 1.0,
+        min_delay: float = 0.1,
+        max_delay: float = 5.0,
+    ):
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.initial_delay = initial_delay
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self._samples: deque = deque(maxlen=window)
+
+    def record(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def hedge_delay(self) -> float:
+        if len(self._samples) < self.min_samples:
+            return self.initial_delay
+        ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, math.ceil(self.percentile * len(ordered)) - 1)
+        return min(self.max_delay, max(self.min_delay, ordered[index]))
@@ -1,15 +1,40 @@
+"""
+Business Intelligence MCP server.
+
+    python src/main.py                                        # stdio (default)
+    MCP_TRANSPORT=http MCP_PORT=8000 python src/main.py       # streamable HTTP
+
+Prometheus metrics are served at GET /metrics. Over HTTP that is the MCP port
+itself; the stdio transport has no HTTP endpoint, so set METRICS_PORT to serve
+/metrics from a separate listener (METRICS_HOST, default 127.0.0.1).
+"""
+
 import asyncio
+import contextlib
+import functools
 import logging
 import os
 import json
 from contextlib import asynccontextmanager
-from typing import Optional
+from typing import List, Optional
 
+import uvicorn
 from dotenv import load_dotenv
 from fastmcp import FastMCP
+from fastmcp.server.dependencies import get_http_headers
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
 
-from api_client import CheckoApiClient
+from api_client import CheckoApiClient, DEFAULT_CACHE_POLICIES
+from hedging import LatencyTracker
+from metrics import CONTENT_TYPE, REGISTRY, TOOL_IN_FLIGHT, TOOL_LATENCY, client_collector, timed
 from models import SearchEntity, CompanyProfile, EntrepreneurProfile
+from registry_index import RegistryIndex
+from response_cache import CachePolicy
+from serialization import build_include, dumps, project
+from tracing import shutdown as shutdown_tracing, span
 
 load_dotenv()
 
@@ -21,25 +46,131 @@ logger = logging.getLogger(__name__)
 
 _client: Optional[CheckoApiClient] = None
 
+BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", "1000"))
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "10"))
+
+MCP_TRANSPORT = os.getenv("MCP_TRANSPORT", "stdio")
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+
+
+def optional_float_env(name: str) -> Optional[float]:
+    value = os.getenv(name)
+    return float(value) if value else None
+
+
+def optional_int_env(name: str) -> Optional[int]:
+    value = os.getenv(name)
+    return int(value) if value else None
+
+
+def cache_policies_from_env() -> dict[str, CachePolicy]:
+    """Per-endpoint cache TTLs, e.g. CACHE_TTL_COMPANY / CACHE_STALE_TTL_COMPANY / CACHE_NEGATIVE_TTL_COMPANY."""
+    policies = {}
+    for endpoint, default in DEFAULT_CACHE_POLICIES.items():
+        suffix = endpoint.upper()
+        policies[endpoint] = CachePolicy(
+            ttl=float(os.getenv(f"CACHE_TTL_{suffix}", default.ttl)),
+            stale_ttl=float(os.getenv(f"CACHE_STALE_TTL_{suffix}", default.stale_ttl)),
+            negative_ttl=float(os.getenv(f"CACHE_NEGATIVE_TTL_{suffix}", default.negative_ttl)),
+        )
+    return policies
+
+
+def breaker_settings_from_env() -> dict:
+    """Circuit breaker thresholds shared by every upstream (Checko endpoints and DaData)."""
+    settings = {
+        "window": optional_int_env("BREAKER_WINDOW"),
+        "min_calls": optional_int_env("BREAKER_MIN_CALLS"),
+        "error_rate_threshold": optional_float_env("BREAKER_ERROR_RATE"),
+        "slow_call_seconds": optional_float_env("BREAKER_SLOW_CALL_SECONDS"),
+        "slow_rate_threshold": optional_float_env("BREAKER_SLOW_RATE"),
+        "open_seconds": optional_float_env("BREAKER_OPEN_SECONDS"),
+    }
+    return {name: value for name, value in settings.items() if value is not None}
+
+
+class MetricsServer(uvicorn.Server):
+    """Standalone /metrics listener for the stdio transport."""
+
+    @contextlib.contextmanager
+    def capture_signals(self):
+        # the MCP server owns SIGINT/SIGTERM; this one is stopped from the lifespan
+        yield
+
+
+def metrics_server(port: int) -> MetricsServer:
+    config = uvicorn.Config(
+        Starlette(routes=[Route("/metrics", metrics_endpoint, methods=["GET"])]),
+        host=METRICS_HOST,
+        port=port,
+        lifespan="off",
+        access_log=False,
+        log_config=None,  # stdout carries the stdio transport: log via the root logger (stderr)
+    )
+    return MetricsServer(config)
+
 
 @asynccontextmanager
 async def lifespan(server: FastMCP):
     """Управление жизненным циклом: инициализация при старте, и очистка при выходе."""
     global _client
+    # Several keys can be given comma-separated; they are rotated by remaining quota.
     checko_key = os.getenv("CHECKO_API_KEY")
     dadata_key = os.getenv("DADATA_API_KEY")
 
     if not checko_key and not dadata_key:
         logger.warning("No API keys found! Functionality will be limited.")
 
+    local_index = None
+    index_path = os.getenv("REGISTRY_INDEX_PATH")
+    if index_path and os.path.exists(index_path):
+        logger.info(f"Opening offline registry index {index_path}...")
+        local_index = RegistryIndex(index_path)
+
     logger.info("Initializing CheckoApiClient...")
-    _client = CheckoApiClient(checko_key=checko_key, dadata_key=dadata_key)
+    _client = CheckoApiClient(
+        checko_key=checko_key,
+        dadata_key=dadata_key,
+        cache_enabled=os.getenv("CACHE_ENABLED", "true").lower() == "true",
+        cache_max_size=int(os.getenv("CACHE_MAX_SIZE", "2048")),
+        cache_policies=cache_policies_from_env(),
+        company_strategy=os.getenv("COMPANY_LOOKUP_STRATEGY", "hedge"),
+        checko_latency=LatencyTracker(
+            percentile=float(os.getenv("HEDGE_PERCENTILE", "0.95")),
+            initial_delay=float(os.getenv("HEDGE_INITIAL_DELAY", "1.0")),
+            min_delay=float(os.getenv("HEDGE_MIN_DELAY", "0.1")),
+            max_delay=float(os.getenv("HEDGE_MAX_DELAY", "5.0")),
+        ),
+        checko_rate=optional_float_env("CHECKO_RATE_LIMIT"),
+        dadata_rate=optional_float_env("DADATA_RATE_LIMIT"),
+        checko_daily_limit=optional_int_env("CHECKO_DAILY_LIMIT"),
+        dadata_daily_limit=optional_int_env("DADATA_DAILY_LIMIT"),
+        breaker_settings=breaker_settings_from_env(),
+        local_index=local_index,
+        checko_base=os.getenv("CHECKO_BASE_URL"),
+        dadata_base=os.getenv("DADATA_BASE_URL"),
+    )
+    collector = client_collector(_client)
+    REGISTRY.add_collector(collector)
+
+    metrics_port = optional_int_env("METRICS_PORT")
+    metrics_task = None
+    if metrics_port and MCP_TRANSPORT == "stdio":
+        metrics = metrics_server(metrics_port)
+        metrics_task = asyncio.create_task(metrics.serve())
+        logger.info(f"Serving /metrics on {METRICS_HOST}:{metrics_port}")
 
     yield
 
+    if metrics_task is not None:
+        metrics.should_exit = True
+        await metrics_task
+    REGISTRY.remove_collector(collector)
+
     logger.info("Closing CheckoApiClient...")
     if _client:
         await _client.close()
+    shutdown_tracing()
 
 
 app = FastMCP(
@@ -55,51 +186,152 @@ def get_client() -> CheckoApiClient:
     return _client
 
 
+def error_payload(error: Exception) -> str:
+    """The JSON a tool returns on failure: {"error": message}."""
+    return json.dumps({"error": str(error)}, ensure_ascii=False)
+
+
+def instrumented_tool(fn):
+    """Run the tool in a span (continuing the caller's trace when it sent a
+    traceparent header) and record its latency and in-flight count."""
+    tool = fn.__name__
+
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        traceparent = get_http_headers().get("traceparent")
+        with (
+            span(f"tool.{tool}", traceparent=traceparent, tool=tool) as trace,
+            TOOL_IN_FLIGHT.track_in_progress(tool=tool),
+            timed(TOOL_LATENCY, tool=tool, outcome="error") as labels,
+        ):
+            result = await fn(*args, **kwargs)
+            trace.set(**{"response.bytes": len(result.encode("utf-8"))})
+            if result.startswith('{"error"'):
+                trace.status = "error"
+            else:
+                labels["outcome"] = "ok"
+            return result
+    return wrapper
+
+
+@app.custom_route("/metrics", methods=["GET"])
+async def metrics_endpoint(request: Request) -> PlainTextResponse:
+    """Prometheus text exposition of tool, upstream, pool, breaker and cache metrics."""
+    return PlainTextResponse(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+
 @app.tool()
-async def search_entity(query: str, obj: str) -> str:
+@instrumented_tool
+async def search_entity(
+    query: str,
+    obj: str,
+    fields: Optional[List[str]] = None,
+    profile_level: Optional[str] = None,
+) -> str:
     """
     Search for companies and entrepreneurs by name or INN. "obj" must be "org" for organisations and "ent" for entrepreneurs.
+    "profile_level" is "basic" (title, inn) or "full" (default); "fields" picks exact fields instead
+    (title, inn, ogrn, region).
     """
     try:
+        include = build_include(SearchEntity, fields, profile_level)
         client = get_client()
         entities = await client.search_entity(query.strip(), obj)
         if entities:
-            data = [entity.model_dump() for entity in entities]
-            return json.dumps(data, ensure_ascii=False, indent=2)
+            return dumps([project(entity, include) for entity in entities])
         else:
             return "[]"
     except Exception as e:
         logger.error(f"Error searching for '{query}': {e}")
-        return f"{{\"error\": \"{str(e)}\"}}"
+        return error_payload(e)
 
 
 @app.tool()
-async def get_company_full_profile(inn: str) -> str:
+@instrumented_tool
+async def get_company_full_profile(
+    inn: str,
+    strategy: Optional[str] = None,
+    fields: Optional[List[str]] = None,
+    profile_level: Optional[str] = None,
+) -> str:
     """
     Get full business intelligence profile of a company by INN.
+    "strategy" is optional: "fallback", "hedge" (default) or "race" for latency-critical callers.
+    "profile_level" is "basic", "standard" or "full" (default); "fields" picks exact fields instead,
+    e.g. ["short_name", "status", "financials.revenue"].
     """
     try:
+        include = build_include(CompanyProfile, fields, profile_level)
         client = get_client()
-        profile = await client.get_company_full_profile(inn.strip())
-        return profile.model_dump_json(indent=2)
+        profile = await client.get_company_full_profile(inn.strip(), strategy=strategy)
+        return dumps(project(profile, include))
     except Exception as e:
         logger.error(f"Error getting company profile for INN '{inn}': {e}")
-        return f"{{\"error\": \"{str(e)}\"}}"
+        return error_payload(e)
+
+
+@app.tool()
+@instrumented_tool
+async def get_company_profiles_batch(
+    inns: List[str],
+    max_concurrency: Optional[int] = None,
+    fields: Optional[List[str]] = None,
+    profile_level: Optional[str] = None,
+) -> str:
+    """
+    Get full profiles for a list of companies by INN (e.g. counterparty screening).
+    Duplicate INNs are looked up once. Returns {"results": {inn: profile}, "errors": {inn: message}}.
+    "fields" / "profile_level" work as in get_company_full_profile.
+    """
+    try:
+        if len(inns) > BATCH_MAX_SIZE:
+            raise ValueError(f"Too many INNs: {len(inns)} (max {BATCH_MAX_SIZE})")
+        concurrency = min(max_concurrency or BATCH_MAX_CONCURRENCY, BATCH_MAX_CONCURRENCY)
+        include = build_include(CompanyProfile, fields, profile_level)
+
+        client = get_client()
+        profiles = await client.get_company_profiles_batch(inns, max_concurrency=concurrency)
+
+        results = {}
+        errors = {}
+        for inn, profile in profiles.items():
+            if isinstance(profile, Exception):
+                errors[inn] = str(profile)
+            else:
+                results[inn] = project(profile, include)
+        return dumps({"results": results, "errors": errors})
+    except Exception as e:
+        logger.error(f"Error getting company profiles batch: {e}")
+        return error_payload(e)
 
 
 @app.tool()
-async def get_entrepreneur_profile(inn: str) -> str:
+@instrumented_tool
+async def get_entrepreneur_profile(
+    inn: str,
+    fields: Optional[List[str]] = None,
+    profile_level: Optional[str] = None,
+) -> str:
     """
     Get profile of an individual entrepreneur (ИП) by INN.
+    "profile_level" is "basic" or "full" (default); "fields" picks exact fields instead.
     """
     try:
+        include = build_include(EntrepreneurProfile, fields, profile_level)
         client = get_client()
         profile = await client.get_entrepreneur_profile(inn.strip())
-        return profile.model_dump_json(indent=2)
+        return dumps(project(profile, include))
     except Exception as e:
         logger.error(f"Error getting entrepreneur profile for INN '{inn}': {e}")
-        return f"{{\"error\": \"{str(e)}\"}}"
+        return error_payload(e)
 
 
 if __name__ == "__main__":
-    app.run()
\ No newline at end of file
+    if MCP_TRANSPORT == "stdio":
+        app.run()
+    else:
+        app.run(
+            transport=MCP_TRANSPORT,
+            host=os.getenv("MCP_HOST", "127.0.0.1"),
+            port=int(os.getenv("MCP_PORT", "8000")),
+        )
\ No newline at end of file
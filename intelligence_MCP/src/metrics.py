@@ -0,0 +1,334 @@
+import math
+import time
+from contextlib import contextmanager
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import httpx
+
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if value == -math.inf:
+        return "-Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in labels.items()) + "}"
+
+
+class Metric:
+    """One metric family with a fixed set of label names."""
+
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], Any] = {}
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> Iterator[Tuple[str, Dict[str, str], float]]:
+        for key, value in self._values.items():
+            yield self.name, dict(zip(self.labelnames, key)), value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        for name, labels, value in self.samples():
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return lines
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+
+class Gauge(Metric):
+    type = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    @contextmanager
+    def track_in_progress(self, **labels) -> Iterator[None]:
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        state = self._values.get(key)
+        if state is None:
+            state = self._values[key] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                state["counts"][i] += 1
+                break
+        state["sum"] += value
+        state["count"] += 1
+
+    def count(self, **labels) -> int:
+        state = self._values.get(self._key(labels))
+        return state["count"] if state else 0
+
+    def samples(self) -> Iterator[Tuple[str, Dict[str, str], float]]:
+        for key, state in self._values.items():
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets, state["counts"]):
+                cumulative += count
+                yield f"{self.name}_bucket", {**labels, "le": _format_value(float(bound))}, cumulative
+            yield f"{self.name}_sum", labels, state["sum"]
+            yield f"{self.name}_count", labels, state["count"]
+
+
+class MetricsRegistry:
+    """Metrics rendered in the Prometheus text exposition format.
+
+    Registered metrics are updated as events happen; collectors are called at
+    scrape time and return freshly filled metrics for state that is cheaper to
+    read than to track (pool usage, circuit states, cache sizes)."""
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._collectors: List[Callable[[], Iterable[Metric]]] = []
+
+    def register(self, metric: Metric) -> Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def add_collector(self, collector: Callable[[], Iterable[Metric]]) -> None:
+        self._collectors.append(collector)
+
+    def remove_collector(self, collector: Callable[[], Iterable[Metric]]) -> None:
+        if collector in self._collectors:
+            self._collectors.remove(collector)
+
+    def collect(self) -> List[Metric]:
+        metrics = list(self._metrics.values())
+        for collector in self._collectors:
+            metrics.extend(collector())
+        return metrics
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self.collect():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+UPSTREAM_LATENCY = REGISTRY.register(Histogram(
+    "mcp_upstream_request_duration_seconds",
+    "Latency of Checko/DaData HTTP calls by upstream endpoint and response status.",
+    ["upstream", "status"],
+))
+UPSTREAM_IN_FLIGHT = REGISTRY.register(Gauge(
+    "mcp_upstream_requests_in_flight",
+    "Checko/DaData HTTP calls currently in flight.",
+    ["upstream"],
+))
+UPSTREAM_ERRORS = REGISTRY.register(Counter(
+    "mcp_upstream_errors_total",
+    "Failed upstream calls by reason (transport, http_5xx, http_429, circuit_open).",
+    ["upstream", "reason"],
+))
+TOOL_LATENCY = REGISTRY.register(Histogram(
+    "mcp_tool_duration_seconds",
+    "Latency of MCP tool calls by outcome.",
+    ["tool", "outcome"],
+))
+TOOL_IN_FLIGHT = REGISTRY.register(Gauge(
+    "mcp_tool_requests_in_flight",
+    "MCP tool calls currently in flight.",
+    ["tool"],
+))
+DADATA_FALLBACKS = REGISTRY.register(Counter(
+    "mcp_dadata_fallbacks_total",
+    "DaData requests made in place of / alongside Checko, by operation and reason (checko_error, hedge, race).",
+    ["operation", "reason"],
+))
+COMPANY_LOOKUPS = REGISTRY.register(Counter(
+    "mcp_company_lookups_total",
+    "Uncached company profile lookups by the source that answered (checko, dadata, failed).",
+    ["source"],
+))
+VALIDATION_ERRORS = REGISTRY.register(Counter(
+    "mcp_validation_errors_total",
+    "Upstream records that failed model validation or lacked required fields.",
+    ["operation", "reason"],
+))
+
+
+@contextmanager
+def timed(histogram: Histogram, **labels) -> Iterator[Dict[str, str]]:
+    """Observe the duration of the block; the block may fill in labels (e.g. the outcome)."""
+    started = time.monotonic()
+    try:
+        yield labels
+    finally:
+        histogram.observe(time.monotonic() - started, **labels)
+
+
+class _ReleaseOnClose(httpx.AsyncByteStream):
+    def __init__(self, stream: httpx.AsyncByteStream, release: Callable[[], None]):
+        self._stream = stream
+        self._release = release
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            self._release()
+
+
+class TrackedTransport(httpx.AsyncBaseTransport):
+    """Transport wrapper that counts requests in flight, from sending until the
+    response is closed, so pool usage is reported without reading the private
+    state of httpx's connection pool.
+
+    With `max_connections` set to the wrapped pool's limit, requests beyond it
+    are the ones waiting for a connection."""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, max_connections: Optional[int] = None):
+        self.transport = transport
+        self.max_connections = max_connections
+        self.in_flight = 0
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.in_flight += 1
+        try:
+            response = await self.transport.handle_async_request(request)
+        except BaseException:
+            self.in_flight -= 1
+            raise
+        if response.is_closed:
+            # already read, e.g. a MockTransport response built from bytes
+            self.in_flight -= 1
+        else:
+            released = False
+
+            def release() -> None:
+                nonlocal released
+                if not released:
+                    released = True
+                    self.in_flight -= 1
+
+            response.stream = _ReleaseOnClose(response.stream, release)
+        return response
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
+
+    def usage(self) -> Dict[str, Optional[int]]:
+        if self.max_connections is None:
+            return {"max_connections": None, "active": self.in_flight, "waiting": 0}
+        active = min(self.in_flight, self.max_connections)
+        return {"max_connections": self.max_connections, "active": active, "waiting": self.in_flight - active}
+
+
+def client_collector(api_client) -> Callable[[], List[Metric]]:
+    """Scrape-time metrics for a CheckoApiClient: HTTP pool, circuit breakers, API key quotas, cache, coalescing."""
+
+    def collect() -> List[Metric]:
+        metrics: List[Metric] = []
+
+        pool = api_client.transport.usage()
+        connections = Gauge("mcp_http_pool_connections", "Connections of the shared httpx client in use.", ["state"])
+        connections.set(pool["active"], state="active")
+        waiting = Gauge("mcp_http_pool_requests_waiting", "Requests waiting for a pooled connection.")
+        waiting.set(pool["waiting"])
+        metrics += [connections, waiting]
+        if pool["max_connections"] is not None:
+            limit = Gauge("mcp_http_pool_max_connections", "Connection limit of the shared httpx client.")
+            limit.set(pool["max_connections"])
+            metrics.append(limit)
+
+        state = Gauge("mcp_circuit_state", "1 for the current state of each circuit breaker.", ["breaker", "state"])
+        rejected = Counter("mcp_circuit_rejected_total", "Calls rejected by an open circuit.", ["breaker"])
+        opened = Counter("mcp_circuit_opened_total", "Times a circuit opened.", ["breaker"])
+        for name, breaker in api_client.breakers.items():
+            current = breaker.state
+            for candidate in (breaker.CLOSED, breaker.OPEN, breaker.HALF_OPEN):
+                state.set(1 if candidate == current else 0, breaker=name, state=candidate)
+            rejected.inc(breaker.stats["rejected"], breaker=name)
+            opened.inc(breaker.stats["opened"], breaker=name)
+        metrics += [state, rejected, opened]
+
+        used = Gauge("mcp_api_key_used_today", "Requests made today with each API key.", ["upstream", "key"])
+        remaining = Gauge("mcp_api_key_remaining", "Remaining daily quota of each API key (+Inf if unlimited).", ["upstream", "key"])
+        for upstream, pool_usage in api_client.quota_usage().items():
+            for index, key in enumerate(pool_usage["keys"]):
+                used.set(key["used_today"], upstream=upstream, key=index)
+                remaining.set(math.inf if key["remaining"] is None else key["remaining"], upstream=upstream, key=index)
+        metrics += [used, remaining]
+
+        if api_client.cache is not None:
+            events = Counter("mcp_cache_events_total", "Response cache events.", ["event"])
+            for event, count in api_client.cache.stats.items():
+                events.inc(count, event=event)
+            entries = Gauge("mcp_cache_entries", "Entries in the response cache.")
+            entries.set(len(api_client.cache))
+            metrics += [events, entries]
+
+        coalescing = Counter("mcp_singleflight_total", "Upstream lookups started vs. coalesced into one in flight.", ["result"])
+        for result, count in api_client.inflight.stats.items():
+            coalescing.inc(count, result=result)
+        inflight = Gauge("mcp_singleflight_in_flight", "Distinct upstream lookups in flight.")
+        inflight.set(len(api_client.inflight))
+        metrics += [coalescing, inflight]
+        return metrics
+
+    return collect
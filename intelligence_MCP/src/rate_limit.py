@@ -0,0 +1,122 @@
+import asyncio
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, List, Optional
+
+
+class RateLimitedError(RuntimeError):
+    """Raised when no API key can be used within the allowed wait time."""
+
+
+def parse_retry_after(value: Optional[str], default: float = 1.0) -> float:
+    """Parse a Retry-After header (delta-seconds or HTTP date) into seconds."""
+    if not value:
+        return default
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return default
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+class TokenBucket:
+    """Async token bucket: at most `rate` requests per second with bursts up to `capacity`.
+
+    rate=None disables limiting."""
+
+    def __init__(self, rate: Optional[float] = None, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate or 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        if not self.rate:
+            return
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+@dataclass
+class ApiKeyState:
+    key: str
+    daily_limit: Optional[int] = None
+    used_today: int = 0
+    rejected: int = 0
+    day: date = field(default_factory=date.today)
+    cooldown_until: float = 0.0
+
+    def remaining(self) -> float:
+        if self.daily_limit is None:
+            return float("inf")
+        return max(0, self.daily_limit - self.used_today)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "key": f"{self.key[:4]}…" if len(self.key) > 4 else "…",
+            "used_today": self.used_today,
+            "daily_limit": self.daily_limit,
+            "remaining": None if self.daily_limit is None else self.remaining(),
+            "rejected": self.rejected,
+            "cooling_down": self.cooldown_until > time.monotonic(),
+        }
+
+
+class ApiKeyPool:
+    """Pool of API keys for one upstream, rotated by remaining daily quota.
+
+    A key answered with 429 cools down for its Retry-After; while every key is
+    cooling down, callers wait for the first one to come back (up to max_wait)."""
+
+    def __init__(self, keys: List[str], daily_limit: Optional[int] = None, max_wait: float = 30.0):
+        self.keys = [ApiKeyState(key=key, daily_limit=daily_limit) for key in keys]
+        self.max_wait = max_wait
+
+    def __bool__(self) -> bool:
+        return bool(self.keys)
+
+    async def acquire(self) -> ApiKeyState:
+        while True:
+            now = time.monotonic()
+            today = date.today()
+            for state in self.keys:
+                if state.day != today:
+                    state.day, state.used_today = today, 0
+
+            usable = [s for s in self.keys if s.remaining() > 0]
+            if not usable:
+                raise RateLimitedError("Daily quota exhausted for all API keys")
+
+            ready = [s for s in usable if s.cooldown_until <= now]
+            if ready:
+                return max(ready, key=lambda s: s.remaining())
+
+            wait = min(s.cooldown_until for s in usable) - now
+            if wait > self.max_wait:
+                raise RateLimitedError(f"All API keys are rate limited for another {wait:.1f}s")
+            await asyncio.sleep(wait)
+
+    def record_use(self, state: ApiKeyState, used_today: Optional[int] = None) -> None:
+        """Count a request; prefer the upstream's own counter when it reports one."""
+        state.used_today = used_today if used_today is not None else state.used_today + 1
+
+    def record_rejected(self, state: ApiKeyState, retry_after: float) -> None:
+        state.rejected += 1
+        state.cooldown_until = max(state.cooldown_until, time.monotonic() + retry_after)
+
+    def usage(self) -> List[Dict[str, Any]]:
+        return [state.as_dict() for state in self.keys]
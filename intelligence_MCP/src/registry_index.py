@@ -0,0 +1,401 @@
+"""
+Offline EGRUL/EGRIP index used to answer search_entity without a paid API call.
+
+The index is an on-disk SQLite database opened with a large mmap window, so hot
+pages are served straight from the page cache. It supports exact INN/OGRN(IP)
+lookup, name-prefix search and trigram fuzzy search ("Тюн ит" → ООО "ТЮН ИТ").
+
+Usage:
+    python registry_index.py load egrul.zip --db registry.db     # full rebuild
+    python registry_index.py update delta.xml --db registry.db   # incremental
+"""
+
+import argparse
+import csv
+import hashlib
+import io
+import logging
+import re
+import sqlite3
+import threading
+import zipfile
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from models import SearchEntity
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entities (
+    id INTEGER PRIMARY KEY,
+    inn TEXT NOT NULL UNIQUE,
+    ogrn TEXT,
+    obj TEXT NOT NULL,
+    title TEXT NOT NULL,
+    full_name TEXT,
+    region TEXT,
+    name_norm TEXT NOT NULL,
+    tri_count INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_entities_ogrn ON entities(ogrn);
+CREATE INDEX IF NOT EXISTS idx_entities_name ON entities(obj, name_norm);
+CREATE TABLE IF NOT EXISTS trigrams (
+    tri TEXT NOT NULL,
+    entity_id INTEGER NOT NULL,
+    PRIMARY KEY (tri, entity_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS imports (
+    sha256 TEXT PRIMARY KEY,
+    source TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    records INTEGER NOT NULL,
+    imported_at TEXT NOT NULL
+);
+"""
+
+# Legal-form words dropped from names so that "Тюн ит" matches ООО "ТЮН ИТ".
+LEGAL_FORMS = {
+    "ооо", "оао", "зао", "пао", "ао", "ип", "нко", "ано", "гуп", "муп", "фгуп", "тсж", "снт",
+    "общество", "с", "ограниченной", "ответственностью", "акционерное", "публичное",
+    "закрытое", "открытое", "индивидуальный", "предприниматель",
+}
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def normalize_name(name: str) -> str:
+    words = _WORD_RE.findall(name.lower().replace("ё", "е"))
+    meaningful = [w for w in words if w not in LEGAL_FORMS]
+    return " ".join(meaningful or words)
+
+
+def trigrams(text: str) -> set:
+    result = set()
+    for word in text.split():
+        padded = f" {word} "
+        for i in range(len(padded) - 2):
+            result.add(padded[i:i + 3])
+    return result
+
+
+@dataclass
+class RegistryRecord:
+    inn: str
+    ogrn: Optional[str]
+    obj: str  # "org" | "ent"
+    title: str
+    full_name: Optional[str] = None
+    region: Optional[str] = None
+    deleted: bool = False
+
+
+def _local_name(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+def _find(elem: ET.Element, name: str) -> Optional[ET.Element]:
+    for child in elem.iter():
+        if _local_name(child.tag) == name:
+            return child
+    return None
+
+
+def parse_egr_xml(stream) -> Iterator[RegistryRecord]:
+    """Stream records from an EGRUL (СвЮЛ) or EGRIP (СвИП) XML extract."""
+    for _, elem in ET.iterparse(stream, events=("end",)):
+        tag = _local_name(elem.tag)
+        if tag == "СвЮЛ":
+            inn = elem.get("ИНН")
+            name = _find(elem, "СвНаимЮЛ")
+            short = _find(elem, "СвНаимЮЛСокр")
+            region = _find(elem, "АдресРФ")
+            full_name = name.get("НаимЮЛПолн") if name is not None else None
+            title = (short.get("НаимСокр") if short is not None else None) or full_name
+            if inn and title:
+                yield RegistryRecord(
+                    inn=inn,
+                    ogrn=elem.get("ОГРН"),
+                    obj="org",
+                    title=title,
+                    full_name=full_name,
+                    region=region.get("КодРегион") if region is not None else None,
+                )
+            elem.clear()
+        elif tag == "СвИП":
+            inn = elem.get("ИННФЛ")
+            fio = _find(elem, "ФИОРус")
+            title = None
+            if fio is not None:
+                title = " ".join(
+                    part for part in (fio.get("Фамилия"), fio.get("Имя"), fio.get("Отчество")) if part
+                )
+            if inn and title:
+                yield RegistryRecord(inn=inn, ogrn=elem.get("ОГРНИП"), obj="ent", title=title, full_name=title)
+            elem.clear()
+
+
+CSV_COLUMNS = {
+    "inn": ("inn", "ИНН", "ИННФЛ"),
+    "ogrn": ("ogrn", "ogrnip", "ОГРН", "ОГРНИП"),
+    "obj": ("obj", "type", "Тип"),
+    "title": ("title", "short_name", "НаимСокр", "ФИО"),
+    "full_name": ("full_name", "НаимПолн"),
+    "region": ("region", "РегионКод", "КодРегион"),
+    "action": ("action", "Действие"),
+}
+
+
+def parse_registry_csv(stream, delimiter: str = ",") -> Iterator[RegistryRecord]:
+    """Stream records from a CSV dump. Column names may be English or Checko-style Russian.
+
+    An optional action column with value "delete" removes the record on update."""
+    reader = csv.DictReader(stream, delimiter=delimiter)
+
+    def column(row: Dict[str, str], field: str) -> Optional[str]:
+        for name in CSV_COLUMNS[field]:
+            value = row.get(name)
+            if value:
+                return value.strip()
+        return None
+
+    for row in reader:
+        inn = column(row, "inn")
+        if not inn:
+            continue
+        obj = column(row, "obj") or ("ent" if len(inn) == 12 else "org")
+        title = column(row, "title") or column(row, "full_name") or ""
+        yield RegistryRecord(
+            inn=inn,
+            ogrn=column(row, "ogrn"),
+            obj="ent" if obj.lower() in ("ent", "ip", "ип") else "org",
+            title=title,
+            full_name=column(row, "full_name"),
+            region=column(row, "region"),
+            deleted=(column(row, "action") or "").lower() == "delete",
+        )
+
+
+def read_registry_file(path: Path) -> Iterator[RegistryRecord]:
+    """Records from an XML/CSV file or from every XML/CSV member of a ZIP archive."""
+    if path.suffix.lower() == ".zip":
+        with zipfile.ZipFile(path) as archive:
+            for member in archive.namelist():
+                suffix = Path(member).suffix.lower()
+                if suffix not in (".xml", ".csv"):
+                    continue
+                with archive.open(member) as raw:
+                    if suffix == ".xml":
+                        yield from parse_egr_xml(raw)
+                    else:
+                        yield from parse_registry_csv(io.TextIOWrapper(raw, encoding="utf-8-sig"))
+    elif path.suffix.lower() == ".xml":
+        with path.open("rb") as raw:
+            yield from parse_egr_xml(raw)
+    else:
+        with path.open(encoding="utf-8-sig", newline="") as text:
+            yield from parse_registry_csv(text)
+
+
+def _file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class RegistryIndex:
+    """On-disk, memory-mapped EGRUL/EGRIP index.
+
+    Imports go through `conn`; searches use one read connection per thread, so
+    they can run in worker threads (asyncio.to_thread) and, thanks to WAL, keep
+    seeing the last committed index while an import is in progress."""
+
+    def __init__(self, path: str | Path, mmap_size: int = 1 << 30, min_similarity: float = 0.3):
+        self.path = Path(path)
+        self.mmap_size = int(mmap_size)
+        self.min_similarity = min_similarity
+        self.conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self.conn.execute(f"PRAGMA mmap_size = {self.mmap_size}")
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.executescript(SCHEMA)
+        self._local = threading.local()
+        self._readers: List[sqlite3.Connection] = []
+        self._readers_lock = threading.Lock()
+
+    def close(self) -> None:
+        with self._readers_lock:
+            for reader in self._readers:
+                reader.close()
+            self._readers.clear()
+        self.conn.close()
+
+    def _reader(self) -> sqlite3.Connection:
+        reader = getattr(self._local, "conn", None)
+        if reader is None:
+            reader = sqlite3.connect(str(self.path), check_same_thread=False)
+            reader.execute(f"PRAGMA mmap_size = {self.mmap_size}")
+            self._local.conn = reader
+            with self._readers_lock:
+                self._readers.append(reader)
+        return reader
+
+    def __len__(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM entities").fetchone()[0]
+
+    # --- import -----------------------------------------------------------------
+
+    # Each import runs in a single transaction: a running server never sees an
+    # empty or half-imported index, and a failed import leaves the old one intact.
+
+    def bulk_load(self, path: str | Path) -> int:
+        """Rebuild the index from a full registry dump."""
+        path = Path(path)
+        sha = _file_sha256(path)
+        with self.conn:
+            self.conn.execute("DELETE FROM trigrams")
+            self.conn.execute("DELETE FROM entities")
+            self.conn.execute("DELETE FROM imports")
+            count = self._import(read_registry_file(path))
+            self._record_import(path, "full", count, sha)
+        return count
+
+    def apply_update(self, path: str | Path) -> int:
+        """Apply an incremental extract; files that were already imported are skipped."""
+        path = Path(path)
+        sha = _file_sha256(path)
+        if self.conn.execute("SELECT 1 FROM imports WHERE sha256 = ?", (sha,)).fetchone():
+            logger.info(f"Registry update {path} already applied, skipping.")
+            return 0
+        with self.conn:
+            count = self._import(read_registry_file(path))
+            self._record_import(path, "update", count, sha)
+        return count
+
+    def upsert(self, records: Iterable[RegistryRecord]) -> int:
+        with self.conn:
+            return self._import(records)
+
+    def _import(self, records: Iterable[RegistryRecord]) -> int:
+        count = 0
+        for record in records:
+            self._write_record(record)
+            count += 1
+        return count
+
+    def _write_record(self, record: RegistryRecord) -> None:
+        row = self.conn.execute("SELECT id FROM entities WHERE inn = ?", (record.inn,)).fetchone()
+        if row:
+            self.conn.execute("DELETE FROM trigrams WHERE entity_id = ?", (row[0],))
+            self.conn.execute("DELETE FROM entities WHERE id = ?", (row[0],))
+        if record.deleted or not record.title:
+            return
+        name_norm = normalize_name(record.title)
+        tris = trigrams(name_norm)
+        cursor = self.conn.execute(
+            "INSERT INTO entities (inn, ogrn, obj, title, full_name, region, name_norm, tri_count) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (record.inn, record.ogrn, record.obj, record.title, record.full_name,
+             record.region, name_norm, len(tris)),
+        )
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO trigrams (tri, entity_id) VALUES (?, ?)",
+            [(tri, cursor.lastrowid) for tri in tris],
+        )
+
+    def _record_import(self, path: Path, kind: str, count: int, sha: str) -> None:
+        self.conn.execute(
+            "INSERT OR REPLACE INTO imports (sha256, source, kind, records, imported_at) VALUES (?, ?, ?, ?, ?)",
+            (sha, str(path), kind, count, datetime.now(timezone.utc).isoformat()),
+        )
+
+    # --- lookup -----------------------------------------------------------------
+
+    def search(self, query: str, obj: str, limit: int = 20) -> List[SearchEntity]:
+        """INN/OGRN exact lookup for digit queries, otherwise prefix then trigram name search."""
+        query = query.strip()
+        if query.isdigit():
+            if len(query) in (10, 12):
+                rows = self._select("WHERE inn = ?", (query,))
+            elif len(query) in (13, 15):
+                rows = self._select("WHERE ogrn = ?", (query,))
+            else:
+                rows = []
+            return [self._to_entity(row) for row in rows if row[2] == obj]
+
+        name_norm = normalize_name(query)
+        if not name_norm:
+            return []
+
+        rows = self._select(
+            "WHERE obj = ? AND name_norm >= ? AND name_norm < ? ORDER BY name_norm LIMIT ?",
+            (obj, name_norm, name_norm + "\uffff", limit),
+        )
+        if len(rows) < limit:
+            seen = {row[0] for row in rows}
+            rows += [row for row in self._fuzzy(name_norm, obj, limit) if row[0] not in seen]
+        return [self._to_entity(row) for row in rows[:limit]]
+
+    def _fuzzy(self, name_norm: str, obj: str, limit: int) -> List[Tuple]:
+        query_tris = trigrams(name_norm)
+        if not query_tris:
+            return []
+        placeholders = ",".join("?" * len(query_tris))
+        candidates = self._reader().execute(
+            f"SELECT t.entity_id, COUNT(*) AS hits, e.tri_count FROM trigrams t "
+            f"JOIN entities e ON e.id = t.entity_id "
+            f"WHERE t.tri IN ({placeholders}) AND e.obj = ? "
+            f"GROUP BY t.entity_id ORDER BY hits DESC LIMIT ?",
+            (*query_tris, obj, limit * 10),
+        ).fetchall()
+
+        scored = []
+        for entity_id, hits, tri_count in candidates:
+            similarity = hits / (len(query_tris) + tri_count - hits)
+            if similarity >= self.min_similarity:
+                scored.append((similarity, entity_id))
+        scored.sort(reverse=True)
+
+        rows = []
+        for _, entity_id in scored[:limit]:
+            rows += self._select("WHERE id = ?", (entity_id,))
+        return rows
+
+    def _select(self, where: str, params: Tuple) -> List[Tuple]:
+        return self._reader().execute(
+            f"SELECT inn, ogrn, obj, title, region FROM entities {where}", params
+        ).fetchall()
+
+    @staticmethod
+    def _to_entity(row: Tuple) -> SearchEntity:
+        inn, ogrn, _, title, region = row
+        return SearchEntity(title=title, inn=inn, ogrn=ogrn, region=region)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Build or update the offline EGRUL/EGRIP index.")
+    parser.add_argument("command", choices=["load", "update"])
+    parser.add_argument("paths", nargs="+", type=Path, help="XML/CSV files or ZIP archives")
+    parser.add_argument("--db", default="registry.db", help="Index database path")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    index = RegistryIndex(args.db)
+    try:
+        for i, path in enumerate(args.paths):
+            if args.command == "load" and i == 0:
+                count = index.bulk_load(path)
+            else:
+                count = index.apply_update(path)
+            logger.info(f"{path}: {count} records")
+        logger.info(f"Index {args.db} now holds {len(index)} entities")
+    finally:
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Set, Tuple, Type
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class CachePolicy:
+    """TTL settings for one upstream endpoint (seconds)."""
+
+    ttl: float
+    stale_ttl: float = 0.0
+    negative_ttl: float = 0.0
+
+
+@dataclass
+class CacheEntry:
+    value: Any
+    stored_at: float
+    negative: bool = False
+    policy: Optional[CachePolicy] = None
+
+
+@dataclass(frozen=True)
+class WithPolicy:
+    """A fetched value to cache under its own policy instead of the endpoint's,
+    e.g. a degraded fallback answer that should expire sooner."""
+
+    value: Any
+    policy: CachePolicy
+
+
+def unwrap(value: Any) -> Any:
+    return value.value if isinstance(value, WithPolicy) else value
+
+
+def make_cache_key(endpoint: str, params: Dict[str, Any]) -> Tuple[Hashable, ...]:
+    """Build a cache key from the endpoint and normalised request params."""
+    normalized = []
+    for name in sorted(params):
+        value = params[name]
+        if isinstance(value, str):
+            value = " ".join(value.split()).lower()
+        normalized.append((name, value))
+    return (endpoint, tuple(normalized))
+
+
+class ResponseCache:
+    """In-process LRU cache with per-endpoint TTLs, negative caching and stale-while-revalidate.
+
+    A fresh entry is returned as is. A stale entry (older than ``ttl`` but within
+    ``ttl + stale_ttl``) is returned immediately while a background task refreshes
+    it. Empty results and ``negative_exceptions`` are cached for ``negative_ttl``."""
+
+    def __init__(
+        self,
+        max_size: int = 2048,
+        negative_exceptions: Tuple[Type[BaseException], ...] = (),
+    ):
+        self.max_size = max_size
+        self.negative_exceptions = negative_exceptions
+        self._entries: "OrderedDict[Hashable, CacheEntry]" = OrderedDict()
+        self._refreshing: Dict[Hashable, asyncio.Task] = {}
+        self._background: Set[asyncio.Task] = set()
+        self.stats: Dict[str, int] = {
+            "hits": 0,
+            "stale_hits": 0,
+            "negative_hits": 0,
+            "misses": 0,
+            "refreshes": 0,
+            "refresh_failures": 0,
+            "evictions": 0,
+        }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def get_or_fetch(
+        self,
+        key: Hashable,
+        fetch: Callable[[], Awaitable[Any]],
+        policy: CachePolicy,
+    ) -> Any:
+        entry, stale = self._lookup(key, policy)
+        if entry is not None:
+            if stale:
+                self.schedule_refresh(key, fetch, policy)
+            if entry.negative:
+                self.stats["negative_hits"] += 1
+                if isinstance(entry.value, BaseException):
+                    raise entry.value.with_traceback(None)
+            return entry.value
+
+        self.stats["misses"] += 1
+        return await self._fetch_and_store(key, fetch, policy)
+
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        if key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(key, None)
+
+    async def close(self) -> None:
+        """Cancel pending background refreshes."""
+        for task in list(self._background):
+            task.cancel()
+        if self._background:
+            await asyncio.gather(*self._background, return_exceptions=True)
+
+    def _lookup(self, key: Hashable, policy: CachePolicy) -> Tuple[Optional[CacheEntry], bool]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None, False
+
+        policy = entry.policy or policy
+        age = time.monotonic() - entry.stored_at
+        if entry.negative:
+            fresh_for, stale_for = policy.negative_ttl, 0.0
+        else:
+            fresh_for, stale_for = policy.ttl, policy.stale_ttl
+
+        if age < fresh_for:
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return entry, False
+
+        if age < fresh_for + stale_for:
+            self._entries.move_to_end(key)
+            self.stats["stale_hits"] += 1
+            return entry, True
+
+        del self._entries[key]
+        return None, False
+
+    def schedule_refresh(
+        self,
+        key: Hashable,
+        fetch: Callable[[], Awaitable[Any]],
+        policy: CachePolicy,
+    ) -> None:
+        if key in self._refreshing:
+            return
+        task = asyncio.create_task(self._refresh(key, fetch, policy))
+        self._refreshing[key] = task
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def _refresh(
+        self,
+        key: Hashable,
+        fetch: Callable[[], Awaitable[Any]],
+        policy: CachePolicy,
+    ) -> None:
+        self.stats["refreshes"] += 1
+        try:
+            await self._fetch_and_store(key, fetch, policy)
+        except asyncio.CancelledError:
+            raise
+        except self.negative_exceptions:
+            pass
+        except Exception as e:
+            # Keep serving the stale value; the next stale hit will retry.
+            self.stats["refresh_failures"] += 1
+            logger.warning(f"Background refresh failed for {key}: {e}")
+        finally:
+            self._refreshing.pop(key, None)
+
+    async def _fetch_and_store(
+        self,
+        key: Hashable,
+        fetch: Callable[[], Awaitable[Any]],
+        policy: CachePolicy,
+    ) -> Any:
+        try:
+            value = await fetch()
+        except self.negative_exceptions as e:
+            if policy.negative_ttl > 0:
+                self._store(key, CacheEntry(value=e, stored_at=time.monotonic(), negative=True))
+            raise
+
+        override = None
+        if isinstance(value, WithPolicy):
+            value, override = value.value, value.policy
+        negative = value is None or value == []
+        if not negative or (override or policy).negative_ttl > 0:
+            self._store(key, CacheEntry(value=value, stored_at=time.monotonic(), negative=negative, policy=override))
+        return value
+
+    def _store(self, key: Hashable, entry: CacheEntry) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
@@ -0,0 +1,90 @@
+import json
+import os
+from typing import Any, Dict, Iterable, List, Optional, Type, Union
+
+from pydantic import BaseModel
+
+from models import CompanyProfile, EntrepreneurProfile, SearchEntity
+
+# Top-level fields per profile level; "full" (None) keeps everything.
+PROFILE_LEVELS: Dict[str, Dict[str, Optional[List[str]]]] = {
+    CompanyProfile.__name__: {
+        "basic": ["inn", "ogrn", "short_name", "status"],
+        "standard": ["inn", "ogrn", "kpp", "short_name", "full_name", "address", "status", "ceo", "okved", "legal_risks"],
+        "full": None,
+    },
+    EntrepreneurProfile.__name__: {
+        "basic": ["inn", "ogrnip", "full_name", "status"],
+        "standard": None,
+        "full": None,
+    },
+    SearchEntity.__name__: {
+        "basic": ["title", "inn"],
+        "standard": None,
+        "full": None,
+    },
+}
+
+OUTPUT_FORMAT = os.getenv("OUTPUT_FORMAT", "compact")
+
+
+def parse_fields(fields: Union[str, Iterable[str], None]) -> Optional[List[str]]:
+    """Accept a list or a comma-separated string of (dotted) field names."""
+    if fields is None:
+        return None
+    if isinstance(fields, str):
+        fields = fields.split(",")
+    parsed = [field.strip() for field in fields if field and field.strip()]
+    return parsed or None
+
+
+def build_include(
+    model_cls: Type[BaseModel],
+    fields: Union[str, Iterable[str], None] = None,
+    profile_level: Optional[str] = None,
+) -> Optional[Dict[str, Any]]:
+    """Turn `fields` / `profile_level` into a pydantic `include` spec.
+
+    Explicit fields win over the profile level. Dotted names select nested
+    fields, e.g. "financials.revenue". Unknown names raise ValueError."""
+    selected = parse_fields(fields)
+    if selected is None:
+        levels = PROFILE_LEVELS.get(model_cls.__name__, {})
+        level = profile_level or "full"
+        if level not in levels:
+            raise ValueError(f"Unknown profile_level '{level}'. Allowed: {', '.join(levels)}")
+        selected = levels[level]
+    if selected is None:
+        return None
+
+    include: Dict[str, Any] = {}
+    for path in selected:
+        head, _, rest = path.partition(".")
+        if head not in model_cls.model_fields:
+            raise ValueError(f"Unknown field '{head}'. Allowed: {', '.join(model_cls.model_fields)}")
+        if not rest:
+            include[head] = True
+        elif include.get(head) is not True:
+            include.setdefault(head, {})[rest] = True
+    return include
+
+
+def strip_nulls(value: Any) -> Any:
+    """Recursively drop None values from dicts (lists keep their positions)."""
+    if isinstance(value, dict):
+        return {key: strip_nulls(item) for key, item in value.items() if item is not None}
+    if isinstance(value, list):
+        return [strip_nulls(item) for item in value]
+    return value
+
+
+def project(model: BaseModel, include: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Dump only the included fields of a model, without nulls."""
+    return strip_nulls(model.model_dump(mode="json", include=include))
+
+
+def dumps(data: Any, output_format: Optional[str] = None) -> str:
+    """Serialize tool output: compact (default) or pretty-printed for debugging."""
+    if (output_format or OUTPUT_FORMAT) == "pretty":
+        return json.dumps(data, ensure_ascii=False, indent=2)
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"))
@@ -0,0 +1,36 @@
+import os
+import sys
+import httpx
+import pytest
+import pytest_asyncio
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from src.api_client import CheckoApiClient
+
+
+def json_response(data, status_code: int = 200, method: str = "GET", **kwargs) -> httpx.Response:
+    """An upstream response carrying `data` as its JSON body."""
+    request = httpx.Request(method, "https://upstream.test/")
+    return httpx.Response(status_code, json=data, request=request, **kwargs)
+
+
+@pytest_asyncio.fixture
+async def make_client():
+    """Build CheckoApiClients with dummy keys; all are closed after the test."""
+    clients = []
+
+    def make(**kwargs) -> CheckoApiClient:
+        client = CheckoApiClient(**{"checko_key": "dummy", "dadata_key": "dummy", **kwargs})
+        clients.append(client)
+        return client
+
+    yield make
+    for client in clients:
+        await client.close()
+
+
+@pytest.fixture
+def client(make_client) -> CheckoApiClient:
+    return make_client()
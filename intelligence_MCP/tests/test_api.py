@@ -1,33 +1,36 @@
+import asyncio
+import json
 import os
 import sys
+import time
+import httpx
 import pytest
-import pytest_asyncio
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
 
 
-from src.api_client import CheckoApiClient
+from src.api_client import EntityNotFoundError
+from src.circuit_breaker import CircuitBreaker, CircuitOpenError
+from src.hedging import LatencyTracker
+from src.metrics import Counter, Histogram, MetricsRegistry, TrackedTransport, client_collector
+from src.rate_limit import TokenBucket
 from src.models import CompanyProfile, EntrepreneurProfile, SearchEntity
+from src.response_cache import CachePolicy
+from src.serialization import build_include, dumps, project
+from src.single_flight import SingleFlight
+from conftest import json_response
 
-class TestCheckoApiClient:
 
-    @pytest_asyncio.fixture
-    async def client(self):
-        api_client = CheckoApiClient(checko_key="dummy", dadata_key="dummy")
-        yield api_client
-        await api_client.close()
+class TestCheckoApiClient:
 
     @pytest.mark.asyncio
     async def test_search_entity_checko_success(self, client):
         mock_data = {
             "data": {"Записи": [{"НаимСокр": "ООО РОМАШКА", "ИНН": "7700000000", "ОГРН": "123", "РегионКод": "77"}]}
         }
-        mock_resp = MagicMock()
-        mock_resp.json.return_value = mock_data
-        mock_resp.raise_for_status.return_value = None
-
-        with patch.object(client.client, 'get', return_value=mock_resp):
+        with patch.object(client.client, 'get', return_value=json_response(mock_data)):
             results = await client.search_entity("Ромашка", "org")
             assert len(results) == 1
             assert results[0].title == "ООО РОМАШКА"
@@ -45,11 +48,7 @@ class TestCheckoApiClient:
                 "Арбитраж": {"Количество": 0}, "Блокировка": False
             }
         }
-        mock_resp = MagicMock()
-        mock_resp.json.return_value = mock_data
-        mock_resp.raise_for_status.return_value = None
-
-        with patch.object(client.client, 'get', return_value=mock_resp):
+        with patch.object(client.client, 'get', return_value=json_response(mock_data)):
             profile = await client.get_company_full_profile("7700000000")
             assert profile.inn == "7700000000"
             assert profile.financials.revenue == {"2022": 100}
@@ -65,11 +64,7 @@ class TestCheckoApiClient:
                 "ВидДеят": ["62.01"]
             }
         }
-        mock_resp = MagicMock()
-        mock_resp.json.return_value = mock_data
-        mock_resp.raise_for_status.return_value = None
-
-        with patch.object(client.client, 'get', return_value=mock_resp):
+        with patch.object(client.client, 'get', return_value=json_response(mock_data)):
             profile = await client.get_entrepreneur_profile("123456789012")
             assert profile.inn == "123456789012"
             assert profile.status == {"Наим": "Действующий"}
@@ -85,12 +80,8 @@ class TestCheckoApiClient:
                 }
             }]
         }
-        mock_resp = MagicMock()
-        mock_resp.json.return_value = mock_dadata
-        mock_resp.raise_for_status.return_value = None
-
         with patch.object(client.client, 'get', side_effect=Exception("Error")):
-            with patch.object(client.client, 'post', return_value=mock_resp) as mock_post:
+            with patch.object(client.client, 'post', return_value=json_response(mock_dadata, method="POST")) as mock_post:
                 results = await client.search_entity("7777777777", "org")
 
                 assert len(results) == 1
@@ -99,6 +90,554 @@ class TestCheckoApiClient:
                 mock_post.assert_called_once()
 
 
+class TestResponseCache:
+
+    @staticmethod
+    def _search_response(title="ООО РОМАШКА"):
+        return json_response(
+            {"data": {"Записи": [{"НаимСокр": title, "ИНН": "7700000000", "ОГРН": "123", "РегионКод": "77"}]}}
+        )
+
+    @pytest.mark.asyncio
+    async def test_repeated_lookup_is_served_from_cache(self, client):
+        with patch.object(client.client, 'get', return_value=self._search_response()) as mock_get:
+            first = await client.search_entity("Ромашка", "org")
+            second = await client.search_entity("  ромашка ", "org")
+
+        assert first == second
+        mock_get.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_stale_entry_is_served_and_refreshed_in_background(self, client):
+        client.cache_policies["search"] = CachePolicy(ttl=0, stale_ttl=60)
+
+        with patch.object(client.client, 'get', return_value=self._search_response("СТАРОЕ")):
+            await client.search_entity("Ромашка", "org")
+
+        with patch.object(client.client, 'get', return_value=self._search_response("НОВОЕ")) as mock_get:
+            stale = await client.search_entity("Ромашка", "org")
+            assert stale[0].title == "СТАРОЕ"
+            await asyncio.gather(*client.cache._background)
+            mock_get.assert_called_once()
+
+        client.cache_policies["search"] = CachePolicy(ttl=60)
+        refreshed = await client.search_entity("Ромашка", "org")
+        assert refreshed[0].title == "НОВОЕ"
+
+    @pytest.mark.asyncio
+    async def test_not_found_is_cached(self, client):
+        with patch.object(client.client, 'get', return_value=json_response({"data": {}})) as mock_get:
+            for _ in range(2):
+                with pytest.raises(EntityNotFoundError):
+                    await client.get_entrepreneur_profile("123456789012")
+            mock_get.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_upstream_failure_is_not_cached(self, client):
+        with patch.object(client.client, 'get', side_effect=Exception("Error")) as mock_get:
+            assert await client.search_entity("Ромашка", "org") == []
+            assert await client.search_entity("Ромашка", "org") == []
+            assert mock_get.call_count == 2
+
+
+class TestSingleFlight:
+
+    @pytest.fixture
+    def client(self, make_client):
+        return make_client(cache_enabled=False)
+
+    @pytest.mark.asyncio
+    async def test_concurrent_identical_lookups_share_one_call(self, client):
+        async def slow_get(*args, **kwargs):
+            await asyncio.sleep(0.01)
+            return json_response({"data": {"ФИО": "ИВАНОВ ИВАН", "Статус": {"Наим": "Действующий"}}})
+
+        with patch.object(client.client, 'get', side_effect=slow_get) as mock_get:
+            profiles = await asyncio.gather(
+                *(client.get_entrepreneur_profile("123456789012") for _ in range(10))
+            )
+
+        assert all(p.full_name == "ИВАНОВ ИВАН" for p in profiles)
+        mock_get.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_concurrent_callers_all_receive_the_exception(self, client):
+        async def failing_get(*args, **kwargs):
+            await asyncio.sleep(0.01)
+            raise RuntimeError("Checko down")
+
+        with patch.object(client.client, 'get', side_effect=failing_get) as mock_get:
+            results = await asyncio.gather(
+                *(client.get_entrepreneur_profile("123456789012") for _ in range(5)),
+                return_exceptions=True,
+            )
+
+        assert all(isinstance(r, RuntimeError) for r in results)
+        mock_get.assert_called_once()
+        assert len(client.inflight) == 0
+
+    @pytest.mark.asyncio
+    async def test_call_is_cancelled_only_when_every_caller_is(self):
+        inflight = SingleFlight()
+        started = asyncio.Event()
+        cancelled = asyncio.Event()
+
+        async def call():
+            started.set()
+            try:
+                await asyncio.Event().wait()
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        first = asyncio.create_task(inflight.do("key", call))
+        second = asyncio.create_task(inflight.do("key", call))
+        await started.wait()
+
+        first.cancel()
+        await asyncio.gather(first, return_exceptions=True)
+        assert not cancelled.is_set()
+        assert len(inflight) == 1
+
+        second.cancel()
+        await asyncio.gather(second, return_exceptions=True)
+        await asyncio.wait_for(cancelled.wait(), timeout=1)
+        assert len(inflight) == 0
+
+
+class TestBatch:
+
+    @pytest.fixture
+    def client(self, make_client):
+        return make_client(dadata_key=None, cache_enabled=False)
+
+    @pytest.mark.asyncio
+    async def test_batch_dedupes_and_bounds_concurrency(self, client):
+        in_flight = 0
+        peak = 0
+
+        async def get(url, params):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            if params["inn"] == "0000000000":
+                raise RuntimeError("boom")
+            return json_response({"data": {"ОГРН": "1", "Наим": {"Сокр": params["inn"]}}})
+
+        inns = [f"77000000{i:02d}" for i in range(12)] + ["7700000000 ", "0000000000"]
+        with patch.object(client.client, 'get', side_effect=get) as mock_get:
+            results = await client.get_company_profiles_batch(inns, max_concurrency=3)
+
+        assert len(results) == 13
+        assert mock_get.call_count == 13
+        assert peak <= 3
+        assert results["7700000001"].short_name == "7700000001"
+        assert isinstance(results["0000000000"], ValueError)
+
+
+class TestRateLimit:
+
+    @pytest.mark.asyncio
+    async def test_429_rotates_to_key_with_quota(self, make_client):
+        client = make_client(checko_key="key-a,key-b", dadata_key=None, cache_enabled=False, checko_daily_limit=100)
+        used_keys = []
+
+        async def get(url, params):
+            used_keys.append(params["key"])
+            if params["key"] == "key-a":
+                return json_response({}, 429, headers={"Retry-After": "60"})
+            return json_response({"data": {"ФИО": "ИВАНОВ ИВАН", "Статус": {}}})
+
+        with patch.object(client.client, 'get', side_effect=get):
+            await client.get_entrepreneur_profile("123456789012")
+            await client.get_entrepreneur_profile("123456789013")
+
+        assert used_keys == ["key-a", "key-b", "key-b"]
+        key_a, key_b = client.quota_usage()["checko"]["keys"]
+        assert (key_a["rejected"], key_a["used_today"]) == (1, 1)
+        assert (key_b["rejected"], key_b["used_today"]) == (0, 2)
+
+    @pytest.mark.asyncio
+    async def test_token_bucket_spaces_requests(self):
+        bucket = TokenBucket(rate=50, capacity=1)
+        started = time.monotonic()
+        for _ in range(6):
+            await bucket.acquire()
+        assert time.monotonic() - started >= 0.09
+
+
+class TestCircuitBreaker:
+
+    def test_opens_on_error_rate_and_recovers_after_trial(self):
+        breaker = CircuitBreaker("test", window=4, min_calls=4, error_rate_threshold=0.5, open_seconds=0.0)
+        for failed in (False, True, False, True):
+            breaker.before_call()
+            (breaker.record_failure if failed else breaker.record_success)(0.01)
+
+        assert breaker.state == CircuitBreaker.HALF_OPEN  # open_seconds=0: trial allowed at once
+        breaker.before_call()
+        with pytest.raises(CircuitOpenError):
+            breaker.before_call()
+        breaker.record_success(0.01)
+        assert breaker.state == CircuitBreaker.CLOSED
+
+    def test_opens_on_slow_calls(self):
+        breaker = CircuitBreaker("test", min_calls=3, slow_call_seconds=1.0, slow_rate_threshold=0.6)
+        for _ in range(3):
+            breaker.before_call()
+            breaker.record_success(2.0)
+        assert breaker.state == CircuitBreaker.OPEN
+
+    @pytest.mark.asyncio
+    async def test_open_checko_circuit_routes_straight_to_dadata(self, make_client):
+        client = make_client(cache_enabled=False, breaker_settings={"min_calls": 2, "open_seconds": 60})
+        dadata = json_response(
+            {"suggestions": [{"data": {"name": {"short_with_opf": "ООО ЗАПАСНОЙ"}, "ogrn": "111"}}]}, method="POST"
+        )
+
+        with patch.object(client.client, 'get', side_effect=httpx.ConnectError("down")) as mock_get, \
+                patch.object(client.client, 'post', return_value=dadata):
+            for inn in ("7700000001", "7700000002", "7700000003"):
+                profile = await client.get_company_full_profile(inn)
+                assert profile.short_name == "ООО ЗАПАСНОЙ"
+
+        assert mock_get.call_count == 2
+        assert client.circuit_states()["checko_company"]["state"] == CircuitBreaker.OPEN
+
+    @pytest.mark.asyncio
+    async def test_open_circuit_fails_before_waiting_for_a_rate_limit_token(self, make_client):
+        client = make_client(dadata_key=None, cache_enabled=False, checko_rate=0.001)
+        client.checko_bucket._tokens = 0  # the next token is ~17 minutes away
+        client.breakers["checko_entrepreneur"]._open()
+
+        with patch.object(client.client, 'get') as mock_get:
+            with pytest.raises(RuntimeError, match="is open"):
+                await asyncio.wait_for(client.get_entrepreneur_profile("123456789012"), timeout=1)
+
+        mock_get.assert_not_called()
+        assert client.quota_usage()["checko"]["keys"][0]["used_today"] == 0
+        assert client.breakers["checko_entrepreneur"].stats["rejected"] == 1
+
+
+class TestHedging:
+
+    CHECKO_DATA = {
+        "data": {
+            "ОГРН": "123", "Наим": {"Сокр": "ООО ЧЕКО", "Полн": "ООО ЧЕКО"},
+            "Статус": {"Наим": "Действует"},
+        }
+    }
+    DADATA_DATA = {
+        "suggestions": [{"data": {"name": {"short_with_opf": "ООО ДАДАТА", "full_with_opf": "ООО ДАДАТА"}, "ogrn": "123"}}]
+    }
+
+    @classmethod
+    def upstreams(cls, checko_answers: bool):
+        """Checko (GET) and DaData (POST) stand-ins. A Checko call that does not
+        answer blocks until it is cancelled; the events record what happened."""
+        events = {name: asyncio.Event() for name in ("checko_started", "checko_cancelled", "dadata_called")}
+
+        async def get(*args, **kwargs):
+            events["checko_started"].set()
+            if checko_answers:
+                return json_response(cls.CHECKO_DATA)
+            try:
+                await asyncio.Event().wait()
+            except asyncio.CancelledError:
+                events["checko_cancelled"].set()
+                raise
+
+        async def post(*args, **kwargs):
+            events["dadata_called"].set()
+            return json_response(cls.DADATA_DATA, method="POST")
+
+        return get, post, events
+
+    @staticmethod
+    def hedging_client(make_client, hedge_delay: float):
+        return make_client(cache_enabled=False, checko_latency=LatencyTracker(initial_delay=hedge_delay))
+
+    @pytest.mark.asyncio
+    async def test_fast_checko_does_not_hedge(self, make_client):
+        client = self.hedging_client(make_client, hedge_delay=60)
+        get, post, events = self.upstreams(checko_answers=True)
+        with patch.object(client.client, 'get', side_effect=get), \
+                patch.object(client.client, 'post', side_effect=post):
+            profile = await asyncio.wait_for(client.get_company_full_profile("7700000000"), timeout=5)
+
+        assert profile.short_name == "ООО ЧЕКО"
+        assert not events["dadata_called"].is_set()
+
+    @pytest.mark.asyncio
+    async def test_slow_checko_is_hedged_with_dadata(self, make_client):
+        client = self.hedging_client(make_client, hedge_delay=0.01)
+        get, post, events = self.upstreams(checko_answers=False)
+        with patch.object(client.client, 'get', side_effect=get), \
+                patch.object(client.client, 'post', side_effect=post):
+            profile = await asyncio.wait_for(client.get_company_full_profile("7700000000"), timeout=5)
+            await asyncio.wait_for(events["checko_cancelled"].wait(), timeout=5)
+
+        assert profile.short_name == "ООО ДАДАТА"
+        assert events["checko_started"].is_set()
+
+    @pytest.mark.asyncio
+    async def test_race_fires_both_immediately(self, make_client):
+        # a hedge would only start after 60s: the race must not wait for it
+        client = self.hedging_client(make_client, hedge_delay=60)
+        get, post, events = self.upstreams(checko_answers=False)
+        with patch.object(client.client, 'get', side_effect=get), \
+                patch.object(client.client, 'post', side_effect=post):
+            profile = await asyncio.wait_for(
+                client.get_company_full_profile("7700000000", strategy="race"), timeout=5
+            )
+            await asyncio.wait_for(events["checko_cancelled"].wait(), timeout=5)
+
+        assert profile.short_name == "ООО ДАДАТА"
+        assert events["dadata_called"].is_set()
+
+    @pytest.mark.asyncio
+    async def test_losing_upstream_request_is_cancelled(self, make_client):
+        dadata_started = asyncio.Event()
+        dadata_cancelled = asyncio.Event()
+
+        async def handler(request):
+            if request.method == "POST":
+                dadata_started.set()
+                try:
+                    await asyncio.Event().wait()
+                except asyncio.CancelledError:
+                    dadata_cancelled.set()
+                    raise
+            await dadata_started.wait()
+            return httpx.Response(200, json=self.CHECKO_DATA)
+
+        client = make_client(cache_enabled=False, transport=httpx.MockTransport(handler))
+        profile = await client.get_company_full_profile("7700000000", strategy="race")
+        await asyncio.wait_for(dadata_cancelled.wait(), timeout=1)
+
+        assert profile.short_name == "ООО ЧЕКО"
+        assert len(client.inflight) == 0
+
+    @pytest.mark.asyncio
+    async def test_dadata_profile_is_cached_briefly_then_checko_is_retried(self, make_client, monkeypatch):
+        client = make_client(checko_latency=LatencyTracker(initial_delay=0.01))
+        slow_get, post, _ = self.upstreams(checko_answers=False)
+        fast_get, _, _ = self.upstreams(checko_answers=True)
+        with patch.object(client.client, 'get', side_effect=slow_get), \
+                patch.object(client.client, 'post', side_effect=post):
+            degraded = await asyncio.wait_for(client.get_company_full_profile("7700000000"), timeout=5)
+        assert degraded.short_name == "ООО ДАДАТА"
+
+        # past the DaData policy, well within the full company policy
+        now = time.monotonic()
+        monkeypatch.setattr(time, "monotonic", lambda: now + 10 * 60)
+        with patch.object(client.client, 'get', side_effect=fast_get) as mock_get:
+            full = await client.get_company_full_profile("7700000000")
+            again = await client.get_company_full_profile("7700000000")
+
+        assert full.short_name == again.short_name == "ООО ЧЕКО"
+        mock_get.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_hedged_slow_calls_keep_the_hedge_delay_up(self, make_client):
+        tracker = LatencyTracker(min_samples=5, initial_delay=0.02, min_delay=0.001)
+        client = make_client(cache_enabled=False, checko_latency=tracker)
+        slow_get, post, _ = self.upstreams(checko_answers=False)
+        fast_get, _, _ = self.upstreams(checko_answers=True)
+
+        for inn in ("7700000001", "7700000002", "7700000003"):
+            with patch.object(client.client, 'get', side_effect=slow_get), \
+                    patch.object(client.client, 'post', side_effect=post):
+                await asyncio.wait_for(client.get_company_full_profile(inn), timeout=5)
+        for i in range(19):
+            with patch.object(client.client, 'get', side_effect=fast_get):
+                await client.get_company_full_profile(f"77000001{i:02d}")
+
+        # 3 of 22 calls were slower than 20ms: the p95 stays in that tail
+        assert tracker.hedge_delay() >= 0.02
+
+    def test_hedge_delay_follows_recent_percentile(self):
+        tracker = LatencyTracker(percentile=0.9, min_samples=10, min_delay=0.0)
+        for i in range(1, 11):
+            tracker.record(i / 10)
+        assert tracker.hedge_delay() == pytest.approx(0.9)
+
+
+class TestSerialization:
+    profile = CompanyProfile(
+        inn="7707083893", ogrn="1027700132195", short_name="ПАО Сбербанк",
+        full_name="Публичное акционерное общество", status={"name": "Действует"},
+        founders=[{"name": "ЦБ РФ", "share": None}],
+        financials={"revenue": {"2023": 100}, "profit": {"2023": 10}},
+    )
+
+    def test_profile_level_and_compact_output(self):
+        data = project(self.profile, build_include(CompanyProfile, profile_level="basic"))
+        assert set(data) == {"inn", "ogrn", "short_name", "status"}
+        assert dumps(data).startswith('{"inn":"7707083893","ogrn"')
+
+    def test_fields_select_nested_values_and_strip_nulls(self):
+        include = build_include(CompanyProfile, fields="short_name, financials.revenue, founders")
+        assert project(self.profile, include) == {
+            "short_name": "ПАО Сбербанк",
+            "founders": [{"name": "ЦБ РФ"}],
+            "financials": {"revenue": {"2023": 100}},
+        }
+        assert "kpp" not in project(self.profile)
+
+    def test_unknown_field_or_level_is_rejected(self):
+        with pytest.raises(ValueError):
+            build_include(CompanyProfile, fields=["phone"])
+        with pytest.raises(ValueError):
+            build_include(EntrepreneurProfile, profile_level="huge")
+
+    @pytest.mark.asyncio
+    async def test_search_entity_accepts_profile_level(self, monkeypatch):
+        import main
+        client = MagicMock()
+        client.search_entity = AsyncMock(return_value=[
+            SearchEntity(title="ПАО Сбербанк", inn="7707083893", ogrn="1027700132195", region="Москва"),
+        ])
+        monkeypatch.setattr(main, "get_client", lambda: client)
+
+        basic = json.loads(await main.search_entity("сбербанк", "org", profile_level="basic"))
+        assert basic == [{"title": "ПАО Сбербанк", "inn": "7707083893"}]
+        full = json.loads(await main.search_entity("сбербанк", "org"))
+        assert set(full[0]) == {"title", "inn", "ogrn", "region"}
+        assert "error" in json.loads(await main.search_entity("сбербанк", "org", profile_level="huge"))
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("tool, args", [
+        ("search_entity", ("сбербанк", "org")),
+        ("get_company_full_profile", ("7707083893",)),
+        ("get_entrepreneur_profile", ("500100732259",)),
+    ])
+    async def test_error_payload_is_valid_json(self, monkeypatch, tool, args):
+        import main
+        message = 'bad "inn" in C:\\data\\new\nline'
+        client = MagicMock()
+        setattr(client, tool, AsyncMock(side_effect=RuntimeError(message)))
+        monkeypatch.setattr(main, "get_client", lambda: client)
+
+        assert json.loads(await getattr(main, tool)(*args)) == {"error": message}
+
+
+class TestMetrics:
+
+    def test_text_exposition(self):
+        registry = MetricsRegistry()
+        calls = registry.register(Counter("calls_total", "Calls.", ["tool"]))
+        latency = registry.register(Histogram("latency_seconds", "Latency.", ["tool"], buckets=(0.1, 1.0)))
+        calls.inc(tool='say "hi"')
+        latency.observe(0.05, tool="a")
+        latency.observe(0.5, tool="a")
+        latency.observe(5, tool="a")
+
+        text = registry.render()
+        assert "# TYPE calls_total counter" in text
+        assert 'calls_total{tool="say \\"hi\\""} 1' in text
+        assert 'latency_seconds_bucket{tool="a",le="0.1"} 1' in text
+        assert 'latency_seconds_bucket{tool="a",le="1"} 2' in text
+        assert 'latency_seconds_bucket{tool="a",le="+Inf"} 3' in text
+        assert 'latency_seconds_count{tool="a"} 3' in text
+        with pytest.raises(ValueError):
+            calls.inc(other="x")
+
+    @pytest.mark.asyncio
+    async def test_upstream_errors_and_fallback_are_counted(self, make_client):
+        import metrics  # the module instance api_client records into
+
+        def handler(request):
+            if request.method == "GET":
+                return httpx.Response(503)
+            return httpx.Response(200, json=TestHedging.DADATA_DATA)
+
+        client = make_client(cache_enabled=False, company_strategy="fallback", transport=httpx.MockTransport(handler))
+        errors = metrics.UPSTREAM_ERRORS.value(upstream="checko_company", reason="http_5xx")
+        fallbacks = metrics.DADATA_FALLBACKS.value(operation="company", reason="checko_error")
+        from_dadata = metrics.COMPANY_LOOKUPS.value(source="dadata")
+        profile = await client.get_company_full_profile("7700000000")
+        scraped = {metric.name: metric for metric in client_collector(client)()}
+
+        assert profile.short_name == "ООО ДАДАТА"
+        assert metrics.UPSTREAM_ERRORS.value(upstream="checko_company", reason="http_5xx") == errors + 1
+        assert metrics.DADATA_FALLBACKS.value(operation="company", reason="checko_error") == fallbacks + 1
+        assert metrics.COMPANY_LOOKUPS.value(source="dadata") == from_dadata + 1
+        assert metrics.UPSTREAM_LATENCY.count(upstream="dadata", status="200") >= 1
+        assert scraped["mcp_circuit_state"].value(breaker="checko_company", state="closed") == 1
+        assert scraped["mcp_api_key_used_today"].value(upstream="dadata", key=0) == 1
+
+
+class Chunks(httpx.AsyncByteStream):
+    async def __aiter__(self):
+        yield b"ok"
+
+
+class BlockingTransport(httpx.AsyncBaseTransport):
+    """Holds every request until `release` is set; responses are streamed."""
+
+    def __init__(self):
+        self.release = asyncio.Event()
+        self.received = 0
+
+    async def handle_async_request(self, request):
+        self.received += 1
+        await self.release.wait()
+        if request.url.path == "/fail":
+            raise httpx.ConnectError("refused", request=request)
+        return httpx.Response(200, stream=Chunks())
+
+
+class TestPoolUsage:
+
+    @pytest.mark.asyncio
+    async def test_requests_over_the_limit_are_waiting(self):
+        inner = BlockingTransport()
+        transport = TrackedTransport(inner, max_connections=2)
+        async with httpx.AsyncClient(transport=transport) as client:
+            requests = [asyncio.create_task(client.get("https://upstream.test/")) for _ in range(3)]
+            while inner.received < 3:
+                await asyncio.sleep(0)
+
+            assert transport.usage() == {"max_connections": 2, "active": 2, "waiting": 1}
+            inner.release.set()
+            responses = await asyncio.gather(*requests)
+
+        assert [response.text for response in responses] == ["ok"] * 3
+        assert transport.usage() == {"max_connections": 2, "active": 0, "waiting": 0}
+
+    @pytest.mark.asyncio
+    async def test_streamed_response_counts_until_closed(self):
+        inner = BlockingTransport()
+        inner.release.set()
+        transport = TrackedTransport(inner, max_connections=2)
+        async with httpx.AsyncClient(transport=transport) as client:
+            async with client.stream("GET", "https://upstream.test/") as response:
+                assert transport.in_flight == 1
+                await response.aread()
+            assert transport.in_flight == 0
+
+            with pytest.raises(httpx.ConnectError):
+                await client.get("https://upstream.test/fail")
+            assert transport.in_flight == 0
+
+    @pytest.mark.asyncio
+    async def test_mock_responses_are_released_at_once(self):
+        transport = TrackedTransport(httpx.MockTransport(lambda request: json_response({})))
+        async with httpx.AsyncClient(transport=transport) as client:
+            await client.get("https://upstream.test/")
+        assert transport.usage() == {"max_connections": None, "active": 0, "waiting": 0}
+
+    def test_client_reports_its_pool_limit(self, make_client):
+        scraped = {metric.name: metric for metric in client_collector(make_client())()}
+
+        assert scraped["mcp_http_pool_max_connections"].value() == 100
+        assert scraped["mcp_http_pool_connections"].value(state="active") == 0
+        assert scraped["mcp_http_pool_requests_waiting"].value() == 0
+
+
 class TestModels:
     def test_basic_model(self):
         ent = SearchEntity(title="T", inn="1")
@@ -0,0 +1,123 @@
+import os
+import sys
+import time
+import pytest
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from src.registry_index import RegistryIndex, RegistryRecord, normalize_name
+
+
+EGRUL_XML = """<?xml version="1.0" encoding="utf-8"?>
+<Файл>
+  <Документ>
+    <СвЮЛ ОГРН="1187746000001" ИНН="7700000001">
+      <СвНаимЮЛ НаимЮЛПолн="ОБЩЕСТВО С ОГРАНИЧЕННОЙ ОТВЕТСТВЕННОСТЬЮ &quot;ТЮН ИТ&quot;">
+        <СвНаимЮЛСокр НаимСокр="ООО &quot;ТЮН ИТ&quot;"/>
+      </СвНаимЮЛ>
+      <СвАдресЮЛ><АдресРФ КодРегион="77"/></СвАдресЮЛ>
+    </СвЮЛ>
+  </Документ>
+  <Документ>
+    <СвЮЛ ОГРН="1027700132195" ИНН="7707083893">
+      <СвНаимЮЛ НаимЮЛПолн="ПУБЛИЧНОЕ АКЦИОНЕРНОЕ ОБЩЕСТВО &quot;СБЕРБАНК РОССИИ&quot;">
+        <СвНаимЮЛСокр НаимСокр="ПАО СБЕРБАНК"/>
+      </СвНаимЮЛ>
+    </СвЮЛ>
+  </Документ>
+  <Документ>
+    <СвИП ОГРНИП="304690000000011" ИННФЛ="691302447182">
+      <СвФЛ><ФИОРус Фамилия="КЛИМЕНКОВ" Имя="СЕРГЕЙ" Отчество="ВИКТОРОВИЧ"/></СвФЛ>
+    </СвИП>
+  </Документ>
+</Файл>
+"""
+
+
+@pytest.fixture
+def index(tmp_path):
+    dump = tmp_path / "egrul.xml"
+    dump.write_text(EGRUL_XML, encoding="utf-8")
+    registry = RegistryIndex(tmp_path / "registry.db")
+    assert registry.bulk_load(dump) == 3
+    yield registry
+    registry.close()
+
+
+class TestRegistryIndex:
+
+    def test_normalize_name_drops_legal_form(self):
+        assert normalize_name('ООО "Тюн Ит"') == "тюн ит"
+
+    def test_exact_inn_and_ogrn_lookup(self, index):
+        assert index.search("7707083893", "org")[0].title == "ПАО СБЕРБАНК"
+        assert index.search("1187746000001", "org")[0].inn == "7700000001"
+        assert index.search("304690000000011", "ent")[0].title == "КЛИМЕНКОВ СЕРГЕЙ ВИКТОРОВИЧ"
+        assert index.search("7707083893", "ent") == []
+
+    def test_prefix_and_fuzzy_name_search(self, index):
+        assert index.search("Тюн ит", "org")[0].inn == "7700000001"
+        assert index.search("сбрбанк", "org")[0].inn == "7707083893"
+        assert index.search("клименков сергей", "ent")[0].inn == "691302447182"
+        assert index.search("совсем другое", "org") == []
+
+    def test_incremental_update_upserts_deletes_and_skips_reapplied_files(self, index, tmp_path):
+        delta = tmp_path / "delta.csv"
+        delta.write_text(
+            "ИНН,ОГРН,НаимСокр,РегионКод,action\n"
+            "7700000001,1187746000001,ООО \"ТЮН ИТ ПЛЮС\",78,\n"
+            "7707083893,,,,delete\n",
+            encoding="utf-8",
+        )
+        assert index.apply_update(delta) == 2
+        assert index.apply_update(delta) == 0
+
+        renamed = index.search("7700000001", "org")[0]
+        assert (renamed.title, renamed.region) == ('ООО "ТЮН ИТ ПЛЮС"', "78")
+        assert index.search("7707083893", "org") == []
+        assert len(index) == 2
+
+    def test_rebuild_is_invisible_to_searches_until_it_commits(self, index, tmp_path):
+        seen_during_import = []
+
+        def records(path):
+            yield RegistryRecord(inn="7700000002", ogrn=None, obj="org", title="ООО НОВОЕ")
+            seen_during_import.append(index.search("7707083893", "org"))
+            seen_during_import.append(index.search("7700000002", "org"))
+
+        with patch("src.registry_index.read_registry_file", side_effect=records):
+            assert index.bulk_load(tmp_path / "registry.db") == 1
+
+        old, new = seen_during_import
+        assert old[0].title == "ПАО СБЕРБАНК"
+        assert new == []
+        assert index.search("7707083893", "org") == []
+        assert index.search("7700000002", "org")[0].title == "ООО НОВОЕ"
+
+    def test_failed_rebuild_keeps_the_previous_index(self, index, tmp_path):
+        def records(path):
+            yield RegistryRecord(inn="7700000002", ogrn=None, obj="org", title="ООО НОВОЕ")
+            raise ValueError("truncated archive")
+
+        with patch("src.registry_index.read_registry_file", side_effect=records):
+            with pytest.raises(ValueError):
+                index.bulk_load(tmp_path / "registry.db")
+
+        assert len(index) == 3
+        assert index.search("7707083893", "org")[0].title == "ПАО СБЕРБАНК"
+
+    def test_lookup_is_submillisecond(self, index):
+        started = time.perf_counter()
+        for _ in range(100):
+            index.search("7707083893", "org")
+        assert (time.perf_counter() - started) / 100 < 0.001
+
+    @pytest.mark.asyncio
+    async def test_search_entity_answers_from_local_index_first(self, index, make_client):
+        client = make_client(dadata_key=None, local_index=index)
+        with patch.object(client.client, 'get', side_effect=Exception("network")) as mock_get:
+            results = await client.search_entity("Тюн ит", "org")
+        assert results[0].inn == "7700000001"
+        mock_get.assert_not_called()
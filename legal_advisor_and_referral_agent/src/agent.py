@@ -1,15 +1,74 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Dict, List, Optional, Tuple
 
-from .intents import ModeName
+from .intents import ModeName, classify_intent
+from .tracing import span
 from .flows import (
-    run_explain_flow,
-    run_draft_flow,
-    run_referral_flow,
+    arun_explain_flow,
+    arun_draft_flow,
+    arun_referral_flow,
+    astream_explain_flow,
+    astream_draft_flow,
+    astream_referral_flow,
+    usage_section,
 )
 
 
+SECTION_TITLES: Dict[str, str] = {
+    "explain": "Explanation",
+    "referral": "Referral",
+    "draft": "Draft",
+}
+
+# Section tags used for streamed (SSE) events.
+SECTION_EVENTS: Dict[str, str] = {
+    "explain": "explanation",
+    "referral": "referral",
+    "draft": "draft",
+}
+
+MODE_SECTIONS: Dict[str, List[str]] = {
+    "explain": ["explain"],
+    "referral": ["referral"],
+    "draft": ["draft"],
+    "pipeline": ["explain", "referral", "draft"],
+}
+
+
+def parse_request(
+    request_payload: Dict[str, Any],
+) -> Tuple[ModeName, str, str, Optional[str]]:
+
+    query = request_payload.get("query", "") or ""
+    if not query.strip():
+        raise ValueError("Missing 'query' in payload")
+
+    law_context: str = request_payload.get("law_context", "") or ""
+
+    relevant_laws: Optional[str] = request_payload.get("relevant_laws")
+
+    mode: ModeName = classify_intent(
+        query,
+        preferred_mode=request_payload.get("mode"),
+    )
+
+    return mode, query, law_context, relevant_laws
+
+
+def render_answer(mode: ModeName, texts: Dict[str, str]) -> str:
+    return "\n\n---\n\n".join(
+        f"## {SECTION_TITLES[name]}\n\n" + texts[name].strip()
+        for name in MODE_SECTIONS[mode]
+    )
+
+
+async def traced_flow(section: str, flow: Awaitable[str]) -> str:
+    with span(f"flow.{section}"), usage_section(section):
+        return await flow
+
+
 class LegalAdvisorAgent:
 
     def __init__(self) -> None:
@@ -20,43 +79,107 @@ class LegalAdvisorAgent:
     def handle_request(
         request_payload: Dict[str, Any],
     ) -> Tuple[ModeName, str]:
+        """Blocking ahandle_request, for scripts without an event loop."""
+
+        return asyncio.run(LegalAdvisorAgent.ahandle_request(request_payload))
+
+    @staticmethod
+    async def ahandle_request(
+        request_payload: Dict[str, Any],
+    ) -> Tuple[ModeName, str]:
+
+        mode_used, query, law_context, relevant_laws = parse_request(request_payload)
+        sections = MODE_SECTIONS[mode_used]
+        flows: Dict[str, Awaitable[str]] = {}
 
-        query = request_payload.get("query", "") or ""
-        if not query.strip():
-            raise ValueError("Missing 'query' in payload")
-
-        law_context: str = request_payload.get("law_context", "") or ""
-
-        relevant_laws: Optional[str] = request_payload.get("relevant_laws")
-
-        explain_text = run_explain_flow(
-            question=query,
-            law_context=law_context,
-            relevant_laws=relevant_laws,
-        )
-
-        referral_text = run_referral_flow(
-            user_situation=query,
-            relevant_laws=relevant_laws,
-        )
-
-        draft_text = run_draft_flow(
-            request_description=query,
-            law_context=law_context,
-            relevant_laws=relevant_laws,
-        )
-
-        full_answer = (
-            "## Explanation\n\n"
-            + explain_text.strip()
-            + "\n\n---\n\n"
-            + "## Referral\n\n"
-            + referral_text.strip()
-            + "\n\n---\n\n"
-            + "## Draft\n\n"
-            + draft_text.strip()
-        )
-
-        mode_used: ModeName = "pipeline"
-
-        return mode_used, full_answer
+        if "explain" in sections:
+            flows["explain"] = arun_explain_flow(
+                question=query,
+                law_context=law_context,
+                relevant_laws=relevant_laws,
+            )
+
+        if "referral" in sections:
+            flows["referral"] = arun_referral_flow(
+                user_situation=query,
+                relevant_laws=relevant_laws,
+            )
+
+        if "draft" in sections:
+            flows["draft"] = arun_draft_flow(
+                request_description=query,
+                law_context=law_context,
+                relevant_laws=relevant_laws,
+            )
+
+        with span("agent2.handle_request", mode=mode_used):
+            results = await asyncio.gather(*(traced_flow(name, flow) for name, flow in flows.items()))
+        texts = dict(zip(flows.keys(), results))
+
+        return mode_used, render_answer(mode_used, texts)
+
+    @staticmethod
+    def stream_request(
+        request_payload: Dict[str, Any],
+    ) -> Tuple[ModeName, AsyncIterator[Tuple[str, str]]]:
+        """Validate the payload and return the mode plus a stream of
+        (section, delta) pairs. Sections are generated concurrently, so
+        deltas of different sections are interleaved as they arrive."""
+
+        mode_used, query, law_context, relevant_laws = parse_request(request_payload)
+        sections = MODE_SECTIONS[mode_used]
+        streams: Dict[str, AsyncIterator[str]] = {}
+
+        if "explain" in sections:
+            streams["explain"] = astream_explain_flow(
+                question=query,
+                law_context=law_context,
+                relevant_laws=relevant_laws,
+            )
+
+        if "referral" in sections:
+            streams["referral"] = astream_referral_flow(
+                user_situation=query,
+                relevant_laws=relevant_laws,
+            )
+
+        if "draft" in sections:
+            streams["draft"] = astream_draft_flow(
+                request_description=query,
+                law_context=law_context,
+                relevant_laws=relevant_laws,
+            )
+
+        return mode_used, merge_streams(streams)
+
+
+async def merge_streams(
+    streams: Dict[str, AsyncIterator[str]],
+) -> AsyncIterator[Tuple[str, str]]:
+    queue: asyncio.Queue = asyncio.Queue()
+    done = object()
+
+    async def pump(name: str, stream: AsyncIterator[str]) -> None:
+        try:
+            with usage_section(name):
+                async for delta in stream:
+                    await queue.put((SECTION_EVENTS[name], delta))
+        except Exception as e:
+            await queue.put(e)
+        finally:
+            await queue.put(done)
+
+    tasks = [asyncio.create_task(pump(name, stream)) for name, stream in streams.items()]
+    remaining = len(tasks)
+    try:
+        while remaining:
+            item = await queue.get()
+            if item is done:
+                remaining -= 1
+            elif isinstance(item, Exception):
+                raise item
+            else:
+                yield item
+    finally:
+        for task in tasks:
+            task.cancel()
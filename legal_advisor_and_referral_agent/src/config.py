@@ -2,10 +2,13 @@ from __future__ import annotations
 
 from dotenv import load_dotenv
 from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
 from typing import Dict, List, Optional
 import os
 
+from langchain_openai import ChatOpenAI
+
 load_dotenv()
 SRC_DIR = Path(__file__).resolve().parent
 PROMPTS_DIR = SRC_DIR / "prompts"
@@ -38,6 +41,7 @@ class ModeConfig:
         return None
 
 
+@lru_cache(maxsize=None)
 def load_prompt(path: Path) -> str:
     if not path.exists():
         raise FileNotFoundError(f"Prompt file not found: {path}")
@@ -75,3 +79,21 @@ def get_mode_config(mode_name: str) -> ModeConfig:
             f"Unknown mode '{mode_name}'. Valid modes: {list(MODES.keys())}"
         )
     return MODES[key]
+
+
+@lru_cache(maxsize=None)
+def get_llm(
+    temperature: float = TEMPERATURE,
+    max_tokens: int = MAX_TOKENS,
+    model: str = MODEL_NAME,
+) -> ChatOpenAI:
+    """One shared client (and HTTP connection pool) per LLM profile."""
+    return ChatOpenAI(
+        model=model,
+        api_key=API_KEY,
+        base_url=BASE_URL,
+        temperature=temperature,
+        max_tokens=max_tokens,
+        # report token usage in the last chunk of streamed responses too
+        stream_usage=True,
+    )
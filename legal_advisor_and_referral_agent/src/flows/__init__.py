@@ -1,9 +1,58 @@
-from .explain_flow import run_explain_flow
-from .draft_flow import run_draft_flow
-from .referral_flow import run_referral_flow
+from typing import Any, Callable, Dict
+
+from .explain_flow import (
+    run_explain_flow,
+    arun_explain_flow,
+    astream_explain_flow,
+    build_explain_chain,
+)
+from .draft_flow import (
+    run_draft_flow,
+    arun_draft_flow,
+    astream_draft_flow,
+    build_draft_chain,
+    build_draft_decider_chain,
+)
+from .llm_cache import get_llm_cache
+from .usage import USAGE_COUNTERS, track_request_usage, usage_section
+from .referral_flow import (
+    run_referral_flow,
+    arun_referral_flow,
+    astream_referral_flow,
+    build_referral_chain,
+    build_referral_decider_chain,
+)
+
+# Chain builders are memoised, so calling them once at startup compiles every
+# prompt and creates the shared LLM clients before the first request arrives.
+CHAIN_REGISTRY: Dict[str, Callable[[], Any]] = {
+    "explain": build_explain_chain,
+    "draft_decider": build_draft_decider_chain,
+    "draft": build_draft_chain,
+    "referral_decider": build_referral_decider_chain,
+    "referral": build_referral_chain,
+}
+
+
+def init_chains() -> None:
+    for build in CHAIN_REGISTRY.values():
+        build()
+
 
 __all__ = [
     "run_explain_flow",
     "run_draft_flow",
     "run_referral_flow",
+    "arun_explain_flow",
+    "arun_draft_flow",
+    "arun_referral_flow",
+    "astream_explain_flow",
+    "astream_draft_flow",
+    "astream_referral_flow",
+    "CHAIN_REGISTRY",
+    "init_chains",
+    "get_llm_cache",
+    "USAGE_COUNTERS",
+    "track_request_usage",
+    "usage_section",
 ]
@@ -1,23 +1,23 @@
 from __future__ import annotations
 
-from typing import Optional, Any
+from typing import AsyncIterator, Optional, Any
+
+from functools import lru_cache
 
 from langchain_core.runnables import RunnableSerializable
-from langchain_openai import ChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate
 
 from ..config import (
-    MODEL_NAME,
-    TEMPERATURE,
-    MAX_TOKENS,
-    API_KEY,
-    BASE_URL,
+    get_llm,
     get_mode_config,
 )
+from .llm_cache import ainvoke_chain, astream_chain, invoke_chain
+from ..intents import decider_text, get_local_decider, log_decision
 
 
 
 
+@lru_cache(maxsize=None)
 def build_draft_decider_chain() -> RunnableSerializable[dict, Any]:
     prompt = ChatPromptTemplate.from_messages(
         [
@@ -49,39 +49,84 @@ def build_draft_decider_chain() -> RunnableSerializable[dict, Any]:
         ]
     )
 
-    llm = ChatOpenAI(
-        model=MODEL_NAME,
-        api_key=API_KEY,
-        base_url=BASE_URL,
-        temperature=0.0,
-        max_tokens=8,
-    )
+    llm = get_llm(temperature=0.0, max_tokens=8)
 
     chain: RunnableSerializable[dict, Any] = prompt | llm
     return chain
 
 
+def build_draft_decider_input(
+    request_description: str,
+    law_context: str = "",
+    relevant_laws: Optional[str] = None,
+) -> dict:
+    return {
+        "request_description": request_description,
+        "law_context": law_context or "",
+        "relevant_laws": relevant_laws or "",
+    }
+
+
+def draft_decider_text(inputs: dict) -> str:
+    """Features / log text of a draft decision, in a fixed field order."""
+    return decider_text(inputs["request_description"], inputs["law_context"], inputs["relevant_laws"])
+
+
+def local_draft_decision(inputs: dict) -> Optional[bool]:
+    decider = get_local_decider("draft")
+    if decider is None:
+        return None
+    labels = decider.decide(draft_decider_text(inputs))
+    return None if labels is None else "DRAFT" in labels
+
+
+def parse_draft_decision(text: str) -> bool:
+    decision = (text or "").strip().upper()
+    return decision == "DRAFT"
+
+
 def decide_should_draft(
     request_description: str,
     law_context: str = "",
     relevant_laws: Optional[str] = None,
 ) -> bool:
 
+    inputs = build_draft_decider_input(request_description, law_context, relevant_laws)
+    local = local_draft_decision(inputs)
+    if local is not None:
+        return local
+
     chain = build_draft_decider_chain()
 
-    resp = chain.invoke(
-        {
-            "request_description": request_description,
-            "law_context": law_context or "",
-            "relevant_laws": relevant_laws or "",
-        }
-    )
+    text = invoke_chain("draft_decider", chain, inputs)
 
-    decision = (resp.content or "").strip().upper()
-    return decision == "DRAFT"
+    should_draft = parse_draft_decision(text)
+    log_decision("draft", draft_decider_text(inputs), ["DRAFT"] if should_draft else [])
+    return should_draft
 
 
+async def adecide_should_draft(
+    request_description: str,
+    law_context: str = "",
+    relevant_laws: Optional[str] = None,
+) -> bool:
+
+    inputs = build_draft_decider_input(request_description, law_context, relevant_laws)
+    local = local_draft_decision(inputs)
+    if local is not None:
+        return local
+
+    chain = build_draft_decider_chain()
 
+    text = await ainvoke_chain("draft_decider", chain, inputs)
+
+    should_draft = parse_draft_decision(text)
+    log_decision("draft", draft_decider_text(inputs), ["DRAFT"] if should_draft else [])
+    return should_draft
+
+
+
+@lru_cache(maxsize=None)
 def build_draft_chain() -> RunnableSerializable[dict, Any]:
     mode = get_mode_config("draft")
     system_prompt = mode.load_system_prompt()
@@ -105,18 +150,22 @@ def build_draft_chain() -> RunnableSerializable[dict, Any]:
         ]
     )
 
-    llm = ChatOpenAI(
-        model=MODEL_NAME,
-        api_key=API_KEY,
-        base_url=BASE_URL,
-        temperature=TEMPERATURE,
-        max_tokens=MAX_TOKENS,
-    )
+    llm = get_llm()
 
     chain = prompt | llm
     return chain
 
 
+NO_DRAFT_MESSAGE = (
+    "At this stage, a concrete draft document (email, letter, clause, or form) "
+    "does not appear strictly necessary based on your situation and the legal "
+    "context provided.\n\n"
+    "- You can rely on the explanation and referral above as next steps.\n"
+    "- If you explicitly want a template email or document, you can ask for it "
+    "in a follow-up (for example: \"Draft an email to my employer explaining X\")."
+)
+
+
 def run_draft_flow(
     request_description: str,
     law_context: str = "",
@@ -129,24 +178,71 @@ def run_draft_flow(
     )
 
     if not should_draft:
-        return (
-            "At this stage, a concrete draft document (email, letter, clause, or form) "
-            "does not appear strictly necessary based on your situation and the legal "
-            "context provided.\n\n"
-            "- You can rely on the explanation and referral above as next steps.\n"
-            "- If you explicitly want a template email or document, you can ask for it "
-            "in a follow-up (for example: \"Draft an email to my employer explaining X\")."
-        )
+        return NO_DRAFT_MESSAGE
 
     chain = build_draft_chain()
 
     combined_context = law_context
 
-    resp = chain.invoke(
+    return invoke_chain(
+        "draft",
+        chain,
         {
             "request_description": request_description,
             "law_context": combined_context,
-        }
+        },
     )
 
-    return resp.content
+
+async def arun_draft_flow(
+    request_description: str,
+    law_context: str = "",
+    relevant_laws: Optional[str] = None,
+) -> str:
+    should_draft = await adecide_should_draft(
+        request_description=request_description,
+        law_context=law_context,
+        relevant_laws=relevant_laws,
+    )
+
+    if not should_draft:
+        return NO_DRAFT_MESSAGE
+
+    chain = build_draft_chain()
+
+    return await ainvoke_chain(
+        "draft",
+        chain,
+        {
+            "request_description": request_description,
+            "law_context": law_context,
+        },
+    )
+
+
+async def astream_draft_flow(
+    request_description: str,
+    law_context: str = "",
+    relevant_laws: Optional[str] = None,
+) -> AsyncIterator[str]:
+    should_draft = await adecide_should_draft(
+        request_description=request_description,
+        law_context=law_context,
+        relevant_laws=relevant_laws,
+    )
+
+    if not should_draft:
+        yield NO_DRAFT_MESSAGE
+        return
+
+    chain = build_draft_chain()
+
+    async for text in astream_chain(
+        "draft",
+        chain,
+        {
+            "request_description": request_description,
+            "law_context": law_context,
+        },
+    ):
+        yield text
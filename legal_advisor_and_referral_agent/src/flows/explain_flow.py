@@ -1,21 +1,20 @@
 from __future__ import annotations
 
-from typing import Optional, Any
+from typing import AsyncIterator, Optional, Any
+
+from functools import lru_cache
 
 from langchain_core.runnables import RunnableSerializable
-from langchain_openai import ChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate
 
 from ..config import (
-    MODEL_NAME,
-    TEMPERATURE,
-    MAX_TOKENS,
-    API_KEY,
-    BASE_URL,
+    get_llm,
     get_mode_config,
 )
+from .llm_cache import ainvoke_chain, astream_chain, invoke_chain
 
 
+@lru_cache(maxsize=None)
 def build_explain_chain() -> RunnableSerializable[dict, Any]:
     mode = get_mode_config("explain")
     system_prompt = mode.load_system_prompt()
@@ -39,18 +38,27 @@ def build_explain_chain() -> RunnableSerializable[dict, Any]:
         ]
     )
 
-    llm = ChatOpenAI(
-        model=MODEL_NAME,
-        api_key=API_KEY,
-        base_url=BASE_URL,
-        temperature=TEMPERATURE,
-        max_tokens=MAX_TOKENS,
-    )
+    llm = get_llm()
 
     chain = prompt | llm
     return chain
 
 
+def build_explain_input(
+    question: str,
+    law_context: str,
+    relevant_laws: Optional[str] = None,
+) -> dict:
+    combined_context = law_context
+    if relevant_laws:
+        combined_context = f"{law_context}\n\n[Relevant laws]\n{relevant_laws}"
+
+    return {
+        "law_context": combined_context,
+        "question": question,
+    }
+
+
 def run_explain_flow(
     question: str,
     law_context: str,
@@ -58,15 +66,37 @@ def run_explain_flow(
 ) -> str:
     chain = build_explain_chain()
 
-    combined_context = law_context
-    if relevant_laws:
-        combined_context = f"{law_context}\n\n[Relevant laws]\n{relevant_laws}"
+    return invoke_chain(
+        "explain",
+        chain,
+        build_explain_input(question, law_context, relevant_laws),
+    )
+
+
+async def arun_explain_flow(
+    question: str,
+    law_context: str,
+    relevant_laws: Optional[str] = None,
+) -> str:
+    chain = build_explain_chain()
 
-    resp = chain.invoke(
-        {
-            "law_context": combined_context,
-            "question": question,
-        }
+    return await ainvoke_chain(
+        "explain",
+        chain,
+        build_explain_input(question, law_context, relevant_laws),
     )
 
-    return resp.content
+
+async def astream_explain_flow(
+    question: str,
+    law_context: str,
+    relevant_laws: Optional[str] = None,
+) -> AsyncIterator[str]:
+    chain = build_explain_chain()
+
+    async for text in astream_chain(
+        "explain",
+        chain,
+        build_explain_input(question, law_context, relevant_laws),
+    ):
+        yield text
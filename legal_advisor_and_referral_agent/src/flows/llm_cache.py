@@ -0,0 +1,252 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, AsyncIterator, Dict, Optional
+
+from langchain_core.runnables import RunnableSerializable
+
+from ..tracing import span
+from .usage import record_chain_call
+
+# Temperature-0 deciders with a tiny output are always safe to replay.
+DETERMINISTIC_CHAINS = {"draft_decider", "referral_decider"}
+
+
+class LLMResponseCache:
+    """Content-addressed cache of LLM completions: in-memory LRU in front of
+    an optional SQLite file that survives restarts and is shared by workers."""
+
+    def __init__(
+        self,
+        max_size: int = 1024,
+        db_path: Optional[str] = None,
+        ttl: Optional[float] = None,
+    ):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._memory: "OrderedDict[str, tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self.stats: Dict[str, int] = {"hits": 0, "disk_hits": 0, "misses": 0}
+
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                "key TEXT PRIMARY KEY, content TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._db.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and self._fresh(entry[1]):
+                self._memory.move_to_end(key)
+                self.stats["hits"] += 1
+                return entry[0]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT content, created_at FROM llm_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None and self._fresh(row[1]):
+                    self._remember(key, row[0], row[1])
+                    self.stats["hits"] += 1
+                    self.stats["disk_hits"] += 1
+                    return row[0]
+
+            self.stats["misses"] += 1
+            return None
+
+    def put(self, key: str, content: str) -> None:
+        created_at = time.time()
+        with self._lock:
+            self._remember(key, content, created_at)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, content, created_at) VALUES (?, ?, ?)",
+                    (key, content, created_at),
+                )
+                self._db.commit()
+
+    async def aget(self, key: str) -> Optional[str]:
+        """get() for async callers: with a SQLite file, runs in a worker thread."""
+        if self._db is None:
+            return self.get(key)
+        return await asyncio.to_thread(self.get, key)
+
+    async def aput(self, key: str, content: str) -> None:
+        if self._db is None:
+            self.put(key, content)
+        else:
+            await asyncio.to_thread(self.put, key, content)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM llm_cache")
+                self._db.commit()
+
+    def _fresh(self, created_at: float) -> bool:
+        return self.ttl is None or time.time() - created_at < self.ttl
+
+    def _remember(self, key: str, content: str, created_at: float) -> None:
+        self._memory[key] = (content, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_size:
+            self._memory.popitem(last=False)
+
+
+@lru_cache(maxsize=None)
+def get_llm_cache() -> Optional[LLMResponseCache]:
+    if os.getenv("LLM_CACHE_ENABLED", "1") != "1":
+        return None
+    ttl = os.getenv("LLM_CACHE_TTL")
+    return LLMResponseCache(
+        max_size=int(os.getenv("LLM_CACHE_MAX_SIZE", "1024")),
+        db_path=os.getenv("LLM_CACHE_DB") or None,
+        ttl=float(ttl) if ttl else None,
+    )
+
+
+@lru_cache(maxsize=None)
+def cached_chain_names() -> frozenset:
+    """Deciders always; generative chains listed in LLM_CACHE_FLOWS (e.g. "explain,draft")."""
+    configured = {name.strip() for name in os.getenv("LLM_CACHE_FLOWS", "").split(",") if name.strip()}
+    return frozenset(DETERMINISTIC_CHAINS | configured)
+
+
+def chain_cache_key(chain: RunnableSerializable[dict, Any], inputs: dict) -> str:
+    """sha256 over the model, its sampling params and the fully rendered prompt."""
+    prompt, llm = chain.first, chain.last
+    messages = [(m.type, m.content) for m in prompt.invoke(inputs).to_messages()]
+    material = {
+        "model": getattr(llm, "model_name", None) or type(llm).__name__,
+        "temperature": getattr(llm, "temperature", None),
+        "max_tokens": getattr(llm, "max_tokens", None),
+        "messages": messages,
+    }
+    payload = json.dumps(material, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _cache_for(name: str) -> Optional[LLMResponseCache]:
+    cache = get_llm_cache()
+    return cache if cache is not None and name in cached_chain_names() else None
+
+
+def _lookup(name: str, chain: RunnableSerializable[dict, Any], inputs: dict):
+    cache = _cache_for(name)
+    if cache is None:
+        return None, None, None
+    key = chain_cache_key(chain, inputs)
+    return cache, key, cache.get(key)
+
+
+async def _alookup(name: str, chain: RunnableSerializable[dict, Any], inputs: dict):
+    cache = _cache_for(name)
+    if cache is None:
+        return None, None, None
+    key = chain_cache_key(chain, inputs)
+    return cache, key, await cache.aget(key)
+
+
+def _input_chars(inputs: dict) -> int:
+    return sum(len(str(value)) for value in inputs.values())
+
+
+def invoke_chain(name: str, chain: RunnableSerializable[dict, Any], inputs: dict) -> str:
+    with span(f"chain.{name}", **{"input.chars": _input_chars(inputs)}) as trace:
+        started = time.monotonic()
+        cache, key, hit = _lookup(name, chain, inputs)
+        trace.set(cache_hit=hit is not None)
+        if hit is not None:
+            trace.set(**{"output.chars": len(hit)})
+            record_chain_call(name, chain, inputs, hit, time.monotonic() - started, cached=True)
+            return hit
+
+        message = chain.invoke(inputs)
+        content = message.content
+        call = record_chain_call(
+            name, chain, inputs, content, time.monotonic() - started,
+            message.usage_metadata, message.response_metadata,
+        )
+        trace.set(**{"output.chars": len(content), "prompt_tokens": call.prompt_tokens, "completion_tokens": call.completion_tokens})
+        if cache is not None:
+            cache.put(key, content)
+        return content
+
+
+async def ainvoke_chain(name: str, chain: RunnableSerializable[dict, Any], inputs: dict) -> str:
+    with span(f"chain.{name}", **{"input.chars": _input_chars(inputs)}) as trace:
+        started = time.monotonic()
+        cache, key, hit = await _alookup(name, chain, inputs)
+        trace.set(cache_hit=hit is not None)
+        if hit is not None:
+            trace.set(**{"output.chars": len(hit)})
+            record_chain_call(name, chain, inputs, hit, time.monotonic() - started, cached=True)
+            return hit
+
+        message = await chain.ainvoke(inputs)
+        content = message.content
+        call = record_chain_call(
+            name, chain, inputs, content, time.monotonic() - started,
+            message.usage_metadata, message.response_metadata,
+        )
+        trace.set(**{"output.chars": len(content), "prompt_tokens": call.prompt_tokens, "completion_tokens": call.completion_tokens})
+        if cache is not None:
+            await cache.aput(key, content)
+        return content
+
+
+async def astream_chain(
+    name: str,
+    chain: RunnableSerializable[dict, Any],
+    inputs: dict,
+) -> AsyncIterator[str]:
+    """Stream a chain; a cache hit is replayed as one chunk, and a miss is
+    stored only once the stream has completed."""
+    # Not made current: the generator is suspended between chunks, so it must
+    # not leave its span in the consumer's context.
+    with span(f"chain.{name}", activate=False, stream=True, **{"input.chars": _input_chars(inputs)}) as trace:
+        started = time.monotonic()
+        cache, key, hit = await _alookup(name, chain, inputs)
+        trace.set(cache_hit=hit is not None)
+        if hit is not None:
+            trace.set(**{"output.chars": len(hit)})
+            record_chain_call(name, chain, inputs, hit, time.monotonic() - started, cached=True)
+            yield hit
+            return
+
+        parts = []
+        usage_metadata = None
+        response_metadata: Dict[str, Any] = {}
+        async for chunk in chain.astream(inputs):
+            if chunk.usage_metadata:
+                # reported once, in the final chunk (stream_usage=True)
+                usage_metadata = chunk.usage_metadata
+            response_metadata.update(chunk.response_metadata)
+            if chunk.content:
+                if not parts:
+                    trace.set(first_chunk_ms=round((time.time_ns() - trace.start_ns) / 1e6, 3))
+                parts.append(chunk.content)
+                yield chunk.content
+
+        content = "".join(parts)
+        call = record_chain_call(
+            name, chain, inputs, content, time.monotonic() - started,
+            usage_metadata, response_metadata,
+        )
+        trace.set(**{"output.chars": len(content), "prompt_tokens": call.prompt_tokens, "completion_tokens": call.completion_tokens})
+        if cache is not None:
+            await cache.aput(key, content)
@@ -1,19 +1,19 @@
 from __future__ import annotations
 
-from typing import Optional, Any, List, Dict
+from typing import AsyncIterator, Optional, Any, List, Dict
+
+import asyncio
+from functools import lru_cache
 
 from langchain_core.runnables import RunnableSerializable
-from langchain_openai import ChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate
 
 from ..config import (
-    MODEL_NAME,
-    TEMPERATURE,
-    MAX_TOKENS,
-    API_KEY,
-    BASE_URL,
+    get_llm,
     get_mode_config,
 )
+from .llm_cache import ainvoke_chain, astream_chain, invoke_chain
+from ..intents import decider_text, get_local_decider, log_decision
 from ..mcp_client import (
     SupportMCPError,
     SUPPORT_MCP_TOOLS,
@@ -50,6 +50,7 @@ AVAILABLE_TOOL_NAMES: List[str] = list(SUPPORT_MCP_TOOLS.keys())
 TOOLS_LIST_STR = ", ".join(AVAILABLE_TOOL_NAMES)
 
 
+@lru_cache(maxsize=None)
 def build_referral_decider_chain() -> RunnableSerializable[dict, Any]:
     prompt = ChatPromptTemplate.from_messages(
         [
@@ -83,32 +84,42 @@ def build_referral_decider_chain() -> RunnableSerializable[dict, Any]:
         ]
     )
 
-    llm = ChatOpenAI(
-        model=MODEL_NAME,
-        api_key=API_KEY,
-        base_url=BASE_URL,
-        temperature=0.0,
-        max_tokens=64,
-    )
+    llm = get_llm(temperature=0.0, max_tokens=64)
 
     chain: RunnableSerializable[dict, Any] = prompt | llm
     return chain
 
 
-def decide_support_tools(
+def build_referral_decider_input(
     user_situation: str,
     relevant_laws: Optional[str] = None,
-) -> List[str]:
-    chain = build_referral_decider_chain()
+) -> dict:
+    return {
+        "user_situation": user_situation,
+        "relevant_laws": relevant_laws or "",
+    }
 
-    resp = chain.invoke(
-        {
-            "user_situation": user_situation,
-            "relevant_laws": relevant_laws or "",
-        }
-    )
 
-    raw = (resp.content or "").strip()
+def referral_decider_text(inputs: dict) -> str:
+    """Features / log text of a referral decision, in a fixed field order."""
+    return decider_text(inputs["user_situation"], inputs["relevant_laws"])
+
+
+def local_support_tools(inputs: dict) -> Optional[List[str]]:
+    if not AVAILABLE_TOOL_NAMES:
+        # nothing to choose from: no need to ask anyone
+        return []
+    decider = get_local_decider("referral")
+    if decider is None:
+        return None
+    labels = decider.decide(referral_decider_text(inputs))
+    if labels is None:
+        return None
+    return [name for name in labels if name in AVAILABLE_TOOL_NAMES]
+
+
+def parse_support_tools(text: str) -> List[str]:
+    raw = (text or "").strip()
     normalized = raw.upper()
 
     if normalized == "NO_TOOL":
@@ -129,6 +140,43 @@ def decide_support_tools(
     return selected
 
 
+def decide_support_tools(
+    user_situation: str,
+    relevant_laws: Optional[str] = None,
+) -> List[str]:
+    inputs = build_referral_decider_input(user_situation, relevant_laws)
+    local = local_support_tools(inputs)
+    if local is not None:
+        return local
+
+    chain = build_referral_decider_chain()
+
+    text = invoke_chain("referral_decider", chain, inputs)
+
+    tool_names = parse_support_tools(text)
+    log_decision("referral", referral_decider_text(inputs), tool_names)
+    return tool_names
+
+
+async def adecide_support_tools(
+    user_situation: str,
+    relevant_laws: Optional[str] = None,
+) -> List[str]:
+    inputs = build_referral_decider_input(user_situation, relevant_laws)
+    local = local_support_tools(inputs)
+    if local is not None:
+        return local
+
+    chain = build_referral_decider_chain()
+
+    text = await ainvoke_chain("referral_decider", chain, inputs)
+
+    tool_names = parse_support_tools(text)
+    log_decision("referral", referral_decider_text(inputs), tool_names)
+    return tool_names
+
+
+@lru_cache(maxsize=None)
 def build_referral_chain() -> RunnableSerializable[dict, Any]:
     mode = get_mode_config("referral")
     system_prompt = mode.load_system_prompt()
@@ -154,29 +202,19 @@ def build_referral_chain() -> RunnableSerializable[dict, Any]:
         ]
     )
 
-    llm = ChatOpenAI(
-        model=MODEL_NAME,
-        api_key=API_KEY,
-        base_url=BASE_URL,
-        temperature=TEMPERATURE,
-        max_tokens=MAX_TOKENS,
-    )
+    llm = get_llm()
 
     chain: RunnableSerializable[dict, Any] = prompt | llm
     return chain
 
 
-def run_referral_flow(
+def collect_providers(
+    tool_names: List[str],
     user_situation: str,
     relevant_laws: Optional[str] = None,
-) -> str:
+) -> List[Dict[str, Any]]:
     providers: List[Dict[str, Any]] = []
 
-    tool_names = decide_support_tools(
-        user_situation=user_situation,
-        relevant_laws=relevant_laws,
-    )
-
     for tool_name in tool_names:
         try:
             result = call_support_tool(
@@ -188,17 +226,80 @@ def run_referral_flow(
         except SupportMCPError:
             continue
 
+    return providers
+
+
+def run_referral_flow(
+    user_situation: str,
+    relevant_laws: Optional[str] = None,
+) -> str:
+    tool_names = decide_support_tools(
+        user_situation=user_situation,
+        relevant_laws=relevant_laws,
+    )
+
+    providers = collect_providers(tool_names, user_situation, relevant_laws)
+
     chain = build_referral_chain()
 
     provider_block = format_providers_for_context(providers or [])
 
     situation_block = user_situation
 
-    resp = chain.invoke(
+    return invoke_chain(
+        "referral",
+        chain,
         {
             "user_situation": situation_block,
             "provider_block": provider_block,
-        }
+        },
     )
 
-    return resp.content
+
+async def abuild_referral_input(
+    user_situation: str,
+    relevant_laws: Optional[str] = None,
+) -> dict:
+    tool_names = await adecide_support_tools(
+        user_situation=user_situation,
+        relevant_laws=relevant_laws,
+    )
+
+    providers: List[Dict[str, Any]] = []
+    if tool_names:
+        # call_support_tool uses blocking requests; keep it off the event loop.
+        providers = await asyncio.to_thread(
+            collect_providers, tool_names, user_situation, relevant_laws
+        )
+
+    return {
+        "user_situation": user_situation,
+        "provider_block": format_providers_for_context(providers),
+    }
+
+
+async def arun_referral_flow(
+    user_situation: str,
+    relevant_laws: Optional[str] = None,
+) -> str:
+    chain = build_referral_chain()
+
+    return await ainvoke_chain(
+        "referral",
+        chain,
+        await abuild_referral_input(user_situation, relevant_laws),
+    )
+
+
+async def astream_referral_flow(
+    user_situation: str,
+    relevant_laws: Optional[str] = None,
+) -> AsyncIterator[str]:
+    chain = build_referral_chain()
+
+    async for text in astream_chain(
+        "referral",
+        chain,
+        await abuild_referral_input(user_situation, relevant_laws),
+    ):
+        yield text
@@ -0,0 +1,188 @@
+from __future__ import annotations
+
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from langchain_core.runnables import RunnableSerializable
+
+# Rough chars-per-token ratio, used only when the provider reports no usage.
+CHARS_PER_TOKEN = 4
+
+
+@dataclass
+class ChainCall:
+    chain: str
+    section: str
+    model: str
+    prompt_tokens: int
+    completion_tokens: int
+    seconds: float
+    cached: bool = False
+    estimated: bool = False
+    truncated: bool = False
+
+
+class RequestUsage:
+    """LLM calls of one request, grouped by answer section for A2AResponse.meta."""
+
+    def __init__(self) -> None:
+        self.calls: List[ChainCall] = []
+        self._lock = threading.Lock()
+
+    def add(self, call: ChainCall) -> None:
+        with self._lock:
+            self.calls.append(call)
+
+    def as_meta(self) -> Dict[str, Any]:
+        sections: Dict[str, Dict[str, Any]] = {}
+        for call in self.calls:
+            section = sections.setdefault(call.section, _empty_totals())
+            _accumulate(section, call)
+            section.setdefault("chains", []).append(
+                {key: value for key, value in asdict(call).items() if key != "section"}
+            )
+
+        total = _empty_totals()
+        for call in self.calls:
+            _accumulate(total, call)
+        return {"sections": sections, "total": total}
+
+
+def _empty_totals() -> Dict[str, Any]:
+    return {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0, "llm_seconds": 0.0}
+
+
+def _accumulate(totals: Dict[str, Any], call: ChainCall) -> None:
+    totals["calls"] += 1
+    totals["prompt_tokens"] += call.prompt_tokens
+    totals["completion_tokens"] += call.completion_tokens
+    totals["total_tokens"] += call.prompt_tokens + call.completion_tokens
+    totals["llm_seconds"] = round(totals["llm_seconds"] + call.seconds, 3)
+
+
+class UsageCounters:
+    """Process-wide counters per (section, chain, model, cached), exported at /metrics."""
+
+    def __init__(self) -> None:
+        self._counts: Dict[Tuple[str, str, str, bool], Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, call: ChainCall) -> None:
+        key = (call.section, call.chain, call.model, call.cached)
+        with self._lock:
+            counts = self._counts.setdefault(
+                key, {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "seconds": 0.0, "truncated": 0}
+            )
+            counts["calls"] += 1
+            counts["prompt_tokens"] += call.prompt_tokens
+            counts["completion_tokens"] += call.completion_tokens
+            counts["seconds"] += call.seconds
+            counts["truncated"] += call.truncated
+
+    def render(self) -> str:
+        """Prometheus text exposition format."""
+        families = [
+            ("agent2_llm_calls_total", "calls", "Chain invocations (cached=true were served from the LLM cache)."),
+            ("agent2_llm_prompt_tokens_total", "prompt_tokens", "Prompt tokens sent to the LLM."),
+            ("agent2_llm_completion_tokens_total", "completion_tokens", "Completion tokens returned by the LLM."),
+            ("agent2_llm_seconds_total", "seconds", "Wall time spent in chain invocations."),
+            ("agent2_llm_truncated_total", "truncated", "Completions cut off by max_tokens."),
+        ]
+        with self._lock:
+            snapshot = {key: dict(counts) for key, counts in self._counts.items()}
+
+        lines = []
+        for name, field, documentation in families:
+            lines += [f"# HELP {name} {documentation}", f"# TYPE {name} counter"]
+            for (section, chain, model, cached), counts in snapshot.items():
+                labels = f'section="{section}",chain="{chain}",model="{_escape(model)}",cached="{str(cached).lower()}"'
+                value = counts[field]
+                lines.append(f"{name}{{{labels}}} {round(value, 6) if isinstance(value, float) else value}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+USAGE_COUNTERS = UsageCounters()
+
+_request_usage: ContextVar[Optional[RequestUsage]] = ContextVar("request_usage", default=None)
+_section: ContextVar[Optional[str]] = ContextVar("usage_section", default=None)
+
+
+@contextmanager
+def track_request_usage() -> Iterator[RequestUsage]:
+    """Collect the LLM calls made inside the block (including tasks it starts)."""
+    usage = RequestUsage()
+    token = _request_usage.set(usage)
+    try:
+        yield usage
+    finally:
+        _request_usage.reset(token)
+
+
+@contextmanager
+def usage_section(name: str) -> Iterator[None]:
+    """Attribute the LLM calls made inside the block to an answer section."""
+    token = _section.set(name)
+    try:
+        yield
+    finally:
+        _section.reset(token)
+
+
+def _estimate_prompt_tokens(chain: RunnableSerializable[dict, Any], inputs: dict) -> int:
+    messages = chain.first.invoke(inputs).to_messages()
+    return sum(len(str(message.content)) for message in messages) // CHARS_PER_TOKEN
+
+
+def record_chain_call(
+    name: str,
+    chain: RunnableSerializable[dict, Any],
+    inputs: dict,
+    text: str,
+    seconds: float,
+    usage_metadata: Optional[Dict[str, Any]] = None,
+    response_metadata: Optional[Dict[str, Any]] = None,
+    cached: bool = False,
+) -> ChainCall:
+    """Record one chain invocation for the current request and the process counters.
+
+    Token counts come from the provider's usage report; without one they are
+    estimated from the rendered prompt and the output length. Cache hits cost
+    no tokens."""
+    response_metadata = response_metadata or {}
+    llm = chain.last
+    model = response_metadata.get("model_name") or getattr(llm, "model_name", None) or type(llm).__name__
+
+    if cached:
+        prompt_tokens, completion_tokens, estimated = 0, 0, False
+    elif usage_metadata:
+        prompt_tokens = int(usage_metadata.get("input_tokens", 0))
+        completion_tokens = int(usage_metadata.get("output_tokens", 0))
+        estimated = False
+    else:
+        prompt_tokens = _estimate_prompt_tokens(chain, inputs)
+        completion_tokens = len(text) // CHARS_PER_TOKEN
+        estimated = True
+
+    call = ChainCall(
+        chain=name,
+        section=_section.get() or name,
+        model=model,
+        prompt_tokens=prompt_tokens,
+        completion_tokens=completion_tokens,
+        seconds=round(seconds, 3),
+        cached=cached,
+        estimated=estimated,
+        truncated=response_metadata.get("finish_reason") == "length",
+    )
+    USAGE_COUNTERS.add(call)
+    usage = _request_usage.get()
+    if usage is not None:
+        usage.add(call)
+    return call
@@ -1,10 +1,194 @@
 from __future__ import annotations
 
-from typing import Literal, Optional
+from collections import deque
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, Literal, Optional
+
+import argparse
+import atexit
+import json
+import logging
+import math
+import os
+import queue
+import random
+import re
+import threading
+import time
+import zlib
+from logging.handlers import QueueHandler, QueueListener
 
 
 ModeName = Literal["pipeline", "explain", "draft", "referral"]
 
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+# ---------------------------------------------------------------------------
+# Keyword intent matcher
+#
+# Weighted EN/RU phrases, stemmed and compiled once into a token-level
+# Aho-Corasick automaton, so one pass over the query finds every phrase.
+# ---------------------------------------------------------------------------
+
+INTENT_KEYWORDS: Dict[str, Dict[str, float]] = {
+    "draft": {
+        "draft": 2.0, "redraft": 2.0, "write": 1.5, "rewrite": 1.5, "template": 1.5,
+        "letter": 1.5, "email": 1.5, "clause": 1.0, "contract": 1.0, "agreement": 1.0,
+        "add a clause": 1.0, "modify the clause": 1.0, "edit this clause": 1.0,
+        "edit this contract": 1.0,
+        "составь": 2.0, "составить": 2.0, "напиши": 2.0, "написать": 2.0, "подготовь": 2.0,
+        "подготовить": 2.0, "черновик": 2.0, "шаблон": 1.5, "образец": 1.5, "претензия": 1.5,
+        "заявление": 1.5, "жалоба": 1.0, "письмо": 1.5, "иск": 1.0, "исковое заявление": 1.0,
+        "договор": 1.0, "пункт договора": 1.0, "соглашение": 1.0, "доверенность": 1.5,
+    },
+    "referral": {
+        "lawyer": 2.0, "attorney": 2.0, "law firm": 2.0, "legal firm": 2.0,
+        "legal provider": 2.0, "recommend a lawyer": 1.0, "find a lawyer": 1.0,
+        "hire a lawyer": 1.0, "legal help": 1.5, "legal services": 1.5, "which law firm": 1.0,
+        "юрист": 2.0, "адвокат": 2.0, "нотариус": 2.0, "юридическая фирма": 2.0,
+        "юридическая помощь": 1.5, "юридические услуги": 1.5, "найти юриста": 1.0, "найдите юриста": 1.0,
+        "посоветуй юриста": 1.0, "порекомендуй": 1.0, "консультация юриста": 1.0,
+    },
+    "explain": {
+        "explain": 1.5, "what is": 1.0, "what are": 1.0, "what does": 1.0, "is it legal": 1.5,
+        "my rights": 1.5, "can i": 0.5, "how does": 1.0,
+        "объясни": 1.5, "объяснить": 1.5, "разъясни": 1.5, "что такое": 1.0, "что значит": 1.0,
+        "законно ли": 1.5, "имею ли я право": 1.5, "мои права": 1.5, "могу ли я": 0.5,
+        "что грозит": 1.0, "какая ответственность": 1.0,
+    },
+}
+
+# ties go to the cheaper / more specific flow first
+INTENT_PRIORITY: List[str] = ["draft", "referral", "explain"]
+INTENT_MIN_SCORE = float(os.getenv("INTENT_MIN_SCORE", "1.0"))
+
+_RU_ENDINGS = sorted(
+    [
+        "ования", "ирования", "иться", "ться", "ение", "ения", "ость", "ости", "ами", "ями",
+        "ого", "его", "ему", "ому", "ыми", "ими", "ая", "яя", "ое", "ее", "ые", "ие", "ый",
+        "ий", "ой", "ом", "ем", "ам", "ям", "ах", "ях", "ов", "ев", "ей", "ите", "йте", "ьте",
+        "ить", "ать", "ять", "еть", "ть", "у", "ю", "а", "я", "ы", "и", "е", "о", "ь", "й",
+    ],
+    key=len,
+    reverse=True,
+)
+# a 3-letter stem left by a verb ending is usually a different word ("искать" -> "иск")
+_RU_VERB_ENDINGS = {"иться", "ться", "ить", "ать", "ять", "еть", "ть", "ите", "йте", "ьте"}
+_EN_ENDINGS = ["ing", "ies", "ed", "es", "s"]
+
+
+def stem(word: str) -> str:
+    """Strip one common inflectional ending (RU or EN), keeping a 3+ char stem
+    (4+ for RU verb endings). EN stems also lose a final "e", so "clause",
+    "clauses" and "write", "writing" share a stem."""
+    if word.isascii():
+        for ending in _EN_ENDINGS:
+            if word.endswith(ending) and len(word) - len(ending) >= 3:
+                word = word[: -len(ending)]
+                break
+        return word[:-1] if word.endswith("e") and len(word) > 3 else word
+
+    for ending in _RU_ENDINGS:
+        min_stem = 4 if ending in _RU_VERB_ENDINGS else 3
+        if word.endswith(ending) and len(word) - len(ending) >= min_stem:
+            return word[: -len(ending)]
+    return word
+
+
+def normalize_tokens(text: str) -> List[str]:
+    return [stem(word) for word in _WORD_RE.findall(text.lower().replace("ё", "е"))]
+
+
+class KeywordMatcher:
+    """Aho-Corasick automaton over stemmed tokens for weighted, labelled phrases."""
+
+    def __init__(self, keywords: Dict[str, Dict[str, float]]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[tuple]] = [[]]
+
+        # Inflected forms of one phrase ("составь" / "составить") share a stem
+        # and must score once: keep a single pattern per stem, at its top weight.
+        patterns: Dict[tuple, tuple] = {}
+        for label, phrases in keywords.items():
+            for phrase, weight in phrases.items():
+                tokens = tuple(normalize_tokens(phrase))
+                if not tokens:
+                    continue
+                known = patterns.get((label, tokens))
+                if known is None or weight > known[2]:
+                    patterns[(label, tokens)] = (label, known[1] if known else phrase, weight)
+        for (_, tokens), output in patterns.items():
+            self._add(list(tokens), output)
+        self._build_failure_links()
+
+    def _add(self, tokens: List[str], output: tuple) -> None:
+        node = 0
+        for token in tokens:
+            if token not in self._goto[node]:
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+                self._goto[node][token] = len(self._goto) - 1
+            node = self._goto[node][token]
+        self._output[node].append(output)
+
+    def _build_failure_links(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for token, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and token not in self._goto[fail]:
+                    fail = self._fail[fail]
+                if node:
+                    self._fail[child] = self._goto[fail].get(token, 0)
+                self._output[child] = self._output[child] + self._output[self._fail[child]]
+
+    def matches(self, text: str) -> List[tuple]:
+        """All (label, phrase, weight) occurrences in the text."""
+        found = []
+        node = 0
+        for token in normalize_tokens(text):
+            while node and token not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(token, 0)
+            found.extend(self._output[node])
+        return found
+
+    def scores(self, text: str) -> Dict[str, float]:
+        """Per-label score: sum of weights of the distinct phrases found."""
+        scores: Dict[str, float] = {}
+        for label, _, weight in set(self.matches(text)):
+            scores[label] = scores.get(label, 0.0) + weight
+        return scores
+
+
+@lru_cache(maxsize=None)
+def get_keyword_matcher() -> KeywordMatcher:
+    return KeywordMatcher(INTENT_KEYWORDS)
+
+
+def classify_intents(
+    user_query: str,
+    min_score: float = INTENT_MIN_SCORE,
+) -> List[tuple]:
+    """Scored multi-label intents, best first: [(mode, score), ...]."""
+    scores = get_keyword_matcher().scores(user_query)
+    ranked = [(label, score) for label, score in scores.items() if score >= min_score]
+    ranked.sort(key=lambda item: (-item[1], INTENT_PRIORITY.index(item[0])))
+    return ranked
+
+
+def classify_intents_batch(
+    user_queries: List[str],
+    min_score: float = INTENT_MIN_SCORE,
+) -> List[List[tuple]]:
+    return [classify_intents(query, min_score) for query in user_queries]
+
 
 def classify_intent(
     user_query: str,
@@ -14,24 +198,220 @@ def classify_intent(
     if preferred_mode is not None:
         return preferred_mode
 
-    text = user_query.lower()
+    ranked = classify_intents(user_query)
+    if not ranked:
+        return "pipeline"
+    return ranked[0][0]
+
+
+def classify_intent_batch(
+    user_queries: List[str],
+    preferred_mode: Optional[ModeName] = None,
+) -> List[ModeName]:
+    return [classify_intent(query, preferred_mode) for query in user_queries]
+
+
+# ---------------------------------------------------------------------------
+# Local decider classifier
+#
+# Hashed word/bigram/char-trigram features + logistic regression, trained
+# from logged LLM decisions. Used in front of the draft / referral deciders:
+# confident predictions skip the LLM, uncertain ones fall back to it.
+# ---------------------------------------------------------------------------
+
+FEATURE_DIM = 1 << 18
+
+DECIDER_MODEL_DIR = os.getenv("DECIDER_MODEL_DIR", "")
+DECIDER_CONFIDENCE = float(os.getenv("DECIDER_CONFIDENCE", "0.85"))
+DECISION_LOG_PATH = os.getenv("DECISION_LOG_PATH", "")
+
+def hashed_features(text: str, dim: int = FEATURE_DIM) -> Dict[int, float]:
+    words = _WORD_RE.findall(text.lower())
+    grams = [f"w:{w}" for w in words]
+    grams += [f"b:{a} {b}" for a, b in zip(words, words[1:])]
+    for w in words:
+        padded = f"^{w}$"
+        grams += [f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2)]
+
+    features: Dict[int, float] = {}
+    for gram in grams:
+        index = zlib.crc32(gram.encode("utf-8")) % dim
+        features[index] = features.get(index, 0.0) + 1.0
+
+    norm = math.sqrt(sum(v * v for v in features.values()))
+    return {i: v / norm for i, v in features.items()} if norm else features
+
+
+class HashedLogisticClassifier:
+    """Binary logistic regression over hashed n-gram features."""
+
+    def __init__(self, weights: Optional[Dict[int, float]] = None, bias: float = 0.0):
+        self.weights: Dict[int, float] = weights or {}
+        self.bias = bias
+
+    def predict_proba(self, text: str) -> float:
+        features = hashed_features(text)
+        z = self.bias + sum(self.weights.get(i, 0.0) * v for i, v in features.items())
+        z = max(-30.0, min(30.0, z))
+        return 1.0 / (1.0 + math.exp(-z))
+
+    def fit(
+        self,
+        texts: List[str],
+        labels: List[int],
+        epochs: int = 20,
+        learning_rate: float = 0.5,
+        l2: float = 1e-5,
+        seed: int = 0,
+    ) -> "HashedLogisticClassifier":
+        samples = [(hashed_features(t), y) for t, y in zip(texts, labels)]
+        rng = random.Random(seed)
+        for _ in range(epochs):
+            rng.shuffle(samples)
+            for features, y in samples:
+                z = self.bias + sum(self.weights.get(i, 0.0) * v for i, v in features.items())
+                p = 1.0 / (1.0 + math.exp(-max(-30.0, min(30.0, z))))
+                grad = p - y
+                for i, v in features.items():
+                    w = self.weights.get(i, 0.0)
+                    self.weights[i] = w - learning_rate * (grad * v + l2 * w)
+                self.bias -= learning_rate * grad
+        return self
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"bias": self.bias, "weights": {str(i): w for i, w in self.weights.items() if w}}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "HashedLogisticClassifier":
+        return cls({int(i): w for i, w in data["weights"].items()}, data["bias"])
+
+
+class LocalDecider:
+    """One binary classifier per label (DRAFT, or one per support tool).
+
+    `decide` returns the predicted labels, or None when any label's
+    probability falls inside the uncertain band and the LLM should decide."""
+
+    def __init__(self, models: Dict[str, HashedLogisticClassifier], threshold: float = DECIDER_CONFIDENCE):
+        self.models = models
+        self.threshold = threshold
+
+    def decide(self, text: str) -> Optional[List[str]]:
+        selected = []
+        for label, model in self.models.items():
+            p = model.predict_proba(text)
+            if p >= self.threshold:
+                selected.append(label)
+            elif p > 1.0 - self.threshold:
+                return None
+        return selected
+
+    def save(self, path: Path) -> None:
+        data = {label: model.to_dict() for label, model in self.models.items()}
+        path.write_text(json.dumps(data), encoding="utf-8")
+
+    @classmethod
+    def load(cls, path: Path, threshold: float = DECIDER_CONFIDENCE) -> "LocalDecider":
+        data = json.loads(path.read_text(encoding="utf-8"))
+        return cls({label: HashedLogisticClassifier.from_dict(m) for label, m in data.items()}, threshold)
+
+
+@lru_cache(maxsize=None)
+def get_local_decider(name: str) -> Optional[LocalDecider]:
+    """Trained model for "draft" / "referral" from DECIDER_MODEL_DIR, if any."""
+    if not DECIDER_MODEL_DIR:
+        return None
+    path = Path(DECIDER_MODEL_DIR) / f"{name}.json"
+    if not path.exists():
+        return None
+    return LocalDecider.load(path)
+
+
+def decider_text(*parts: Optional[str]) -> str:
+    return "\n".join(part for part in parts if part)
+
+
+_decisions = logging.getLogger(f"{__name__}.decisions")
+_decisions.propagate = False
+_decision_log: Optional[QueueListener] = None
+_decision_log_lock = threading.Lock()
+
+
+def get_decision_logger() -> Optional[logging.Logger]:
+    """JSONL logger for DECISION_LOG_PATH. Records are queued and written by a
+    listener thread, so logging a decision never does file I/O on the event loop."""
+    global _decision_log
+    if not DECISION_LOG_PATH:
+        return None
+    with _decision_log_lock:
+        if _decision_log is None:
+            handler = logging.FileHandler(DECISION_LOG_PATH, encoding="utf-8")
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            records: queue.SimpleQueue = queue.SimpleQueue()
+            _decision_log = QueueListener(records, handler)
+            _decision_log.start()
+            _decisions.addHandler(QueueHandler(records))
+            _decisions.setLevel(logging.INFO)
+            atexit.register(close_decision_log)
+    return _decisions
+
+
+def close_decision_log() -> None:
+    """Write out the queued decisions and close the file. Call on application
+    shutdown: uvicorn re-raises SIGTERM after a graceful stop, so atexit may not run."""
+    global _decision_log
+    with _decision_log_lock:
+        if _decision_log is None:
+            return
+        for handler in list(_decisions.handlers):
+            _decisions.removeHandler(handler)
+        _decision_log.stop()
+        for handler in _decision_log.handlers:
+            handler.close()
+        _decision_log = None
+
+
+def log_decision(name: str, text: str, labels: List[str]) -> None:
+    """Append an LLM decision to the JSONL log used as training data."""
+    decisions = get_decision_logger()
+    if decisions is None:
+        return
+    record = {"decider": name, "text": text, "labels": labels, "ts": time.time()}
+    decisions.info(json.dumps(record, ensure_ascii=False))
+
+
+def train_local_decider(records: List[Dict[str, Any]], labels: Optional[List[str]] = None) -> LocalDecider:
+    texts = [r["text"] for r in records]
+    if labels is None:
+        labels = sorted({label for r in records for label in r["labels"]})
+    models = {
+        label: HashedLogisticClassifier().fit(texts, [int(label in r["labels"]) for r in records])
+        for label in labels
+    }
+    return LocalDecider(models)
+
 
-    draft_keywords = [
-        "draft", "write", "redraft", "rewrite", "clause", "contract", "agreement",
-        "letter", "email", "template", "add a clause", "modify the clause",
-        "edit this clause", "edit this contract",
-    ]
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Train local draft/referral deciders from the decision log.")
+    parser.add_argument("log", help="decision log (JSONL) written with DECISION_LOG_PATH")
+    parser.add_argument("--out", default=DECIDER_MODEL_DIR or ".", help="directory for draft.json / referral.json")
+    args = parser.parse_args(argv)
 
-    if any(kw in text for kw in draft_keywords):
-        return "draft"
+    by_decider: Dict[str, List[Dict[str, Any]]] = {}
+    with open(args.log, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                by_decider.setdefault(record["decider"], []).append(record)
 
-    referral_keywords = [
-        "lawyer", "attorney", "law firm", "legal firm", "legal provider",
-        "recommend a lawyer", "find a lawyer", "hire a lawyer", "legal help",
-        "legal services", "which law firm",
-    ]
+    out_dir = Path(args.out)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    for name, records in by_decider.items():
+        # the draft decider is a single DRAFT / NO_DRAFT label
+        decider = train_local_decider(records, ["DRAFT"] if name == "draft" else None)
+        decider.save(out_dir / f"{name}.json")
+        print(f"{name}: {len(records)} decisions, labels {list(decider.models)} -> {out_dir / f'{name}.json'}")
 
-    if any(kw in text for kw in referral_keywords):
-        return "referral"
 
-    return "pipeline"
+if __name__ == "__main__":
+    main()
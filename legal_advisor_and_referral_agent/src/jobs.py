@@ -0,0 +1,381 @@
+from __future__ import annotations
+
+import asyncio
+import ipaddress
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import urllib.parse
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+# (mode_used, answer_markdown, meta) for one request payload
+JobHandler = Callable[[Dict[str, Any]], Awaitable[Tuple[str, str, Dict[str, Any]]]]
+
+
+class QueueFullError(RuntimeError):
+    """Raised when the job queue is at capacity; the caller should retry later."""
+
+
+def check_callback_url(url: str, allowed_hosts: Optional[Set[str]] = None) -> None:
+    """Raise ValueError unless `url` is an acceptable job callback target.
+
+    The URL must be http(s). With `allowed_hosts` its host must be one of
+    them; otherwise every address the host resolves to must be public, so a
+    client cannot make the service POST into its own network. Blocking: the
+    host is resolved with getaddrinfo."""
+    parsed = urllib.parse.urlsplit(url)
+    if parsed.scheme not in ("http", "https") or not parsed.hostname:
+        raise ValueError(f"callback_url must be an http(s) URL: {url}")
+    host = parsed.hostname.lower()
+    if allowed_hosts is not None:
+        if host not in allowed_hosts:
+            raise ValueError(f"callback_url host is not allowed: {host}")
+        return
+
+    try:
+        infos = socket.getaddrinfo(host, parsed.port, type=socket.SOCK_STREAM)
+    except socket.gaierror:
+        raise ValueError(f"callback_url host does not resolve: {host}")
+    for info in infos:
+        address = ipaddress.ip_address(info[4][0].split("%")[0])
+        if address.version == 6 and address.ipv4_mapped is not None:
+            address = address.ipv4_mapped
+        if not address.is_global or address.is_multicast:
+            raise ValueError(f"callback_url host is not a public address: {host}")
+
+
+class JobStore:
+    """SQLite-backed job records, so queued work and results survive restarts."""
+
+    def __init__(self, db_path: str = "agent2_jobs.db"):
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, idempotency_key TEXT UNIQUE, status TEXT NOT NULL, "
+                "request TEXT NOT NULL, callback_url TEXT, mode_used TEXT, answer_markdown TEXT, "
+                "meta TEXT, error TEXT, callback_status TEXT, attempts INTEGER NOT NULL DEFAULT 0, "
+                "created_at REAL NOT NULL, started_at REAL, finished_at REAL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+            self._db.commit()
+
+    def create(
+        self,
+        request: Dict[str, Any],
+        callback_url: Optional[str] = None,
+        idempotency_key: Optional[str] = None,
+    ) -> Tuple[Dict[str, Any], bool]:
+        """Insert a queued job. Returns (job, created); a known idempotency key
+        returns the existing job instead."""
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            try:
+                self._db.execute(
+                    "INSERT INTO jobs (id, idempotency_key, status, request, callback_url, created_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (job_id, idempotency_key, QUEUED, json.dumps(request, ensure_ascii=False), callback_url, time.time()),
+                )
+                self._db.commit()
+                created = True
+            except sqlite3.IntegrityError:
+                row = self._db.execute("SELECT id FROM jobs WHERE idempotency_key = ?", (idempotency_key,)).fetchone()
+                job_id, created = row["id"], False
+        return self.get(job_id), created
+
+    def find_by_key(self, idempotency_key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db.execute("SELECT id FROM jobs WHERE idempotency_key = ?", (idempotency_key,)).fetchone()
+        return self.get(row["id"]) if row else None
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["request"] = json.loads(job["request"])
+        job["meta"] = json.loads(job["meta"]) if job["meta"] else None
+        return job
+
+    def delete(self, job_id: str) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+            self._db.commit()
+
+    def mark_running(self, job_id: str) -> None:
+        self._update(job_id, status=RUNNING, started_at=time.time(), attempts=None)
+
+    def mark_succeeded(self, job_id: str, mode_used: str, answer_markdown: str, meta: Dict[str, Any]) -> None:
+        self._update(
+            job_id, status=SUCCEEDED, mode_used=mode_used, answer_markdown=answer_markdown,
+            meta=json.dumps(meta, ensure_ascii=False), finished_at=time.time(),
+        )
+
+    def mark_failed(self, job_id: str, error: str) -> None:
+        self._update(job_id, status=FAILED, error=error, finished_at=time.time())
+
+    def set_callback_status(self, job_id: str, callback_status: str) -> None:
+        self._update(job_id, callback_status=callback_status)
+
+    def recover(self, max_attempts: int) -> Tuple[List[str], List[str]]:
+        """Prepare the jobs a stopped process left unfinished for another run.
+
+        A job still marked running was interrupted, and every start counted as
+        an attempt: it is queued again, or marked failed once it has used
+        `max_attempts`. Returns (queued job ids oldest first, failed job ids)."""
+        with self._lock, self._db:
+            failed = [
+                row["id"] for row in self._db.execute(
+                    "SELECT id FROM jobs WHERE status = ? AND attempts >= ?", (RUNNING, max_attempts)
+                )
+            ]
+            self._db.execute(
+                "UPDATE jobs SET status = ?, error = 'Gave up after ' || attempts || ' interrupted attempts', "
+                "finished_at = ? WHERE status = ? AND attempts >= ?",
+                (FAILED, time.time(), RUNNING, max_attempts),
+            )
+            self._db.execute("UPDATE jobs SET status = ? WHERE status = ?", (QUEUED, RUNNING))
+            queued = [
+                row["id"] for row in self._db.execute(
+                    "SELECT id FROM jobs WHERE status = ? ORDER BY created_at", (QUEUED,)
+                )
+            ]
+        return queued, failed
+
+    def purge(self, older_than: float) -> int:
+        """Delete finished jobs that completed more than `older_than` seconds ago."""
+        with self._lock:
+            cursor = self._db.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND finished_at < ?",
+                (SUCCEEDED, FAILED, time.time() - older_than),
+            )
+            self._db.commit()
+        return cursor.rowcount
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    def _update(self, job_id: str, **fields) -> None:
+        assignments = []
+        values = []
+        for name, value in fields.items():
+            if name == "attempts":
+                assignments.append("attempts = attempts + 1")
+            else:
+                assignments.append(f"{name} = ?")
+                values.append(value)
+        with self._lock:
+            self._db.execute(f"UPDATE jobs SET {', '.join(assignments)} WHERE id = ?", (*values, job_id))
+            self._db.commit()
+
+
+class JobManager:
+    """Bounded in-process job queue drained by a fixed pool of worker tasks.
+
+    Submitting fails fast with QueueFullError when `queue_size` jobs are
+    already waiting, so overload turns into a retryable 503 instead of an
+    ever-growing backlog. Jobs left queued or running by a previous process
+    are re-queued on start; a job that already failed to finish
+    `max_attempts` times is marked failed instead. Store calls run in a
+    thread so SQLite I/O does not block the event loop. Callback URLs are
+    checked with check_callback_url on submit and again before delivery."""
+
+    def __init__(
+        self,
+        store: JobStore,
+        handler: JobHandler,
+        workers: int = 4,
+        queue_size: int = 100,
+        max_attempts: int = 3,
+        callback_timeout: float = 10.0,
+        callback_retries: int = 3,
+        retention: Optional[float] = 7 * 24 * 3600,
+        purge_interval: float = 3600.0,
+        callback_hosts: Optional[Set[str]] = None,
+    ):
+        self.store = store
+        self.handler = handler
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.callback_timeout = callback_timeout
+        self.callback_retries = callback_retries
+        self.retention = retention
+        self.purge_interval = purge_interval
+        self.callback_hosts = callback_hosts
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self._tasks: List[asyncio.Task] = []
+        self._callbacks: Set[asyncio.Task] = set()
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @classmethod
+    def from_env(cls, handler: JobHandler) -> "JobManager":
+        return cls(
+            JobStore(os.getenv("JOBS_DB", "agent2_jobs.db")),
+            handler,
+            workers=int(os.getenv("JOBS_WORKERS", "4")),
+            queue_size=int(os.getenv("JOBS_QUEUE_SIZE", "100")),
+            max_attempts=int(os.getenv("JOBS_MAX_ATTEMPTS", "3")),
+            callback_timeout=float(os.getenv("JOBS_CALLBACK_TIMEOUT", "10")),
+            retention=float(os.getenv("JOBS_RETENTION_SECONDS", str(7 * 24 * 3600))),
+            purge_interval=float(os.getenv("JOBS_PURGE_INTERVAL_SECONDS", "3600")),
+            # comma-separated; when set, callbacks may only go to these hosts
+            callback_hosts={
+                host.strip().lower() for host in os.getenv("JOBS_CALLBACK_HOSTS", "").split(",") if host.strip()
+            } or None,
+        )
+
+    async def start(self) -> None:
+        # before any worker starts: recovery re-queues every job marked running
+        queued, failed = await asyncio.to_thread(self.store.recover, self.max_attempts)
+        self._client = httpx.AsyncClient(timeout=self.callback_timeout)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._requeue_unfinished(queued, failed)))
+        if self.retention:
+            self._tasks.append(asyncio.create_task(self._purge_periodically()))
+
+    async def stop(self) -> None:
+        # Jobs still queued or running stay so in the store and resume on restart.
+        tasks = [*self._tasks, *self._callbacks]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks = []
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        await asyncio.to_thread(self.store.close)
+
+    async def submit(
+        self,
+        request: Dict[str, Any],
+        callback_url: Optional[str] = None,
+        idempotency_key: Optional[str] = None,
+    ) -> Tuple[Dict[str, Any], bool]:
+        """Queue a job. A known idempotency key returns the existing job, even
+        when the queue is full, so a client retrying a 503 can still find it."""
+        if idempotency_key is not None:
+            job = await asyncio.to_thread(self.store.find_by_key, idempotency_key)
+            if job is not None:
+                return job, False
+        if callback_url is not None:
+            await asyncio.to_thread(check_callback_url, callback_url, self.callback_hosts)
+        if self.queue.full():
+            raise QueueFullError(f"Job queue is full ({self.queue.maxsize} waiting)")
+        job, created = await asyncio.to_thread(self.store.create, request, callback_url, idempotency_key)
+        if created:
+            try:
+                self.queue.put_nowait(job["id"])
+            except asyncio.QueueFull:
+                await asyncio.to_thread(self.store.delete, job["id"])
+                raise QueueFullError(f"Job queue is full ({self.queue.maxsize} waiting)")
+        return job, created
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self.store.get, job_id)
+
+    async def _requeue_unfinished(self, queued: List[str], failed: List[str]) -> None:
+        for job_id in failed:
+            self._notify_later(await self.get(job_id))
+        for job_id in queued:
+            await self.queue.put(job_id)
+
+    async def _purge_periodically(self) -> None:
+        """Delete jobs finished more than `retention` seconds ago, now and
+        every `purge_interval` seconds, so a long-running process does not
+        keep every result forever."""
+        while True:
+            try:
+                purged = await asyncio.to_thread(self.store.purge, self.retention)
+                if purged:
+                    logger.info(f"Purged {purged} finished jobs")
+            except sqlite3.Error as e:
+                logger.warning(f"Job purge failed: {e}")
+            await asyncio.sleep(self.purge_interval)
+
+    async def _worker(self) -> None:
+        while True:
+            job_id = await self.queue.get()
+            try:
+                await self._run(job_id)
+            except Exception as e:
+                logger.error(f"Job {job_id} crashed: {e}")
+            finally:
+                self.queue.task_done()
+
+    async def _run(self, job_id: str) -> None:
+        job = await self.get(job_id)
+        if job is None or job["status"] != QUEUED:
+            return
+        await asyncio.to_thread(self.store.mark_running, job_id)
+        try:
+            mode_used, answer, meta = await self.handler(job["request"])
+            await asyncio.to_thread(self.store.mark_succeeded, job_id, mode_used, answer, meta)
+        except Exception as e:
+            await asyncio.to_thread(self.store.mark_failed, job_id, f"{type(e).__name__}: {e}")
+        self._notify_later(await self.get(job_id))
+
+    def _notify_later(self, job: Dict[str, Any]) -> None:
+        if job["callback_url"]:
+            # delivered in the background so retries do not hold a worker
+            task = asyncio.create_task(self._notify(job))
+            self._callbacks.add(task)
+            task.add_done_callback(self._callbacks.discard)
+
+    async def _notify(self, job: Dict[str, Any]) -> None:
+        """POST the finished job to its callback URL, retrying with backoff."""
+        body = public_view(job)
+        status = "failed"
+        try:
+            # DNS may have changed since the job was submitted
+            await asyncio.to_thread(check_callback_url, job["callback_url"], self.callback_hosts)
+        except ValueError as e:
+            logger.warning(f"Callback for job {job['id']} not sent: {e}")
+            await asyncio.to_thread(self.store.set_callback_status, job["id"], status)
+            return
+        for attempt in range(self.callback_retries):
+            try:
+                response = await self._client.post(job["callback_url"], json=body)
+                if response.status_code < 400:
+                    status = "delivered"
+                    break
+                logger.warning(f"Callback for job {job['id']} returned {response.status_code}")
+            except httpx.HTTPError as e:
+                logger.warning(f"Callback for job {job['id']} failed: {e}")
+            if attempt + 1 < self.callback_retries:
+                await asyncio.sleep(2 ** attempt)
+        await asyncio.to_thread(self.store.set_callback_status, job["id"], status)
+
+
+def public_view(job: Dict[str, Any]) -> Dict[str, Any]:
+    """The fields of a job returned to clients (no request payload)."""
+    return {
+        "job_id": job["id"],
+        "status": job["status"],
+        "mode_used": job["mode_used"],
+        "answer_markdown": job["answer_markdown"],
+        "meta": job["meta"],
+        "error": job["error"],
+        "callback_status": job["callback_status"],
+        "created_at": job["created_at"],
+        "started_at": job["started_at"],
+        "finished_at": job["finished_at"],
+    }
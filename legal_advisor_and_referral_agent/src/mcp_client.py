@@ -5,6 +5,8 @@ from typing import Any, Dict, List, Optional
 import os
 import requests
 
+from .tracing import inject, span
+
 
 SUPPORT_MCP_BASE_URL = os.getenv("SUPPORT_MCP_BASE_URL", "http://support-mcp:8000")
 
@@ -16,6 +18,12 @@ SUPPORT_MCP_TOOLS: Dict[str, str] = {
     # still waiting
 }
 
+# e.g. SUPPORT_MCP_TOOLS="support.search_providers=/tools/search_providers"
+for _entry in os.getenv("SUPPORT_MCP_TOOLS", "").split(","):
+    _name, _, _path = _entry.partition("=")
+    if _name.strip() and _path.strip():
+        SUPPORT_MCP_TOOLS[_name.strip()] = _path.strip()
+
 
 def call_support_tool(
     tool_name: str,
@@ -33,22 +41,24 @@ def call_support_tool(
     if relevant_laws:
         payload["relevant_laws"] = relevant_laws
 
-    try:
-        resp = requests.post(url, json=payload, timeout=10)
-    except requests.RequestException as e:
-        raise SupportMCPError(f"Failed to reach Support MCP at {url}: {e}") from e
-
-    if resp.status_code != 200:
-        raise SupportMCPError(
-            f"Support MCP returned status {resp.status_code}: {resp.text}"
-        )
-
-    try:
-        data = resp.json()
-    except ValueError as e:
-        raise SupportMCPError(
-            f"Support MCP returned invalid JSON: {resp.text}"
-        ) from e
+    with span("support_mcp.call_tool", tool=tool_name) as support_span:
+        try:
+            resp = requests.post(url, json=payload, headers=inject(), timeout=10)
+        except requests.RequestException as e:
+            raise SupportMCPError(f"Failed to reach Support MCP at {url}: {e}") from e
+
+        support_span.set(**{"http.status_code": resp.status_code, "response.bytes": len(resp.content)})
+        if resp.status_code != 200:
+            raise SupportMCPError(
+                f"Support MCP returned status {resp.status_code}: {resp.text}"
+            )
+
+        try:
+            data = resp.json()
+        except ValueError as e:
+            raise SupportMCPError(
+                f"Support MCP returned invalid JSON: {resp.text}"
+            ) from e
 
     providers = data.get("providers", [])
     if not isinstance(providers, list):
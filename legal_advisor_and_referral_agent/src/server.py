@@ -1,12 +1,18 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List, Optional
+import json
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
 
-from .agent import LegalAdvisorAgent
-from .intents import ModeName
+from .agent import LegalAdvisorAgent, parse_request
+from .flows import USAGE_COUNTERS, init_chains, track_request_usage
+from .intents import ModeName, close_decision_log
+from .jobs import JobManager, QueueFullError, public_view
+from .tracing import shutdown as shutdown_tracing, span
 
 
 
@@ -34,32 +40,175 @@ class A2AResponse(BaseModel):
     meta: Dict[str, Any]
 
 
+class A2AJobRequest(A2ARequest):
+    # a public http(s) URL, or one on a host listed in JOBS_CALLBACK_HOSTS
+    callback_url: Optional[str] = None
+    # resubmitting with the same key returns the existing job instead of a new one
+    idempotency_key: Optional[str] = None
+
+
+class A2AJob(BaseModel):
+    job_id: str
+    status: str
+    mode_used: Optional[ModeName] = None
+    answer_markdown: Optional[str] = None
+    meta: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    callback_status: Optional[str] = None
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+
+_agent = LegalAdvisorAgent()
+_jobs: Optional[JobManager] = None
+
+
+async def answer_request(payload: Dict[str, Any]):
+    with track_request_usage() as usage:
+        mode_used, answer = await _agent.ahandle_request(payload)
+    return mode_used, answer, {"success": True, "error": None, "usage": usage.as_meta()}
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global _jobs
+    init_chains()
+    _jobs = JobManager.from_env(answer_request)
+    await _jobs.start()
+    yield
+    await _jobs.stop()
+    close_decision_log()
+    shutdown_tracing()
+
 
 app = FastAPI(
     title="Legal Advisor & Referral Agent",
     description="HTTP API for agent-to-agent (A2A) communication.",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
-_agent = LegalAdvisorAgent()
+
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    with span(
+        f"{request.method} {request.url.path}",
+        traceparent=request.headers.get("traceparent"),
+        **{"http.method": request.method, "http.route": request.url.path},
+    ) as request_span:
+        response = await call_next(request)
+        request_span.set(**{"http.status_code": response.status_code})
+        traceparent = request_span.traceparent()
+        if traceparent:
+            response.headers["traceparent"] = traceparent
+        # the body (an SSE stream in particular) is sent after this returns
+        request_span.end_later()
+        response.body_iterator = _end_span_after_body(response.body_iterator, request_span)
+        return response
+
+
+async def _end_span_after_body(body: AsyncIterator[bytes], request_span) -> AsyncIterator[bytes]:
+    try:
+        async for chunk in body:
+            yield chunk
+    except Exception:
+        request_span.status = "error"
+        raise
+    finally:
+        request_span.end()
 
 
 @app.post("/legal-advisor-and-referral", response_model=A2AResponse)
 async def legal_advisor_endpoint(request: A2ARequest) -> A2AResponse:
     try:
         payload: Dict[str, Any] = request.model_dump()
-        mode_used, answer = _agent.handle_request(payload)
+        mode_used, answer, meta = await answer_request(payload)
 
         return A2AResponse(
             mode_used=mode_used,
             answer_markdown=answer,
-            meta={
-                "success": True,
-                "error": None,
-            },
+            meta=meta,
         )
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         # Unexpected server-side error
         raise HTTPException(status_code=500, detail=f"Internal error: {e}")
+
+
+@app.post("/legal-advisor-and-referral/jobs", response_model=A2AJob, status_code=202)
+async def submit_job(request: A2AJobRequest, response: Response) -> A2AJob:
+    """Queue a request and return its job id at once; poll the job or pass a callback_url."""
+    payload: Dict[str, Any] = request.model_dump(exclude={"callback_url", "idempotency_key"})
+    try:
+        parse_request(payload)
+        job, created = await _jobs.submit(payload, request.callback_url, request.idempotency_key)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+
+    if not created:
+        response.status_code = 200
+    response.headers["Location"] = f"/legal-advisor-and-referral/jobs/{job['id']}"
+    return A2AJob(**public_view(job))
+
+
+@app.get("/legal-advisor-and-referral/jobs/{job_id}", response_model=A2AJob)
+async def get_job(job_id: str) -> A2AJob:
+    job = await _jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job: {job_id}")
+    return A2AJob(**public_view(job))
+
+
+def format_sse(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@app.post("/legal-advisor-and-referral/stream")
+async def legal_advisor_stream_endpoint(request: A2ARequest) -> StreamingResponse:
+    """Stream section deltas as SSE events, then a final `meta` event.
+
+    The response starts with the first delta, so a run that fails before
+    producing any output gets a 500. A failure after that is reported as an
+    `error` event, followed by `meta` with success false."""
+    try:
+        payload: Dict[str, Any] = request.model_dump()
+        mode_used, deltas = _agent.stream_request(payload)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # The section tasks start on the first pull and keep this usage context.
+    with track_request_usage() as usage:
+        try:
+            first = await anext(deltas, None)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Internal error: {e}")
+
+    async def event_source() -> AsyncIterator[str]:
+        meta: Dict[str, Any] = {"mode_used": mode_used, "success": True, "error": None}
+        try:
+            if first is not None:
+                section, delta = first
+                yield format_sse(section, {"delta": delta})
+                async for section, delta in deltas:
+                    yield format_sse(section, {"delta": delta})
+        except Exception as e:
+            meta.update(success=False, error=f"Internal error: {e}")
+            yield format_sse("error", {"error": meta["error"]})
+        meta["usage"] = usage.as_meta()
+        yield format_sse("meta", meta)
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/metrics")
+async def metrics() -> PlainTextResponse:
+    """LLM call, token and latency counters in the Prometheus text format."""
+    return PlainTextResponse(USAGE_COUNTERS.render(), media_type="text/plain; version=0.0.4")
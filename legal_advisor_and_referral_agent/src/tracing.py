@@ -0,0 +1,18 @@
+"""Tracing for legal_advisor_and_referral_agent. The implementation is shared
+by all three services and lives in telemetry/tracing.py at the repository root."""
+
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+
+from telemetry import Span, Tracing  # noqa: E402
+
+TRACING = Tracing("legal_advisor_and_referral_agent")
+
+span = TRACING.span
+current_span = TRACING.current_span
+inject = TRACING.inject
+shutdown = TRACING.shutdown
+
+__all__ = ["Span", "TRACING", "current_span", "inject", "shutdown", "span"]
@@ -0,0 +1,75 @@
+import asyncio
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src import agent as agent_module
+from src.agent import LegalAdvisorAgent
+
+
+@pytest.fixture
+def flows(monkeypatch):
+    """Replace the three async flows with stubs that record their calls.
+
+    `flows.barrier` (when set) makes every stub wait until that many flows
+    are running at once, so a test hangs unless they run concurrently."""
+
+    class Flows:
+        calls = []
+        barrier = None
+
+    def stub(section):
+        async def flow(**kwargs):
+            Flows.calls.append(section)
+            if Flows.barrier is not None:
+                await Flows.barrier.wait()
+            return f"{section} text"
+        return flow
+
+    monkeypatch.setattr(agent_module, "arun_explain_flow", stub("explain"))
+    monkeypatch.setattr(agent_module, "arun_referral_flow", stub("referral"))
+    monkeypatch.setattr(agent_module, "arun_draft_flow", stub("draft"))
+    return Flows
+
+
+class TestHandleRequest:
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("mode", ["explain", "referral", "draft"])
+    async def test_requested_mode_runs_only_its_flow(self, flows, mode):
+        # the query alone would classify as draft
+        payload = {"mode": mode, "query": "Составь претензию поставщику"}
+        mode_used, answer = await LegalAdvisorAgent.ahandle_request(payload)
+
+        assert mode_used == mode
+        assert flows.calls == [mode]
+        assert answer == f"## {agent_module.SECTION_TITLES[mode]}\n\n{mode} text"
+
+    @pytest.mark.asyncio
+    async def test_pipeline_flows_run_concurrently(self, flows):
+        flows.barrier = asyncio.Barrier(3)
+        payload = {"mode": "pipeline", "query": "что такое неустойка?"}
+
+        async with asyncio.timeout(2):
+            mode_used, answer = await LegalAdvisorAgent.ahandle_request(payload)
+
+        assert mode_used == "pipeline"
+        assert sorted(flows.calls) == ["draft", "explain", "referral"]
+        # sections keep their order whichever flow finishes first
+        assert [line for line in answer.splitlines() if line.startswith("## ")] == [
+            "## Explanation", "## Referral", "## Draft",
+        ]
+
+    @pytest.mark.asyncio
+    async def test_missing_mode_is_classified(self, flows):
+        mode_used, _ = await LegalAdvisorAgent.ahandle_request({"query": "Составь претензию поставщику"})
+        assert mode_used == "draft"
+        assert flows.calls == ["draft"]
+
+    def test_sync_wrapper_runs_the_async_path(self, flows):
+        mode_used, answer = LegalAdvisorAgent.handle_request({"mode": "explain", "query": "что такое неустойка?"})
+        assert mode_used == "explain"
+        assert flows.calls == ["explain"]
+        assert answer.endswith("explain text")
@@ -0,0 +1,260 @@
+import json
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src import intents
+from src.flows import draft_flow, referral_flow
+from src.intents import (
+    HashedLogisticClassifier,
+    KeywordMatcher,
+    LocalDecider,
+    classify_intent,
+    classify_intents,
+    close_decision_log,
+    get_keyword_matcher,
+    log_decision,
+    normalize_tokens,
+    stem,
+    train_local_decider,
+)
+
+
+class TestStemming:
+
+    @pytest.mark.parametrize("word, expected", [
+        ("составь", "состав"),
+        ("составить", "состав"),
+        ("составьте", "состав"),
+        ("претензия", "претензи"),
+        ("претензию", "претензи"),
+        ("lawyers", "lawyer"),
+        ("drafting", "draft"),
+    ])
+    def test_inflections_share_a_stem(self, word, expected):
+        assert stem(word) == expected
+
+    def test_short_words_are_kept(self):
+        assert stem("иск") == "иск"
+        assert stem("is") == "is"
+
+    @pytest.mark.parametrize("inflected, keyword", [
+        ("clauses", "clause"),
+        ("templates", "template"),
+        ("writes", "write"),
+        ("writing", "write"),
+        ("rewrites", "rewrite"),
+        ("services", "service"),
+    ])
+    def test_en_forms_match_e_ending_keywords(self, inflected, keyword):
+        assert stem(inflected) == stem(keyword)
+
+    def test_ru_verb_ending_keeps_a_longer_stem(self):
+        # "искать" (to search) must not reduce to the keyword "иск" (lawsuit)
+        assert stem("искать") != stem("иск")
+        assert stem("иска") == stem("иском") == stem("иск")
+        assert stem("составить") == stem("составь")
+
+    def test_normalize_tokens_lowercases_and_folds_yo(self):
+        assert normalize_tokens("Ещё РАЗ, юристы!") == ["еще", "раз", "юрист"]
+
+
+class TestKeywordMatcher:
+
+    def test_finds_phrases_in_inflected_text(self):
+        matcher = KeywordMatcher({"referral": {"найти юриста": 1.0}})
+        assert matcher.matches("помогите найти юристов в Москве") == [("referral", "найти юриста", 1.0)]
+
+    def test_overlapping_phrases_are_all_found(self):
+        matcher = KeywordMatcher({"draft": {"исковое заявление": 1.0, "заявление": 1.5, "пункт договора": 1.0, "договор": 1.0}})
+        found = matcher.matches("исковое заявление по пункту договора")
+        assert sorted(phrase for _, phrase, _ in found) == ["договор", "заявление", "исковое заявление", "пункт договора"]
+        assert matcher.scores("исковое заявление по пункту договора") == {"draft": 4.5}
+
+    def test_phrases_with_the_same_stem_count_once(self):
+        matcher = KeywordMatcher({"draft": {"составь": 2.0, "составить": 2.0, "претензия": 1.5}})
+        assert matcher.scores("Составьте претензию") == {"draft": 3.5}
+
+    def test_same_stem_keeps_the_higher_weight(self):
+        matcher = KeywordMatcher({"draft": {"шаблон": 1.0, "шаблоны": 1.5}})
+        assert matcher.scores("нужен шаблон") == {"draft": 1.5}
+
+    def test_repeated_phrase_counts_once(self):
+        matcher = KeywordMatcher({"referral": {"юрист": 2.0}})
+        assert matcher.scores("юрист, юрист и ещё юрист") == {"referral": 2.0}
+
+    def test_same_stem_under_different_labels_scores_for_each(self):
+        matcher = KeywordMatcher({"draft": {"договор": 1.0}, "explain": {"договора": 0.5}})
+        assert matcher.scores("договор") == {"draft": 1.0, "explain": 0.5}
+
+
+class TestClassifier:
+
+    @pytest.mark.parametrize("query", [
+        "Review the clauses in my lease",
+        "Send me templates for a lease",
+        "Who writes the lease?",
+    ])
+    def test_inflected_en_keywords_count_as_draft(self, query):
+        assert dict(classify_intents(query, min_score=0))["draft"] >= 1.0
+
+    def test_searching_is_not_a_lawsuit(self):
+        assert "draft" not in dict(classify_intents("Где искать информацию о компании?", min_score=0))
+        assert dict(classify_intents("Подай иск в суд", min_score=0))["draft"] == 1.0
+
+    def test_builtin_keywords_score_a_draft_request_once_per_stem(self):
+        assert get_keyword_matcher().scores("Составьте претензию") == {"draft": 3.5}
+
+    def test_ranked_best_first_with_priority_on_ties(self):
+        ranked = classify_intents("составь письмо и найди юриста", min_score=1.0)
+        assert [label for label, _ in ranked] == ["draft", "referral"]
+        # equal scores: draft wins over referral
+        assert classify_intents("шаблон, юридические услуги", min_score=1.0) == [("draft", 1.5), ("referral", 1.5)]
+
+    def test_threshold_drops_weak_intents(self):
+        assert classify_intents("могу ли я", min_score=1.0) == []
+        assert classify_intents("могу ли я", min_score=0.5) == [("explain", 0.5)]
+
+    def test_classify_intent(self):
+        assert classify_intent("Составьте претензию к продавцу") == "draft"
+        assert classify_intent("посоветуйте адвоката") == "referral"
+        assert classify_intent("что такое неустойка?") == "explain"
+        assert classify_intent("добрый день") == "pipeline"
+        assert classify_intent("составь письмо", preferred_mode="explain") == "explain"
+
+
+class FixedModel:
+    def __init__(self, probability: float):
+        self.probability = probability
+        self.texts = []
+
+    def predict_proba(self, text: str) -> float:
+        self.texts.append(text)
+        return self.probability
+
+
+DRAFT_LOG = [
+    {"text": "составь претензию продавцу", "labels": ["DRAFT"]},
+    {"text": "напиши письмо арендодателю", "labels": ["DRAFT"]},
+    {"text": "подготовь шаблон договора", "labels": ["DRAFT"]},
+    {"text": "что такое неустойка", "labels": []},
+    {"text": "объясни мои права", "labels": []},
+    {"text": "законно ли увольнение", "labels": []},
+]
+
+
+class TestLocalDecider:
+
+    def test_classifier_learns_logged_decisions(self):
+        decider = train_local_decider(DRAFT_LOG, ["DRAFT"])
+        model = decider.models["DRAFT"]
+        assert model.predict_proba("составь претензию") > 0.5
+        assert model.predict_proba("что такое неустойка") < 0.5
+
+    def test_save_and_load_keep_predictions(self, tmp_path):
+        decider = train_local_decider(DRAFT_LOG, ["DRAFT"])
+        decider.save(tmp_path / "draft.json")
+        loaded = LocalDecider.load(tmp_path / "draft.json")
+        text = "напиши претензию"
+        assert loaded.models["DRAFT"].predict_proba(text) == pytest.approx(decider.models["DRAFT"].predict_proba(text))
+
+    @pytest.mark.parametrize("probability, expected", [(0.95, ["DRAFT"]), (0.05, []), (0.5, None), (0.85, ["DRAFT"]), (0.2, None)])
+    def test_threshold(self, probability, expected):
+        assert LocalDecider({"DRAFT": FixedModel(probability)}, threshold=0.85).decide("text") == expected
+
+    def test_any_uncertain_label_defers_to_the_llm(self):
+        models = {"a": FixedModel(0.99), "b": FixedModel(0.6)}
+        assert LocalDecider(models, threshold=0.85).decide("text") is None
+
+    def test_untrained_classifier_is_uncertain(self):
+        assert HashedLogisticClassifier().predict_proba("anything") == 0.5
+
+
+class TestDeciderFallback:
+
+    @pytest.fixture
+    def llm(self, monkeypatch):
+        calls = []
+        logged = []
+        answer = ["NO_DRAFT"]
+
+        async def ainvoke_chain(name, chain, inputs):
+            calls.append((name, inputs))
+            return answer[0]
+
+        for flow in (draft_flow, referral_flow):
+            monkeypatch.setattr(flow, "ainvoke_chain", ainvoke_chain)
+            monkeypatch.setattr(flow, "log_decision", lambda *args: logged.append(args))
+        monkeypatch.setattr(draft_flow, "build_draft_decider_chain", lambda: None)
+        monkeypatch.setattr(referral_flow, "build_referral_decider_chain", lambda: None)
+        return {"calls": calls, "logged": logged, "answer": answer}
+
+    def use_decider(self, monkeypatch, flow, probability):
+        model = FixedModel(probability)
+        label = "DRAFT" if flow is draft_flow else "support.search_providers"
+        monkeypatch.setattr(flow, "get_local_decider", lambda name: LocalDecider({label: model}))
+        return model
+
+    @pytest.mark.asyncio
+    async def test_confident_local_decision_skips_the_llm(self, monkeypatch, llm):
+        self.use_decider(monkeypatch, draft_flow, 0.97)
+        assert await draft_flow.adecide_should_draft("составь претензию") is True
+        assert llm["calls"] == [] and llm["logged"] == []
+
+    @pytest.mark.asyncio
+    async def test_uncertain_local_decision_falls_back_to_the_llm_and_is_logged(self, monkeypatch, llm):
+        self.use_decider(monkeypatch, draft_flow, 0.5)
+        llm["answer"][0] = "DRAFT"
+        assert await draft_flow.adecide_should_draft("помогите", "контекст") is True
+        assert [name for name, _ in llm["calls"]] == ["draft_decider"]
+        assert llm["logged"] == [("draft", "помогите\nконтекст", ["DRAFT"])]
+
+    @pytest.mark.asyncio
+    async def test_no_model_falls_back_to_the_llm(self, monkeypatch, llm):
+        monkeypatch.setattr(draft_flow, "get_local_decider", lambda name: None)
+        assert await draft_flow.adecide_should_draft("что такое неустойка") is False
+        assert len(llm["calls"]) == 1
+
+    @pytest.mark.asyncio
+    async def test_referral_decider(self, monkeypatch, llm):
+        monkeypatch.setattr(referral_flow, "AVAILABLE_TOOL_NAMES", ["support.search_providers"])
+        self.use_decider(monkeypatch, referral_flow, 0.99)
+        assert await referral_flow.adecide_support_tools("нужен юрист") == ["support.search_providers"]
+        assert llm["calls"] == []
+
+        self.use_decider(monkeypatch, referral_flow, 0.4)
+        llm["answer"][0] = "NO_TOOL"
+        assert await referral_flow.adecide_support_tools("нужен юрист") == []
+        assert len(llm["calls"]) == 1
+
+    def test_feature_text_does_not_depend_on_input_order(self, monkeypatch):
+        model = self.use_decider(monkeypatch, draft_flow, 0.97)
+        inputs = draft_flow.build_draft_decider_input("запрос", "контекст", "закон")
+        draft_flow.local_draft_decision(inputs)
+        draft_flow.local_draft_decision(dict(reversed(list(inputs.items()))))
+        assert model.texts == ["запрос\nконтекст\nзакон"] * 2
+
+
+class TestDecisionLog:
+
+    def test_decisions_are_written_as_jsonl(self, monkeypatch, tmp_path):
+        path = tmp_path / "decisions.jsonl"
+        monkeypatch.setattr(intents, "DECISION_LOG_PATH", str(path))
+        try:
+            log_decision("draft", "составь претензию", ["DRAFT"])
+            log_decision("referral", "нужен юрист", [])
+        finally:
+            close_decision_log()
+
+        records = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+        assert [(r["decider"], r["text"], r["labels"]) for r in records] == [
+            ("draft", "составь претензию", ["DRAFT"]),
+            ("referral", "нужен юрист", []),
+        ]
+
+    def test_disabled_without_a_path(self, monkeypatch):
+        monkeypatch.setattr(intents, "DECISION_LOG_PATH", "")
+        assert intents.get_decision_logger() is None
+        log_decision("draft", "text", [])
@@ -0,0 +1,321 @@
+import asyncio
+import os
+import sys
+import time
+import httpx
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.jobs import (
+    FAILED,
+    QUEUED,
+    RUNNING,
+    SUCCEEDED,
+    JobManager,
+    JobStore,
+    QueueFullError,
+    check_callback_url,
+)
+
+REQUEST = {"mode": "explain", "user_input": "что такое неустойка?"}
+
+
+class Handler:
+    def __init__(self, error: Exception | None = None):
+        self.error = error
+        self.requests = []
+
+    async def __call__(self, request):
+        self.requests.append(request)
+        if self.error is not None:
+            raise self.error
+        return "explain", "Ответ", {"success": True}
+
+
+async def wait_until_finished(manager: JobManager, job_id: str) -> dict:
+    async with asyncio.timeout(5):
+        while True:
+            job = await manager.get(job_id)
+            if job["status"] in (SUCCEEDED, FAILED):
+                return job
+            await asyncio.sleep(0.01)
+
+
+class TestJobStore:
+
+    def test_create_and_find_by_key(self, tmp_path):
+        store = JobStore(str(tmp_path / "jobs.db"))
+        job, created = store.create(REQUEST, idempotency_key="k1")
+        assert created and job["status"] == QUEUED and job["request"] == REQUEST
+
+        again, created = store.create({"other": 1}, idempotency_key="k1")
+        assert not created and again["id"] == job["id"]
+        assert store.find_by_key("k1")["id"] == job["id"]
+        assert store.find_by_key("k2") is None
+        store.close()
+
+    def test_recover_counts_interrupted_runs(self, tmp_path):
+        store = JobStore(str(tmp_path / "jobs.db"))
+        queued, _ = store.create(REQUEST)
+        interrupted, _ = store.create(REQUEST)
+        exhausted, _ = store.create(REQUEST)
+        store.mark_running(interrupted["id"])
+        for _ in range(3):
+            store.mark_running(exhausted["id"])
+
+        requeue, failed = store.recover(max_attempts=3)
+
+        assert requeue == [queued["id"], interrupted["id"]]
+        assert failed == [exhausted["id"]]
+        assert store.get(interrupted["id"])["status"] == QUEUED
+        assert store.get(interrupted["id"])["attempts"] == 1
+        assert store.get(exhausted["id"])["status"] == FAILED
+        assert store.get(exhausted["id"])["error"] == "Gave up after 3 interrupted attempts"
+        store.close()
+
+
+class TestJobManager:
+
+    @pytest.fixture
+    def db_path(self, tmp_path):
+        return str(tmp_path / "jobs.db")
+
+    @pytest.mark.asyncio
+    async def test_submitted_job_runs(self, db_path):
+        handler = Handler()
+        manager = JobManager(JobStore(db_path), handler, workers=1)
+        await manager.start()
+        try:
+            job, created = await manager.submit(REQUEST)
+            assert created
+            finished = await wait_until_finished(manager, job["id"])
+        finally:
+            await manager.stop()
+
+        assert finished["status"] == SUCCEEDED
+        assert finished["answer_markdown"] == "Ответ"
+        assert finished["attempts"] == 1
+        assert handler.requests == [REQUEST]
+
+    @pytest.mark.asyncio
+    async def test_handler_error_fails_the_job(self, db_path):
+        manager = JobManager(JobStore(db_path), Handler(ValueError("bad mode")), workers=1)
+        await manager.start()
+        try:
+            job, _ = await manager.submit(REQUEST)
+            finished = await wait_until_finished(manager, job["id"])
+        finally:
+            await manager.stop()
+
+        assert finished["status"] == FAILED
+        assert finished["error"] == "ValueError: bad mode"
+
+    @pytest.mark.asyncio
+    async def test_idempotency_key_returns_the_existing_job(self, db_path):
+        handler = Handler()
+        manager = JobManager(JobStore(db_path), handler, workers=1)
+        await manager.start()
+        try:
+            first, created = await manager.submit(REQUEST, idempotency_key="k1")
+            assert created
+            await wait_until_finished(manager, first["id"])
+            second, created = await manager.submit(REQUEST, idempotency_key="k1")
+        finally:
+            await manager.stop()
+
+        assert not created
+        assert second["id"] == first["id"] and second["status"] == SUCCEEDED
+        assert len(handler.requests) == 1
+
+    @pytest.mark.asyncio
+    async def test_full_queue_rejects_new_jobs_but_finds_known_keys(self, db_path):
+        # no workers: submitted jobs stay queued
+        manager = JobManager(JobStore(db_path), Handler(), workers=0, queue_size=1)
+        await manager.start()
+        try:
+            first, _ = await manager.submit(REQUEST, idempotency_key="k1")
+            with pytest.raises(QueueFullError):
+                await manager.submit(REQUEST, idempotency_key="k2")
+            assert manager.store.find_by_key("k2") is None
+
+            again, created = await manager.submit(REQUEST, idempotency_key="k1")
+            assert not created and again["id"] == first["id"]
+        finally:
+            await manager.stop()
+
+    @pytest.mark.asyncio
+    async def test_restart_resumes_queued_and_interrupted_jobs(self, db_path):
+        store = JobStore(db_path)
+        queued, _ = store.create(REQUEST)
+        interrupted, _ = store.create(REQUEST)
+        store.mark_running(interrupted["id"])
+        store.close()
+
+        handler = Handler()
+        manager = JobManager(JobStore(db_path), handler, workers=1)
+        await manager.start()
+        try:
+            first = await wait_until_finished(manager, queued["id"])
+            second = await wait_until_finished(manager, interrupted["id"])
+        finally:
+            await manager.stop()
+
+        assert first["status"] == second["status"] == SUCCEEDED
+        assert second["attempts"] == 2
+        assert len(handler.requests) == 2
+
+    @pytest.mark.asyncio
+    async def test_restart_gives_up_after_max_attempts(self, db_path):
+        store = JobStore(db_path)
+        job, _ = store.create(REQUEST)
+        for _ in range(2):
+            store.mark_running(job["id"])
+        store.close()
+
+        handler = Handler()
+        manager = JobManager(JobStore(db_path), handler, workers=1, max_attempts=2)
+        await manager.start()
+        try:
+            finished = await wait_until_finished(manager, job["id"])
+        finally:
+            await manager.stop()
+
+        assert finished["status"] == FAILED
+        assert finished["error"] == "Gave up after 2 interrupted attempts"
+        assert handler.requests == []
+
+    @pytest.mark.asyncio
+    async def test_recovery_does_not_requeue_jobs_of_this_process(self, db_path):
+        started, release = asyncio.Event(), asyncio.Event()
+
+        async def wait_for_release(request):
+            started.set()
+            await release.wait()
+            return "explain", "Ответ", {"success": True}
+
+        store = JobStore(db_path)
+        recover = store.recover
+
+        def slow_recover(max_attempts):
+            time.sleep(0.05)
+            return recover(max_attempts)
+
+        store.recover = slow_recover
+        manager = JobManager(store, wait_for_release, workers=1)
+        await manager.start()
+        try:
+            job, _ = await manager.submit(REQUEST)
+            await started.wait()
+            await asyncio.sleep(0.1)
+            assert (await manager.get(job["id"]))["status"] == RUNNING
+            release.set()
+            finished = await wait_until_finished(manager, job["id"])
+        finally:
+            await manager.stop()
+
+        assert finished["status"] == SUCCEEDED and finished["attempts"] == 1
+
+    @pytest.mark.asyncio
+    async def test_finished_jobs_are_purged_while_running(self, db_path):
+        manager = JobManager(JobStore(db_path), Handler(), workers=1, retention=0.05, purge_interval=0.02)
+        await manager.start()
+        try:
+            # submitted after the first purge pass, so a later pass must remove it
+            job, _ = await manager.submit(REQUEST)
+            async with asyncio.timeout(5):
+                while await manager.get(job["id"]) is not None:
+                    await asyncio.sleep(0.01)
+        finally:
+            await manager.stop()
+
+    @pytest.mark.asyncio
+    async def test_stop_leaves_a_running_job_to_resume(self, db_path):
+        started = asyncio.Event()
+
+        async def hang(request):
+            started.set()
+            await asyncio.Event().wait()
+
+        manager = JobManager(JobStore(db_path), hang, workers=1)
+        await manager.start()
+        job, _ = await manager.submit(REQUEST)
+        await started.wait()
+        await manager.stop()
+
+        store = JobStore(db_path)
+        assert store.get(job["id"])["status"] == RUNNING
+        assert store.recover(max_attempts=3) == ([job["id"]], [])
+        store.close()
+
+
+class TestCallbackUrl:
+
+    @pytest.mark.parametrize("url", [
+        "file:///etc/passwd",
+        "gopher://example.com/",
+        "http:///no-host",
+        "http://127.0.0.1:8000/hook",
+        "http://localhost/hook",
+        "http://10.0.0.5/hook",
+        "http://192.168.1.10/hook",
+        "http://169.254.169.254/latest/meta-data/",
+        "http://[::1]/hook",
+        "http://[::ffff:10.0.0.1]/hook",
+        "http://0.0.0.0/hook",
+    ])
+    def test_rejects_non_http_and_non_public_targets(self, url):
+        with pytest.raises(ValueError):
+            check_callback_url(url)
+
+    def test_accepts_a_public_address(self):
+        check_callback_url("https://93.184.216.34/hooks/agent2")
+
+    def test_allowlist_replaces_the_address_check(self):
+        allowed = {"localhost", "hooks.internal"}
+        check_callback_url("http://localhost:9000/hook", allowed)
+        check_callback_url("https://HOOKS.internal/agent2", allowed)
+        with pytest.raises(ValueError):
+            check_callback_url("https://93.184.216.34/hook", allowed)
+        with pytest.raises(ValueError):
+            check_callback_url("ftp://localhost/hook", allowed)
+
+    @pytest.mark.asyncio
+    async def test_submit_rejects_a_private_callback(self, tmp_path):
+        manager = JobManager(JobStore(str(tmp_path / "jobs.db")), Handler(), workers=0)
+        await manager.start()
+        try:
+            with pytest.raises(ValueError):
+                await manager.submit(REQUEST, callback_url="http://169.254.169.254/", idempotency_key="k1")
+            assert manager.store.find_by_key("k1") is None
+            assert manager.queue.empty()
+        finally:
+            await manager.stop()
+
+    @pytest.mark.asyncio
+    async def test_callback_is_delivered_to_an_allowed_host(self, tmp_path):
+        delivered = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            delivered.append(request.url.host)
+            return httpx.Response(204)
+
+        manager = JobManager(
+            JobStore(str(tmp_path / "jobs.db")), Handler(), workers=1, callback_hosts={"hooks.test"},
+        )
+        await manager.start()
+        await manager._client.aclose()
+        manager._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        try:
+            job, _ = await manager.submit(REQUEST, callback_url="https://hooks.test/agent2")
+            await wait_until_finished(manager, job["id"])
+            async with asyncio.timeout(5):
+                while (await manager.get(job["id"]))["callback_status"] is None:
+                    await asyncio.sleep(0.01)
+        finally:
+            await manager.stop()
+
+        assert delivered == ["hooks.test"]
+        store = JobStore(str(tmp_path / "jobs.db"))
+        assert store.get(job["id"])["callback_status"] == "delivered"
+        store.close()
@@ -0,0 +1,128 @@
+import os
+import sys
+import threading
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_openai import ChatOpenAI
+
+from src.flows import llm_cache
+from src.flows.llm_cache import (
+    LLMResponseCache,
+    ainvoke_chain,
+    astream_chain,
+    cached_chain_names,
+    chain_cache_key,
+)
+
+PROMPT = ChatPromptTemplate.from_messages([("system", "Ты юрист."), ("human", "{question}")])
+
+
+def openai_chain(prompt=PROMPT, **params):
+    params = {"model": "model-a", "temperature": 0.0, "max_tokens": 8, **params}
+    return prompt | ChatOpenAI(api_key="test", base_url="http://llm.invalid", **params)
+
+
+class TestCacheKey:
+
+    def test_same_rendered_prompt_same_key(self):
+        # variables the template does not use do not change the prompt
+        assert chain_cache_key(openai_chain(), {"question": "что такое неустойка?"}) == chain_cache_key(
+            openai_chain(), {"question": "что такое неустойка?", "unused": "x"}
+        )
+
+    @pytest.mark.parametrize("params", [{"model": "model-b"}, {"temperature": 0.7}, {"max_tokens": 64}])
+    def test_model_and_sampling_params_change_the_key(self, params):
+        inputs = {"question": "что такое неустойка?"}
+        assert chain_cache_key(openai_chain(**params), inputs) != chain_cache_key(openai_chain(), inputs)
+
+    def test_rendered_messages_change_the_key(self):
+        chain = openai_chain()
+        assert chain_cache_key(chain, {"question": "а"}) != chain_cache_key(chain, {"question": "б"})
+
+        other_system = ChatPromptTemplate.from_messages([("system", "Ты адвокат."), ("human", "{question}")])
+        assert chain_cache_key(openai_chain(other_system), {"question": "а"}) != chain_cache_key(chain, {"question": "а"})
+
+
+class TestCachedChains:
+
+    @pytest.fixture(autouse=True)
+    def fresh_config(self):
+        cached_chain_names.cache_clear()
+        yield
+        cached_chain_names.cache_clear()
+
+    def test_deciders_are_always_cached(self, monkeypatch):
+        monkeypatch.delenv("LLM_CACHE_FLOWS", raising=False)
+        assert cached_chain_names() == {"draft_decider", "referral_decider"}
+
+    def test_flows_allowlist(self, monkeypatch):
+        monkeypatch.setenv("LLM_CACHE_FLOWS", " explain, ,draft ")
+        assert cached_chain_names() == {"draft_decider", "referral_decider", "explain", "draft"}
+
+    @pytest.mark.asyncio
+    async def test_only_allowlisted_chains_use_the_cache(self, monkeypatch):
+        monkeypatch.setenv("LLM_CACHE_FLOWS", "explain")
+        cache = LLMResponseCache()
+        monkeypatch.setattr(llm_cache, "get_llm_cache", lambda: cache)
+        llm = FakeListChatModel(responses=["один", "два", "три", "четыре"])
+        chain = PROMPT | llm
+        inputs = {"question": "вопрос"}
+
+        assert await ainvoke_chain("explain", chain, inputs) == "один"
+        assert await ainvoke_chain("explain", chain, inputs) == "один"
+        assert await ainvoke_chain("referral", chain, inputs) == "два"
+        assert await ainvoke_chain("referral", chain, inputs) == "три"
+
+
+class TestLLMResponseCache:
+
+    def test_lru_eviction(self):
+        cache = LLMResponseCache(max_size=2)
+        cache.put("a", "1")
+        cache.put("b", "2")
+        cache.get("a")
+        cache.put("c", "3")
+        assert cache.get("b") is None
+        assert cache.get("a") == "1" and cache.get("c") == "3"
+
+    def test_ttl(self, monkeypatch):
+        cache = LLMResponseCache(ttl=10)
+        cache.put("a", "1")
+        monkeypatch.setattr(llm_cache.time, "time", lambda: 2e10)
+        assert cache.get("a") is None
+
+    def test_disk_entries_survive_a_new_instance(self, tmp_path):
+        db_path = str(tmp_path / "llm.db")
+        LLMResponseCache(db_path=db_path).put("a", "1")
+        cache = LLMResponseCache(db_path=db_path)
+        assert cache.get("a") == "1"
+        assert cache.stats["disk_hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_async_access_to_sqlite_runs_off_the_event_loop(self, tmp_path):
+        cache = LLMResponseCache(db_path=str(tmp_path / "llm.db"))
+        threads = []
+        get, put = cache.get, cache.put
+        cache.get = lambda key: threads.append(threading.get_ident()) or get(key)
+        cache.put = lambda key, content: threads.append(threading.get_ident()) or put(key, content)
+
+        await cache.aput("a", "1")
+        assert await cache.aget("a") == "1"
+        assert len(threads) == 2
+        assert threading.get_ident() not in threads
+
+    @pytest.mark.asyncio
+    async def test_stream_is_stored_once_complete_and_replayed(self, monkeypatch):
+        cache = LLMResponseCache()
+        monkeypatch.setattr(llm_cache, "get_llm_cache", lambda: cache)
+        chain = PROMPT | FakeListChatModel(responses=["ответ"])
+        inputs = {"question": "вопрос"}
+
+        streamed = [chunk async for chunk in astream_chain("draft_decider", chain, inputs)]
+        assert "".join(streamed) == "ответ"
+        assert [chunk async for chunk in astream_chain("draft_decider", chain, inputs)] == ["ответ"]
+        assert cache.stats["hits"] == 1
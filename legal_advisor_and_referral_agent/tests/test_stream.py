@@ -0,0 +1,77 @@
+import json
+import os
+import sys
+import httpx
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src import server
+
+URL = "/legal-advisor-and-referral/stream"
+
+
+def parse_events(body: str):
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+@pytest.fixture
+def stream_with(monkeypatch):
+    def use(*items):
+        async def deltas():
+            for item in items:
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+
+        monkeypatch.setattr(server._agent, "stream_request", lambda payload: ("explain", deltas()))
+
+    return use
+
+
+async def post(json_body):
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://agent2") as client:
+        return await client.post(URL, json=json_body)
+
+
+class TestStreamEndpoint:
+
+    @pytest.mark.asyncio
+    async def test_deltas_then_meta(self, stream_with):
+        stream_with(("explanation", "Не"), ("explanation", "устойка"))
+        response = await post({"query": "что такое неустойка?", "mode": "explain"})
+
+        assert response.status_code == 200
+        events = parse_events(response.text)
+        assert events[:2] == [("explanation", {"delta": "Не"}), ("explanation", {"delta": "устойка"})]
+        assert events[2][0] == "meta"
+        assert events[2][1]["success"] is True and events[2][1]["mode_used"] == "explain"
+
+    @pytest.mark.asyncio
+    async def test_failure_before_any_output_is_a_500(self, stream_with):
+        stream_with(RuntimeError("LLM unavailable"))
+        response = await post({"query": "что такое неустойка?"})
+
+        assert response.status_code == 500
+        assert response.json() == {"detail": "Internal error: LLM unavailable"}
+
+    @pytest.mark.asyncio
+    async def test_failure_mid_stream_sends_an_error_event(self, stream_with):
+        stream_with(("explanation", "Не"), RuntimeError("connection reset"))
+        response = await post({"query": "что такое неустойка?"})
+
+        assert response.status_code == 200
+        events = parse_events(response.text)
+        assert [name for name, _ in events] == ["explanation", "error", "meta"]
+        assert events[1][1] == {"error": "Internal error: connection reset"}
+        assert events[2][1]["success"] is False
+
+    @pytest.mark.asyncio
+    async def test_invalid_request_is_a_400(self):
+        response = await post({"query": " "})
+        assert response.status_code == 400
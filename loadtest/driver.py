@@ -0,0 +1,71 @@
+import asyncio
+import itertools
+import time
+from typing import Callable, Dict, List
+
+import httpx
+
+from .stats import StatsRecorder
+
+QUESTIONS = [
+    "Проверь компанию 7707083893 перед заключением договора",
+    "Какие риски у контрагента ИНН 7736050003?",
+    "Составь претензию поставщику ООО Тюн Ит за просрочку поставки",
+    "Найди юриста по арбитражным спорам в Москве",
+    "What are my rights if a supplier misses a delivery deadline?",
+    "Draft a letter to my landlord about the deposit",
+]
+
+TARGETS = {
+    "agent_law": ("/api/user", lambda q: {"question": q}),
+    "agent2": ("/legal-advisor-and-referral", lambda q: {"query": q, "law_context": ""}),
+}
+
+
+async def drive(
+    base_url: str,
+    target: str,
+    concurrency: int = 10,
+    total: int = 100,
+    timeout: float = 300.0,
+    questions: List[str] | None = None,
+) -> Dict[str, object]:
+    """Send `total` requests with `concurrency` in flight and record end-to-end latency."""
+    path, make_payload = TARGETS[target]
+    stage = f"e2e:{target}"
+    recorder = StatsRecorder()
+    pool = itertools.cycle(questions or QUESTIONS)
+    remaining = iter(range(total))
+
+    async def worker(client: httpx.AsyncClient):
+        for _ in remaining:
+            started = time.perf_counter()
+            try:
+                response = await client.post(path, json=make_payload(next(pool)))
+                body = response.json() if response.status_code == 200 else {}
+                failed = response.status_code != 200 or _has_error(body)
+            except (httpx.HTTPError, ValueError):
+                failed = True
+            recorder.record(stage, time.perf_counter() - started, error=failed)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    summary = recorder.summary()
+    summary[stage]["rps"] = round(total / elapsed, 2)
+    return summary
+
+
+def _has_error(body) -> bool:
+    if not isinstance(body, dict):
+        return False
+    if "error" in body:
+        return True
+    meta = body.get("meta")
+    if isinstance(meta, dict) and meta.get("success") is False:
+        return True
+    agent2 = body.get("agent2_response")
+    return isinstance(agent2, dict) and "error" in agent2
@@ -0,0 +1,284 @@
+"""
+Local stand-ins for the paid / remote dependencies of the agent chain:
+
+- llm:      OpenAI-compatible /chat/completions (plain and streaming)
+- registry: Checko (/v2/...) and DaData (/dadata) serving recorded payloads
+- support:  support-MCP provider search (/tools/search_providers)
+
+Every emulator injects latency (+ jitter), a token rate for LLM output and a
+configurable error rate, and exposes per-stage latencies at GET /_stats.
+
+    python -m loadtest.emulators llm --port 18001 --latency-ms 400 --tokens-per-sec 60
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+from .stats import StatsRecorder, add_stats_routes
+
+PAYLOADS_DIR = Path(__file__).resolve().parent.parent / "intelligence_MCP" / "benchmarks" / "payloads"
+
+# recorded company payloads and how often each one is served
+COMPANY_MIX = [("company_small.json", 0.8), ("company_many_founders.json", 0.1), ("company_arbitration.json", 0.1)]
+
+SAMPLE_INNS = ["7707083893", "7736050003", "7700000001", "7728168971", "7702070139"]
+
+WORDS = (
+    "согласно статье закона сторона вправе требовать возмещения убытков в порядке "
+    "установленном гражданским кодексом при этом срок исковой давности составляет три года"
+).split()
+
+
+@dataclass
+class Profile:
+    latency_ms: float = 50.0
+    jitter_ms: float = 10.0
+    error_rate: float = 0.0
+    error_status: int = 500
+    tokens_per_sec: float = 50.0
+    completion_tokens: int = 200
+    seed: int | None = None
+
+    def __post_init__(self):
+        self.rng = random.Random(self.seed)
+
+    def delay(self) -> float:
+        return max(0.0, self.rng.gauss(self.latency_ms, self.jitter_ms)) / 1000
+
+    def should_fail(self) -> bool:
+        return self.rng.random() < self.error_rate
+
+
+def error_response(profile: Profile) -> JSONResponse:
+    headers = {"Retry-After": "1"} if profile.error_status == 429 else None
+    return JSONResponse({"error": "injected failure"}, status_code=profile.error_status, headers=headers)
+
+
+# ---------------------------------------------------------------------------
+# LLM
+# ---------------------------------------------------------------------------
+
+def classify_prompt(messages: list) -> str:
+    system = next((m.get("content", "") for m in messages if m.get("role") == "system"), "")
+    if "mode routing engine" in system:
+        return "router"
+    if "routing engine" in system:
+        return "tool_selector"
+    if "which mode Agent 2" in system:
+        return "mode_selector"
+    if "NO_DRAFT" in system:
+        return "draft_decider"
+    if "NO_TOOL" in system:
+        return "referral_decider"
+    return "generate"
+
+
+def completion_text(kind: str, profile: Profile) -> str:
+    rng = profile.rng
+    if kind in ("router", "tool_selector"):
+        decision = {"tool": "get_company_full_profile", "arguments": {"inn": rng.choice(SAMPLE_INNS)}}
+        if kind == "router":
+            decision["mode"] = rng.choice(["explain", "explain", "draft", "referral", "pipeline"])
+        return json.dumps(decision)
+    if kind == "mode_selector":
+        return json.dumps({"mode": "explain"})
+    if kind == "draft_decider":
+        return rng.choice(["DRAFT", "NO_DRAFT"])
+    if kind == "referral_decider":
+        return rng.choice(["NO_TOOL", "support.search_providers"])
+    return " ".join(rng.choice(WORDS) for _ in range(profile.completion_tokens))
+
+
+def create_llm_app(profile: Profile) -> FastAPI:
+    app = FastAPI(title="LLM emulator")
+    recorder = StatsRecorder()
+    add_stats_routes(app, recorder)
+
+    @app.post("/chat/completions")
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        kind = classify_prompt(body.get("messages", []))
+        stage = f"llm:{kind}"
+        started = time.perf_counter()
+
+        await asyncio.sleep(profile.delay())
+        if profile.should_fail():
+            recorder.record(stage, time.perf_counter() - started, error=True)
+            return error_response(profile)
+
+        text = completion_text(kind, profile)
+        tokens = text.split(" ")
+        model = body.get("model", "emulator")
+        prompt_tokens = sum(len(str(m.get("content", ""))) for m in body.get("messages", [])) // 4
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": len(tokens), "total_tokens": prompt_tokens + len(tokens)}
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+
+        if not body.get("stream"):
+            await asyncio.sleep(len(tokens) / profile.tokens_per_sec)
+            recorder.record(stage, time.perf_counter() - started)
+            return {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                "usage": usage,
+            }
+
+        async def events():
+            for i, token in enumerate(tokens):
+                await asyncio.sleep(1 / profile.tokens_per_sec)
+                chunk = {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [{"index": 0, "delta": {"content": token if i == 0 else f" {token}"}, "finish_reason": None}],
+                }
+                yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+            final = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+            }
+            yield f"data: {json.dumps(final)}\n\n"
+            if (body.get("stream_options") or {}).get("include_usage"):
+                final = {**final, "choices": [], "usage": usage}
+                yield f"data: {json.dumps(final)}\n\n"
+            yield "data: [DONE]\n\n"
+            recorder.record(stage, time.perf_counter() - started)
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return app
+
+
+# ---------------------------------------------------------------------------
+# Checko / DaData
+# ---------------------------------------------------------------------------
+
+def create_registry_app(profile: Profile) -> FastAPI:
+    app = FastAPI(title="Checko/DaData emulator")
+    recorder = StatsRecorder()
+    add_stats_routes(app, recorder)
+
+    payloads = {path.name: path.read_bytes() for path in PAYLOADS_DIR.glob("*.json")}
+    company_names = [name for name, _ in COMPANY_MIX]
+    company_weights = [weight for _, weight in COMPANY_MIX]
+    small = json.loads(payloads["company_small.json"])["data"]
+    dadata_payload = json.dumps({"suggestions": [{"value": small["Наим"]["Сокр"], "data": {
+        "inn": small["ИНН"],
+        "ogrn": small["ОГРН"],
+        "kpp": small["КПП"],
+        "name": {"short_with_opf": small["Наим"]["Сокр"], "full_with_opf": small["Наим"]["Полн"]},
+        "address": {"value": small["ЮрАдрес"]["АдресРФ"], "data": {"region_iso_code": "RU-MOW"}},
+        "state": {"status": "ACTIVE"},
+        "management": {"name": small["Руковод"][0]["ФИО"]},
+        "okved": small["ОКВЭД"]["Код"],
+    }}]}, ensure_ascii=False).encode("utf-8")
+
+    async def serve(stage: str, content: bytes):
+        started = time.perf_counter()
+        await asyncio.sleep(profile.delay())
+        if profile.should_fail():
+            recorder.record(stage, time.perf_counter() - started, error=True)
+            return error_response(profile)
+        recorder.record(stage, time.perf_counter() - started)
+        return Response(content, media_type="application/json")
+
+    @app.get("/v2/company")
+    async def company():
+        name = profile.rng.choices(company_names, company_weights)[0]
+        return await serve("checko:/company", payloads[name])
+
+    @app.get("/v2/search")
+    async def search():
+        return await serve("checko:/search", payloads["search.json"])
+
+    @app.get("/v2/entrepreneur")
+    async def entrepreneur():
+        return await serve("checko:/entrepreneur", payloads["entrepreneur.json"])
+
+    @app.post("/dadata")
+    async def dadata():
+        return await serve("dadata", dadata_payload)
+
+    return app
+
+
+# ---------------------------------------------------------------------------
+# Support MCP
+# ---------------------------------------------------------------------------
+
+def create_support_app(profile: Profile) -> FastAPI:
+    app = FastAPI(title="Support MCP emulator")
+    recorder = StatsRecorder()
+    add_stats_routes(app, recorder)
+
+    @app.post("/tools/search_providers")
+    async def search_providers(request: Request):
+        await request.json()
+        started = time.perf_counter()
+        await asyncio.sleep(profile.delay())
+        if profile.should_fail():
+            recorder.record("support:search_providers", time.perf_counter() - started, error=True)
+            return error_response(profile)
+        recorder.record("support:search_providers", time.perf_counter() - started)
+        return {"providers": [
+            {
+                "name": f"Юридическая фирма №{i}",
+                "location": "Москва",
+                "practice_areas": ["корпоративное право", "арбитраж"],
+                "languages": ["ru", "en"],
+            }
+            for i in range(1, 4)
+        ]}
+
+    return app
+
+
+FACTORIES = {"llm": create_llm_app, "registry": create_registry_app, "support": create_support_app}
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Run one dependency emulator")
+    parser.add_argument("kind", choices=sorted(FACTORIES))
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, required=True)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--jitter-ms", type=float, default=10.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=500)
+    parser.add_argument("--tokens-per-sec", type=float, default=50.0)
+    parser.add_argument("--completion-tokens", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    profile = Profile(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        tokens_per_sec=args.tokens_per_sec,
+        completion_tokens=args.completion_tokens,
+        seed=args.seed,
+    )
+    uvicorn.run(FACTORIES[args.kind](profile), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
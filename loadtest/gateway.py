@@ -0,0 +1,64 @@
+"""
+HTTP gateway in front of the intelligence_MCP tools for load tests.
+
+agent_law's MCPClient POSTs the tool arguments as JSON to {MCP_BASE_URL}/{tool}.
+This app serves exactly that, calling the tool functions of intelligence_MCP
+in-process with the client built by its own lifespan (so CHECKO_BASE_URL /
+DADATA_BASE_URL, cache and limit settings come from the same env variables).
+
+    CHECKO_BASE_URL=http://127.0.0.1:18002/v2 python -m uvicorn loadtest.gateway:app --port 18004
+"""
+
+import sys
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import PlainTextResponse
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "intelligence_MCP" / "src"))
+
+import main as intelligence  # noqa: E402
+from metrics import CONTENT_TYPE, REGISTRY  # noqa: E402
+from tracing import span  # noqa: E402
+
+from .stats import StatsRecorder, add_stats_routes  # noqa: E402
+
+TOOLS = {
+    "search_entity": intelligence.search_entity,
+    "get_company_full_profile": intelligence.get_company_full_profile,
+    "get_company_profiles_batch": intelligence.get_company_profiles_batch,
+    "get_entrepreneur_profile": intelligence.get_entrepreneur_profile,
+}
+
+recorder = StatsRecorder()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    async with intelligence.lifespan(intelligence.app):
+        yield
+
+
+app = FastAPI(title="intelligence_MCP gateway", lifespan=lifespan)
+add_stats_routes(app, recorder)
+
+
+@app.get("/metrics")
+async def metrics():
+    return PlainTextResponse(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+
+@app.post("/{tool}")
+async def call_tool(tool: str, request: Request):
+    fn = TOOLS.get(tool)
+    if fn is None:
+        raise HTTPException(status_code=404, detail=f"Unknown tool: {tool}")
+    arguments = await request.json()
+
+    started = time.perf_counter()
+    with span(f"gateway.{tool}", traceparent=request.headers.get("traceparent")):
+        result = await fn(**arguments)
+    recorder.record(f"mcp:{tool}", time.perf_counter() - started, error=result.startswith('{"error"'))
+    return PlainTextResponse(result, media_type="application/json")
@@ -0,0 +1,174 @@
+"""
+End-to-end load test of agent_law -> intelligence_MCP -> Agent 2 on one machine.
+
+Starts the LLM, Checko/DaData and support-MCP emulators, the intelligence_MCP
+gateway, Agent 2 and agent_law as local processes wired to each other, drives
+the chosen entry point at the requested concurrency and prints p50/p95/p99 and
+throughput per stage (end-to-end, each MCP tool, each kind of LLM call, each
+upstream endpoint).
+
+    python -m loadtest.run --target agent_law --concurrency 20 --requests 200
+    python -m loadtest.run --target agent2 --llm-latency-ms 800 --llm-error-rate 0.02
+    python -m loadtest.run --target agent_law --agent2-jobs   # Agent 2 via submit + poll
+
+Answer/LLM/response caches are disabled unless --keep-caches is given, so every
+request exercises the whole chain.
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+from .driver import drive
+from .stats import format_table
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def wait_for_port(port: int, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        with socket.socket() as sock:
+            if sock.connect_ex(("127.0.0.1", port)) == 0:
+                return
+        time.sleep(0.1)
+    raise RuntimeError(f"Nothing is listening on port {port} after {timeout}s")
+
+
+def build_processes(args, workdir: str) -> tuple:
+    base = args.base_port
+    ports = {
+        "llm": base + 1,
+        "registry": base + 2,
+        "support": base + 3,
+        "gateway": base + 4,
+        "agent2": base + 5,
+        "agent_law": base + 6,
+    }
+    url = {name: f"http://127.0.0.1:{port}" for name, port in ports.items()}
+    python = sys.executable
+
+    def emulator(kind: str, latency: float, error_rate: float, extra=()):
+        return [
+            python, "-m", "loadtest.emulators", kind, "--port", str(ports[kind]),
+            "--latency-ms", str(latency), "--jitter-ms", str(latency * 0.2),
+            "--error-rate", str(error_rate), *extra,
+        ]
+
+    caches = {} if args.keep_caches else {
+        "ANSWER_CACHE_ENABLED": "0",
+        "LLM_CACHE_ENABLED": "0",
+        "CACHE_ENABLED": "false",
+    }
+    common = {**os.environ, **caches, "API_KEY": "loadtest"}
+
+    def uvicorn(app: str, name: str):
+        return [python, "-m", "uvicorn", app, "--port", str(ports[name]), "--log-level", "warning"]
+
+    processes = [
+        ("llm", emulator("llm", args.llm_latency_ms, args.llm_error_rate, (
+            "--tokens-per-sec", str(args.llm_tokens_per_sec),
+            "--completion-tokens", str(args.llm_completion_tokens),
+        )), ROOT, common),
+        ("registry", emulator("registry", args.checko_latency_ms, args.checko_error_rate), ROOT, common),
+        ("support", emulator("support", args.support_latency_ms, args.support_error_rate), ROOT, common),
+        ("gateway", uvicorn("loadtest.gateway:app", "gateway"), ROOT, {
+            **common,
+            "CHECKO_API_KEY": "loadtest",
+            "DADATA_API_KEY": "loadtest",
+            "CHECKO_BASE_URL": f"{url['registry']}/v2",
+            "DADATA_BASE_URL": f"{url['registry']}/dadata",
+        }),
+        ("agent2", uvicorn("src.server:app", "agent2"), ROOT / "legal_advisor_and_referral_agent", {
+            **common,
+            "API_BASE": url["llm"],
+            "SUPPORT_MCP_BASE_URL": url["support"],
+            "SUPPORT_MCP_TOOLS": "support.search_providers=/tools/search_providers",
+            "JOBS_DB": str(Path(workdir) / "agent2_jobs.db"),
+        }),
+        ("agent_law", uvicorn("main:app", "agent_law"), ROOT / "agent_law", {
+            **common,
+            "BASE_URL": url["llm"],
+            "MCP_BASE_URL": url["gateway"],
+            "API_2_URL": url["agent2"],
+            "AGENT2_JOBS_ENABLED": "1" if args.agent2_jobs else "0",
+            "AGENT2_POLL_INTERVAL": "0.2",
+        }),
+    ]
+    return ports, url, processes
+
+
+STATS_SERVICES = ("gateway", "llm", "registry", "support")
+
+
+async def reset_stage_stats(url: dict) -> None:
+    async with httpx.AsyncClient(timeout=10) as client:
+        for name in STATS_SERVICES:
+            await client.post(f"{url[name]}/_reset")
+
+
+async def collect_stage_stats(url: dict) -> dict:
+    stages = {}
+    async with httpx.AsyncClient(timeout=10) as client:
+        for name in STATS_SERVICES:
+            try:
+                stages.update((await client.get(f"{url[name]}/_stats")).json())
+            except httpx.HTTPError:
+                continue
+    return stages
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end load test with local emulators")
+    parser.add_argument("--target", choices=["agent_law", "agent2"], default="agent_law")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--base-port", type=int, default=18000)
+    parser.add_argument("--keep-caches", action="store_true")
+    parser.add_argument("--verbose", action="store_true", help="show the services' own logs")
+    parser.add_argument("--agent2-jobs", action="store_true", help="agent_law submits Agent 2 jobs and polls them")
+    parser.add_argument("--llm-latency-ms", type=float, default=300.0, help="time to first token")
+    parser.add_argument("--llm-tokens-per-sec", type=float, default=80.0)
+    parser.add_argument("--llm-completion-tokens", type=int, default=200)
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    parser.add_argument("--checko-latency-ms", type=float, default=150.0)
+    parser.add_argument("--checko-error-rate", type=float, default=0.0)
+    parser.add_argument("--support-latency-ms", type=float, default=100.0)
+    parser.add_argument("--support-error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    workdir = tempfile.TemporaryDirectory(prefix="loadtest-")
+    ports, url, specs = build_processes(args, workdir.name)
+    output = None if args.verbose else subprocess.DEVNULL
+    running = []
+    try:
+        for name, cmd, cwd, env in specs:
+            running.append(subprocess.Popen(cmd, cwd=cwd, env=env, stdout=output, stderr=output))
+            wait_for_port(ports[name])
+        asyncio.run(reset_stage_stats(url))
+
+        print(f"Driving {args.target}: {args.requests} requests, concurrency {args.concurrency}")
+        e2e = asyncio.run(drive(url[args.target], args.target, args.concurrency, args.requests))
+        stages = asyncio.run(collect_stage_stats(url))
+        print(format_table({**e2e, **stages}))
+    finally:
+        for process in running:
+            process.terminate()
+        for process in running:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        workdir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+import math
+import time
+from contextlib import contextmanager
+from typing import Dict, List
+
+from fastapi import FastAPI
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, math.ceil(q * len(ordered)) - 1)
+    return ordered[index]
+
+
+class StatsRecorder:
+    """Latencies and error counts per stage (seconds)."""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+        self.started = time.monotonic()
+
+    def record(self, stage: str, seconds: float, error: bool = False) -> None:
+        self.latencies.setdefault(stage, []).append(seconds)
+        if error:
+            self.errors[stage] = self.errors.get(stage, 0) + 1
+
+    @contextmanager
+    def measure(self, stage: str):
+        started = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.record(stage, time.perf_counter() - started, error=True)
+            raise
+        self.record(stage, time.perf_counter() - started)
+
+    def reset(self) -> None:
+        self.latencies.clear()
+        self.errors.clear()
+        self.started = time.monotonic()
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        return {
+            stage: {
+                "count": len(values),
+                "errors": self.errors.get(stage, 0),
+                "p50_ms": round(percentile(values, 0.50) * 1000, 1),
+                "p95_ms": round(percentile(values, 0.95) * 1000, 1),
+                "p99_ms": round(percentile(values, 0.99) * 1000, 1),
+                "rps": round(len(values) / elapsed, 2),
+            }
+            for stage, values in sorted(self.latencies.items())
+        }
+
+
+def add_stats_routes(app: FastAPI, recorder: StatsRecorder) -> None:
+    @app.get("/_stats")
+    async def stats():
+        return recorder.summary()
+
+    @app.post("/_reset")
+    async def reset():
+        recorder.reset()
+        return {"ok": True}
+
+
+def format_table(rows: Dict[str, Dict[str, float]]) -> str:
+    header = f"{'stage':<36}{'count':>8}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'rps':>9}"
+    lines = [header, "-" * len(header)]
+    for stage, row in rows.items():
+        lines.append(
+            f"{stage:<36}{row['count']:>8}{row['errors']:>8}{row['p50_ms']:>10}"
+            f"{row['p95_ms']:>10}{row['p99_ms']:>10}{row['rps']:>9}"
+        )
+    return "\n".join(lines)
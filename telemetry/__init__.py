@@ -0,0 +1,6 @@
+"""Code shared by the three services. Each service adds the repository root to
+sys.path in its own tracing module and keeps importing from there."""
+
+from .tracing import Span, Tracing
+
+__all__ = ["Span", "Tracing"]
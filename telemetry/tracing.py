@@ -0,0 +1,173 @@
+import atexit
+import os
+import time
+from dotenv import load_dotenv
+from opentelemetry import context as otel_context, trace
+from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import (
+    BatchSpanProcessor,
+    ConsoleSpanExporter,
+    SimpleSpanProcessor,
+    SpanExporter,
+)
+from opentelemetry.trace import Status, StatusCode
+from opentelemetry.trace.propagation.tracecontext import TraceContextTextMapPropagator
+
+load_dotenv()
+
+_propagator = TraceContextTextMapPropagator()
+
+
+def _attribute(value):
+    return value if isinstance(value, (bool, int, float, str)) else str(value)
+
+
+class Span:
+    """A timed operation in a W3C trace; use as a (sync) context manager in sync or async code.
+
+    Thin wrapper over an OpenTelemetry span that keeps the call sites small:
+    `set(**attributes)`, `status = "error"` and `traceparent()`. Without a
+    tracer (nothing is exported) no span is created: the caller's trace
+    context passes through unchanged, so outgoing requests still carry it."""
+
+    def __init__(self, tracer, name: str, parent_context, attributes: dict, activate: bool = True):
+        self.name = name
+        self.activate = activate
+        self.start_ns = None
+        self._tracer = tracer
+        self._parent_context = parent_context
+        self._attributes = attributes
+        self._span = None
+        self._token = None
+        self._end_deferred = False
+        self._ended = False
+
+    @classmethod
+    def wrap(cls, otel_span) -> "Span":
+        wrapped = cls(None, otel_span.name, None, {}, activate=False)
+        wrapped._span = otel_span
+        wrapped.start_ns = otel_span.start_time
+        return wrapped
+
+    @property
+    def status(self) -> str:
+        status = getattr(self._span, "status", None)  # only recorded spans have one
+        return "error" if status is not None and status.status_code == StatusCode.ERROR else "ok"
+
+    @status.setter
+    def status(self, value: str):
+        self._span.set_status(Status(StatusCode.ERROR if value == "error" else StatusCode.OK))
+
+    def set(self, **attributes):
+        if self._span.is_recording():
+            self._span.set_attributes({k: _attribute(v) for k, v in attributes.items() if v is not None})
+
+    def traceparent(self) -> str | None:
+        """None when the span is not part of any trace (nothing exported, no incoming traceparent)."""
+        carrier = {}
+        _propagator.inject(carrier, context=trace.set_span_in_context(self._span))
+        return carrier.get("traceparent")
+
+    def end_later(self):
+        """Keep the span open after the `with` block; the caller calls end()."""
+        self._end_deferred = True
+
+    def end(self):
+        if not self._ended:
+            self._ended = True
+            self._span.end()
+
+    def __enter__(self):
+        self.start_ns = time.time_ns()
+        if self._tracer is None:
+            if self._parent_context is not None and self.activate:
+                self._token = otel_context.attach(self._parent_context)
+            self._span = trace.get_current_span(self._parent_context)
+            self._ended = True  # borrowed from the caller, not ours to end
+            return self
+
+        attributes = {k: _attribute(v) for k, v in self._attributes.items() if v is not None}
+        self._span = self._tracer.start_span(
+            self.name, context=self._parent_context, attributes=attributes, start_time=self.start_ns
+        )
+        if self.activate:
+            self._token = otel_context.attach(trace.set_span_in_context(self._span))
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc is not None and self._span.is_recording():
+            self._span.set_status(Status(StatusCode.ERROR, f"{exc_type.__name__}: {exc}"))
+            self._span.set_attribute("error", f"{exc_type.__name__}: {exc}")
+        if self._token is not None:
+            otel_context.detach(self._token)
+        if exc is not None or not self._end_deferred:
+            self.end()
+        return False
+
+
+class Tracing:
+    """The tracer of one service. Spans are exported over OTLP/HTTP when
+    OTEL_EXPORTER_OTLP_ENDPOINT is set (the exporter reads the other
+    OTEL_EXPORTER_OTLP_* variables itself) and as JSONL to TRACE_FILE when
+    that is set. TRACE_SERVICE_NAME overrides `service_name`. With neither,
+    spans are not recorded at all (see Span) and only the context propagates."""
+
+    def __init__(self, service_name: str):
+        self.service_name = os.getenv("TRACE_SERVICE_NAME", service_name)
+        self._provider = TracerProvider(
+            resource=Resource.create({"service.name": self.service_name}),
+            shutdown_on_exit=False,
+        )
+        self._tracer = self._provider.get_tracer(f"{service_name}.tracing")
+        self._trace_file = None
+        self._closed = False
+        self.recording = False
+
+        if os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT"):
+            self.add_exporter(OTLPSpanExporter())
+        trace_file = os.getenv("TRACE_FILE")
+        if trace_file:
+            self._trace_file = open(trace_file, "a", encoding="utf-8")
+            self.add_exporter(ConsoleSpanExporter(
+                out=self._trace_file,
+                formatter=lambda s: s.to_json(indent=None) + "\n",
+            ))
+        # the lifespans call shutdown(); this covers scripts and interrupted servers
+        atexit.register(self.shutdown)
+
+    def add_exporter(self, exporter: SpanExporter, batch: bool = True):
+        """Export spans to `exporter` too; without `batch` each span is exported as it ends."""
+        self._provider.add_span_processor(BatchSpanProcessor(exporter) if batch else SimpleSpanProcessor(exporter))
+        self.recording = True
+
+    def span(self, name: str, traceparent: str | None = None, activate: bool = True, **attributes) -> Span:
+        """Child of the current span, of an incoming `traceparent`, or a new trace."""
+        parent_context = None
+        if not trace.get_current_span().get_span_context().is_valid and traceparent:
+            parent_context = _propagator.extract({"traceparent": traceparent})
+        return Span(self._tracer if self.recording else None, name, parent_context, attributes, activate)
+
+    @staticmethod
+    def current_span() -> Span | None:
+        current = trace.get_current_span()
+        return Span.wrap(current) if current.is_recording() else None
+
+    @staticmethod
+    def inject(headers: dict | None = None) -> dict:
+        """Add the traceparent of the current span to outgoing request headers."""
+        headers = dict(headers or {})
+        _propagator.inject(headers)
+        return headers
+
+    def shutdown(self):
+        """Export the spans still queued and close TRACE_FILE. Call on application
+        shutdown: uvicorn re-raises SIGTERM after a graceful stop, so atexit
+        handlers may not run."""
+        if self._closed:
+            return
+        self._closed = True
+        self._provider.shutdown()
+        if self._trace_file is not None:
+            self._trace_file.close()